@@ -0,0 +1,23 @@
+from corva import (
+    Api,
+    Cache,
+    StreamColumnsEvent,
+    StreamCompactEvent,
+    StreamDictsEvent,
+    stream,
+)
+
+
+@stream(records_as="dicts")  # <.>
+def dicts_app(event: StreamDictsEvent, api: Api, cache: Cache):
+    return [record["data"]["hole_depth"] for record in event.records]  # <.>
+
+
+@stream(records_as="columns")  # <.>
+def columns_app(event: StreamColumnsEvent, api: Api, cache: Cache):
+    return event.columns["data.hole_depth"]  # <.>
+
+
+@stream(records_as="compact")  # <.>
+def compact_app(event: StreamCompactEvent, api: Api, cache: Cache):
+    return [record.data["hole_depth"] for record in event.records]  # <.>
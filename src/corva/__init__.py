@@ -1,6 +1,9 @@
 from .api import Api
+from .circuit_breaker import CircuitOpenError
+from .deadline import DeadlineExceededError
 from .handlers import scheduled, stream, task, partial_rerun_merge
 from .logger import CORVA_LOGGER as Logger
+from .models.scheduled.prefetch import DatasetSpec
 from .models.rerun import RerunDepth, RerunDepthRange, RerunTime, RerunTimeRange
 from .models.scheduled.scheduled import (
     ScheduledDataTimeEvent,
@@ -8,8 +11,11 @@ from .models.scheduled.scheduled import (
     ScheduledNaturalTimeEvent,
 )
 from .models.stream.stream import (
+    StreamColumnsEvent,
+    StreamCompactEvent,
     StreamDepthEvent,
     StreamDepthRecord,
+    StreamDictsEvent,
     StreamTimeEvent,
     StreamTimeRecord,
 )
@@ -17,6 +23,7 @@ from .models.merge.merge import PartialRerunMergeEvent
 from .models.task import TaskEvent
 from .service.cache_sdk import UserRedisSdk as Cache
 from .shared import SECRETS as secrets
+from .startup import warmup
 
 
 def __getattr__(name):
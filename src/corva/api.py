@@ -1,13 +1,34 @@
+import functools
 import json
 import posixpath
 import re
+import time
+import urllib.parse
 from typing import List, Optional, Sequence, Union
 
 import requests
 
-from corva.api_utils import get_requests_session, get_retry_strategy
+from corva import metrics, tracing
+from corva.api_utils import DeadlineTimeout, get_shared_session
+from corva.circuit_breaker import CIRCUIT_BREAKER, CircuitOpenError
 from corva.configuration import SETTINGS
+from corva.hedging import HEDGER
 from corva.logger import CORVA_LOGGER
+from corva.rate_limit import RATE_LIMITER, parse_retry_after
+
+
+def record_request_metrics(response: requests.Response, duration: float) -> None:
+    metrics.observe('api.request.duration', duration * 1000)
+    metrics.increment(
+        'api.bytes_out', len(response.request.body or b''), unit='Bytes'
+    )
+    metrics.increment('api.bytes_in', len(response.content or b''), unit='Bytes')
+
+    # urllib3 keeps the history of retried attempts on the raw response
+    retries = getattr(getattr(response, 'raw', None), 'retries', None)
+
+    for attempt in getattr(retries, 'history', None) or ():
+        metrics.increment(f'api.retries.{attempt.status or "error"}')
 
 
 class Api:
@@ -41,11 +62,10 @@ class Api:
         self.app_connection_id = app_connection_id
         self.timeout = timeout or self.TIMEOUT_LIMITS[1]
         self._max_retries = max_retries or SETTINGS.MAX_RETRY_COUNT
-        self._session = get_requests_session(
-            retry_strategy=get_retry_strategy(
-                max_retries=self._max_retries,
-                backoff_factor=backoff_factor_retries or SETTINGS.BACKOFF_FACTOR,
-            ),
+        # connections are kept between invocations by the shared adapter
+        self._session = get_shared_session(
+            max_retries=self._max_retries,
+            backoff_factor=backoff_factor_retries or SETTINGS.BACKOFF_FACTOR,
             pool_connections_count=(pool_conn_count or SETTINGS.POOL_CONNECTIONS_COUNT),
             pool_max_size=pool_max_size or SETTINGS.POOL_MAX_SIZE,
             pool_block=pool_block or SETTINGS.POOL_BLOCK,
@@ -135,16 +155,43 @@ class Api:
         Returns:
             requests.Response instance.
         """
-        _timeout = timeout or self.timeout
-
-        return self._session.request(
-            method=method,
-            url=url,
-            params=params,
-            json=data,
-            headers=headers,
-            timeout=_timeout,
-        )
+        # all Api instances share the limits and the circuit of the host
+        host = urllib.parse.urlsplit(url).hostname or ''
+        breaker = CIRCUIT_BREAKER.get(host)
+        probe = breaker.acquire()
+        success = None
+
+        try:
+            limiter = RATE_LIMITER.get(host)
+            limiter.acquire()
+            status = None
+            retry_after = None
+
+            try:
+                response = self._session.request(
+                    method=method,
+                    url=url,
+                    params=params,
+                    json=data,
+                    headers=headers,
+                    # fitted into the deadline before each retried attempt too
+                    timeout=DeadlineTimeout(  # type: ignore[arg-type]
+                        timeout or self.timeout
+                    ),
+                )
+                status = response.status_code
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                success = breaker.is_success(status)
+
+                return response
+            except (requests.ConnectionError, requests.Timeout):
+                success = False
+                raise
+            finally:
+                limiter.release(status=status, retry_after=retry_after)
+        finally:
+            # failed attempts, that got retried, are recorded by the retry strategy
+            breaker.release(probe=probe, success=success)
 
     def _request(
         self,
@@ -175,14 +222,50 @@ class Api:
             **(headers or {}),
         }
 
-        return self._execute_request(
-            method=method,
-            url=url,
-            params=params,
-            data=data,
-            headers=headers,
-            timeout=timeout,
-        )
+        with tracing.span(
+            'corva.api.request', {'http.request.method': method, 'url.full': url}
+        ) as span:
+            tracing.inject(headers)
+
+            start = time.perf_counter()
+            request = functools.partial(
+                self._execute_request,
+                method=method,
+                url=url,
+                params=params,
+                data=data,
+                headers=headers,
+                timeout=timeout,
+            )
+
+            try:
+                if method == 'GET' and SETTINGS.API_HEDGING:
+                    response = HEDGER.run(
+                        host=urllib.parse.urlsplit(url).hostname or '', request=request
+                    )
+                else:
+                    response = request()
+            except CircuitOpenError:
+                metrics.increment('api.circuit.rejected')
+                span.set_attribute('corva.circuit_open', True)
+                fallback_response = CIRCUIT_BREAKER.get_fallback_response(
+                    method=method, url=url, params=params
+                )
+
+                if fallback_response is None:
+                    raise
+
+                metrics.increment('api.circuit.fallback')
+                response = fallback_response
+
+            span.set_attribute('http.response.status_code', response.status_code)
+
+        if metrics.is_collecting():
+            record_request_metrics(
+                response=response, duration=time.perf_counter() - start
+            )
+
+        return response
 
     def get_dataset(
         self,
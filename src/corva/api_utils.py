@@ -1,8 +1,16 @@
-from typing import Optional
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
 
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3 import Retry
+from urllib3 import Retry, Timeout
+from urllib3.exceptions import MaxRetryError, ResponseError
+
+from corva import deadline
+from corva.circuit_breaker import CIRCUIT_BREAKER, HostBreaker
+from corva.rate_limit import RATE_LIMITER, parse_retry_after
 
 RETRYABLE_STATUS_CODES = (
     408,  # HTTPStatus.REQUEST_TIMEOUT
@@ -27,8 +35,141 @@ ALLOWED_RETRY_METHODS = (
 )
 
 
+class DeadlineAwareRetry(Retry):
+    """Retry, that fits pauses between attempts into the invocation deadline.
+
+    Pauses (backoff or Retry-After) get shortened to leave at least
+    MIN_ATTEMPT_TIME seconds for the next attempt. If there is not enough time
+    left for it, DeadlineExceededError is raised instead of retrying.
+
+    Retried responses adapt the shared host rate limiter. Retries stop, when
+    the host retry budget is exhausted or the host circuit opens. Backoff pauses
+    are fully jittered and last at least until the host accepts requests again.
+    """
+
+    MIN_ATTEMPT_TIME = 1.0  # seconds
+
+    def __init__(self, *args: Any, host: Optional[str] = None, **kwargs: Any):
+        """
+        Args:
+            host: host of the retried request, set by `increment`.
+        """
+
+        super().__init__(*args, **kwargs)
+        self.host = host
+
+    def new(self, **kw: Any) -> 'DeadlineAwareRetry':
+        return super().new(**{'host': self.host, **kw})
+
+    def increment(
+        self,
+        method: Optional[str] = None,
+        url: Optional[str] = None,
+        response: Optional[Any] = None,
+        error: Optional[Exception] = None,
+        _pool: Any = None,
+        _stacktrace: Optional[Any] = None,
+    ) -> Retry:
+        host = getattr(_pool, 'host', None)
+        limiter = None if host is None else RATE_LIMITER.get(host)
+
+        if limiter is not None:
+            limiter.on_response(
+                status=None if response is None else response.status,
+                retry_after=(
+                    None
+                    if response is None
+                    else parse_retry_after(response.headers.get('Retry-After'))
+                ),
+            )
+
+        new_retry = super().increment(
+            method=method,
+            url=url,
+            response=response,
+            error=error,
+            _pool=_pool,
+            _stacktrace=_stacktrace,
+        )
+
+        if limiter is not None and not limiter.try_retry():
+            raise MaxRetryError(
+                _pool, url or '', error or ResponseError('Retry budget exhausted.')
+            )
+
+        breaker = None if host is None else CIRCUIT_BREAKER.get(host)
+
+        if (
+            breaker is not None
+            and (
+                error is not None
+                or (
+                    response is not None
+                    and response.status in HostBreaker.FAILURE_STATUS_CODES
+                )
+            )
+            and not breaker.on_retried_failure()
+        ):
+            raise MaxRetryError(
+                _pool, url or '', error or ResponseError('Circuit is open.')
+            )
+
+        return new_retry.new(host=host)
+
+    def sleep(self, response: Optional[Any] = None) -> None:
+        retry_after = (
+            self.get_retry_after(response)
+            if self.respect_retry_after_header and response
+            else None
+        )
+        # full jitter spreads retries of concurrent requests
+        pause = retry_after or random.uniform(0, self.get_backoff_time())
+
+        if self.host is not None:
+            pause = max(pause, RATE_LIMITER.get(self.host).get_blocked_time())
+
+        budget = deadline.check()
+
+        if budget is not None:
+            if budget < self.MIN_ATTEMPT_TIME:
+                raise deadline.DeadlineExceededError(
+                    f'Not enough time left to retry the request: {budget:.3f}s.'
+                )
+
+            pause = min(pause, budget - self.MIN_ATTEMPT_TIME)
+
+        if pause > 0:
+            time.sleep(pause)
+
+
+class DeadlineTimeout(Timeout):
+    """Timeout, that fits into the invocation deadline at the start of each attempt.
+
+    urllib3 passes the same timeout to every retried attempt and clones it
+    before the attempt, so the timeout of a late retry gets shortened too.
+
+    Args:
+        timeout: connect and read timeout in seconds.
+    """
+
+    def __init__(self, timeout: float):
+        super().__init__(connect=timeout, read=timeout)
+        self.timeout = timeout
+
+    def clone(self) -> Timeout:
+        """Returns the timeout fitted into the deadline.
+
+        Raises:
+            DeadlineExceededError: if the budget is exhausted.
+        """
+
+        timeout = deadline.fit_timeout(self.timeout)
+
+        return Timeout(connect=timeout, read=timeout)
+
+
 def get_retry_strategy(max_retries: int, backoff_factor: float = 1) -> Retry:
-    return Retry(
+    return DeadlineAwareRetry(
         total=max_retries,
         backoff_factor=backoff_factor,
         status_forcelist=RETRYABLE_STATUS_CODES,
@@ -37,16 +178,60 @@ def get_retry_strategy(max_retries: int, backoff_factor: float = 1) -> Retry:
     )
 
 
-def get_requests_session(
+# (max retries, backoff factor, pool connections count, pool max size, pool block)
+_SHARED_ADAPTERS: Dict[Tuple[int, float, int, int, bool], HTTPAdapter] = {}
+_SHARED_ADAPTERS_LOCK = threading.Lock()
+
+
+def get_shared_adapter(
+    max_retries: int,
+    backoff_factor: float,
+    pool_connections_count: int,
+    pool_max_size: int,
+    pool_block: bool,
+) -> HTTPAdapter:
+    """Returns HTTP adapter, shared by sessions with the same settings.
+
+    Shared adapters keep connections to Corva API between invocations of a warm
+    Lambda, so DNS lookups and TCP and TLS handshakes are not repeated.
+    """
+
+    key = (
+        max_retries,
+        backoff_factor,
+        pool_connections_count,
+        pool_max_size,
+        pool_block,
+    )
+
+    with _SHARED_ADAPTERS_LOCK:
+        adapter = _SHARED_ADAPTERS.get(key)
+
+        if adapter is None:
+            adapter = _SHARED_ADAPTERS[key] = HTTPAdapter(
+                max_retries=get_retry_strategy(
+                    max_retries=max_retries, backoff_factor=backoff_factor
+                ),
+                pool_connections=pool_connections_count,
+                pool_maxsize=pool_max_size,
+                pool_block=pool_block,
+            )
+
+    return adapter
+
+
+def get_shared_session(
+    max_retries: int,
+    backoff_factor: float,
     pool_connections_count: int,
     pool_max_size: int,
     pool_block: bool,
-    retry_strategy: Optional[Retry] = None,
 ) -> requests.Session:
-    adapter = HTTPAdapter(
-        max_retries=retry_strategy,
-        pool_connections=pool_connections_count,
-        pool_maxsize=pool_max_size,
+    adapter = get_shared_adapter(
+        max_retries=max_retries,
+        backoff_factor=backoff_factor,
+        pool_connections_count=pool_connections_count,
+        pool_max_size=pool_max_size,
         pool_block=pool_block,
     )
 
@@ -56,3 +241,43 @@ def get_requests_session(
     session.mount('http://', adapter)
 
     return session
+
+
+def close_shared_adapters() -> None:
+    """Closes connections of the shared adapters. They reconnect on next request."""
+
+    with _SHARED_ADAPTERS_LOCK:
+        adapters = list(_SHARED_ADAPTERS.values())
+
+    for adapter in adapters:
+        adapter.close()
+
+
+def connect(session: requests.Session, url: str, timeout: float) -> None:
+    """Opens a connection to the host of the url in the session pool.
+
+    The connection goes to the same pool, that requests to the url use.
+
+    Args:
+        timeout: connect timeout in seconds.
+    """
+
+    request = requests.Request('HEAD', url).prepare()
+    settings = session.merge_environment_settings(
+        url=url, proxies={}, stream=None, verify=None, cert=None
+    )
+    adapter = session.get_adapter(url)
+    pool = adapter.get_connection_with_tls_context(  # type: ignore[attr-defined]
+        request,
+        verify=settings['verify'],
+        proxies=settings['proxies'],
+        cert=settings['cert'],
+    )
+    connection = pool._get_conn()
+
+    try:
+        if not connection.is_connected:
+            connection.timeout = timeout
+            connection.connect()
+    finally:
+        pool._put_conn(connection)
@@ -1,12 +1,17 @@
+import contextlib
+import threading
+import time
 from typing import (
     Dict,
+    Iterator,
     Optional,
     Sequence,
     Tuple,
 )
 
 import redis
-import semver
+
+from corva import deadline, metrics, tracing
 
 
 class RedisRepository:
@@ -14,6 +19,26 @@ class RedisRepository:
         self.hash_name = hash_name
         self.client = client
 
+    @contextlib.contextmanager
+    def _span(self, operation: str) -> Iterator[None]:
+        """Traces and measures a single round trip to Redis."""
+
+        deadline.check()
+
+        with tracing.span(
+            f'corva.cache.{operation}',
+            {
+                'db.system': 'redis',
+                'db.operation.name': operation,
+                'db.collection.name': self.hash_name,
+            },
+        ):
+            start = time.perf_counter()
+            yield
+
+        metrics.observe('cache.duration', (time.perf_counter() - start) * 1000)
+        metrics.increment('cache.round_trips')
+
     def set(self, key: str, value: str, ttl: int) -> None:
         self.set_many(data=[(key, value, ttl)])
 
@@ -22,38 +47,46 @@ class RedisRepository:
         for key, value, ttl in data:
             pipe.hset(self.hash_name, key, value)
             pipe.execute_command("HEXPIRE", self.hash_name, ttl, "FIELDS", 1, key)
-        pipe.execute()
+        with self._span('set_many'):
+            pipe.execute()
 
     def get(self, key: str) -> Optional[str]:
-        val = self.client.hget(self.hash_name, key)
+        with self._span('get'):
+            val = self.client.hget(self.hash_name, key)
         return None if val is None else str(val)
 
     def get_many(self, keys: Sequence[str]) -> Dict[str, Optional[str]]:
         if keys:
-            values = self.client.hmget(self.hash_name, keys)
+            with self._span('get_many'):
+                values = self.client.hmget(self.hash_name, keys)
             # redis-py returns a list of values where non-existent/expired are None
             return {k: (None if v is None else str(v)) for k, v in zip(keys, values)}
         return {}
 
     def get_all(self) -> Dict[str, str]:
-        raw = self.client.hgetall(self.hash_name)
+        with self._span('get_all'):
+            raw = self.client.hgetall(self.hash_name)
         return dict(raw)
 
     def delete(self, key: str) -> None:
-        self.client.hdel(self.hash_name, key)
+        with self._span('delete'):
+            self.client.hdel(self.hash_name, key)
 
     def delete_many(self, keys: Sequence[str]) -> None:
         if keys:
-            self.client.hdel(self.hash_name, *keys)
+            with self._span('delete_many'):
+                self.client.hdel(self.hash_name, *keys)
 
     def delete_all(self) -> None:
-        self.client.delete(self.hash_name)
+        with self._span('delete_all'):
+            self.client.delete(self.hash_name)
 
 
 class HashMigrator:
-    MINIMUM_ALLOWED_REDIS_SERVER = semver.Version(major=7, minor=4, patch=0)
+    MINIMUM_ALLOWED_REDIS_SERVER = (7, 4, 0)
     NEW_HASH_PREFIX = "migrated/"
     _version_checked: bool = False
+    _version_lock = threading.Lock()
 
     def __init__(self, hash_name: str, client: redis.Redis):
         self.hash_name = hash_name
@@ -64,19 +97,30 @@ class HashMigrator:
         if HashMigrator._version_checked:
             return
 
-        # Require Redis 7.4+ for per-field TTL commands
-        redis_version_str = self.client.info(section="server")["redis_version"]
-        server_version = semver.Version.parse(version=redis_version_str)
+        with HashMigrator._version_lock:
+            # another thread might have checked the version while we were waiting
+            if HashMigrator._version_checked:
+                return
+
+            # imported lazily, as the version gets checked once per process
+            import semver
+
+            # Require Redis 7.4+ for per-field TTL commands
+            redis_version_str = self.client.info(section="server")["redis_version"]
+            server_version = semver.Version.parse(version=redis_version_str)
+            minimum_version = semver.Version(*self.MINIMUM_ALLOWED_REDIS_SERVER)
 
-        if server_version < self.MINIMUM_ALLOWED_REDIS_SERVER:
-            from importlib.metadata import version
+            if server_version < minimum_version:
+                from importlib.metadata import version
 
-            raise RuntimeError(
-                f"Redis server version {server_version} "
-                f"less then {self.MINIMUM_ALLOWED_REDIS_SERVER} -> "
-                f"incompatible with used python SDK version `{version('corva-sdk')}`")
+                raise RuntimeError(
+                    f"Redis server version {server_version} "
+                    f"less then {minimum_version} -> "
+                    f"incompatible with used python SDK version "
+                    f"`{version('corva-sdk')}`"
+                )
 
-        HashMigrator._version_checked = True
+            HashMigrator._version_checked = True
 
     def run(self) -> bool:
         """Prepare parallel new-style cache while keeping legacy structures.
@@ -0,0 +1,267 @@
+"""Process-wide circuit breakers of Corva API hosts.
+
+While a host is down, requests to it fail fast with CircuitOpenError instead of
+waiting out timeouts and retries, so an outage costs milliseconds of Lambda time
+per request. All Api instances share the breakers.
+Enabled with the `API_CIRCUIT_FAILURE_THRESHOLD` setting.
+"""
+
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import requests
+
+from corva import metrics
+from corva.configuration import SETTINGS
+from corva.logger import CORVA_LOGGER
+
+# (method, url, params) -> response to use instead, None to raise CircuitOpenError
+Fallback = Callable[[str, str, Optional[dict]], Optional[requests.Response]]
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request to a host with open circuit.
+
+    Args:
+        host: host of the request.
+        retry_in: seconds left until the host gets probed again.
+    """
+
+    def __init__(self, host: str, retry_in: float):
+        super().__init__(
+            f'Circuit of {host} is open, requests fail fast for {retry_in:.1f}s.'
+        )
+        self.host = host
+        self.retry_in = retry_in
+
+
+class HostBreaker:
+    """Circuit breaker of a host.
+
+    1. Closed: requests pass. `failure_threshold` failed attempts in a row
+        (connection errors, timeouts, 5xx statuses) open the circuit.
+    2. Open: requests fail fast for `reset_timeout` seconds.
+    3. Half-open: up to `half_open_max_calls` probe requests pass at a time.
+        A successful probe closes the circuit, a failed one opens it again.
+
+    Throttling responses (429) neither fail nor succeed, they are handled by the
+    rate limiter.
+
+    Args:
+        host: host name, used in errors and logs.
+        failure_threshold: failed attempts in a row to open the circuit.
+            `0` disables the breaker.
+        reset_timeout: seconds to keep the circuit open.
+        half_open_max_calls: max probe requests in flight.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    FAILURE_STATUS_CODES = (408, 500, 502, 503, 504)
+    NEUTRAL_STATUS_CODES = (429,)
+
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int,
+        reset_timeout: float,
+        half_open_max_calls: int,
+    ):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = max(half_open_max_calls, 1)
+
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probes = 0
+        self.opened_at = -math.inf
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_success(cls, status: int) -> Optional[bool]:
+        """Returns whether the response status is a success, None if neither."""
+
+        if status in cls.NEUTRAL_STATUS_CODES:
+            return None
+
+        return status not in cls.FAILURE_STATUS_CODES
+
+    def acquire(self) -> bool:
+        """Checks the circuit before sending a request.
+
+        Returns:
+            True, if the request is a probe of the half-open circuit.
+
+        Raises:
+            CircuitOpenError: if the circuit is open.
+        """
+
+        if self.failure_threshold <= 0:
+            return False
+
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+
+            now = time.monotonic()
+
+            if self.state == self.OPEN:
+                retry_in = self.opened_at + self.reset_timeout - now
+
+                if retry_in > 0:
+                    raise CircuitOpenError(host=self.host, retry_in=retry_in)
+
+                self.state = self.HALF_OPEN
+
+            if self.probes >= self.half_open_max_calls:
+                raise CircuitOpenError(host=self.host, retry_in=0.0)
+
+            self.probes += 1
+            return True
+
+    def release(self, probe: bool, success: Optional[bool]) -> None:
+        """Records the outcome of the request.
+
+        Args:
+            probe: value returned by `acquire`.
+            success: whether the request succeeded, None if unknown.
+        """
+
+        if self.failure_threshold <= 0:
+            return
+
+        if probe:
+            with self._lock:
+                self.probes -= 1
+
+        if success is None:
+            return
+
+        if success:
+            self.on_success()
+        else:
+            self.on_failure()
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+
+            if self.state != self.HALF_OPEN:
+                return
+
+            self.state = self.CLOSED
+
+        CORVA_LOGGER.info(f'Circuit of {self.host} is closed.')
+
+    def on_failure(self) -> None:
+        """Records a failed attempt, which may open the circuit."""
+
+        if self.failure_threshold <= 0:
+            return
+
+        with self._lock:
+            if self.state == self.OPEN:
+                return
+
+            self.failures += 1
+
+            if (
+                self.state == self.CLOSED
+                and self.failures < self.failure_threshold
+            ):
+                return
+
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+        metrics.increment('api.circuit.opened')
+        CORVA_LOGGER.warning(
+            f'Circuit of {self.host} is open after {self.failures} failures, '
+            f'requests fail fast for {self.reset_timeout}s.'
+        )
+
+    def on_retried_failure(self) -> bool:
+        """Records a failed attempt, that is about to be retried.
+
+        Api does not see outcomes of retried attempts, so the retry strategy
+        records them. Failures, that open the circuit, stop the retries instead:
+        such attempts are not recorded here, as Api records their outcome.
+
+        Returns:
+            False, if the attempt must not be retried.
+        """
+
+        if self.failure_threshold <= 0:
+            return True
+
+        with self._lock:
+            if (
+                self.state != self.CLOSED
+                or self.failures + 1 >= self.failure_threshold
+            ):
+                return False
+
+            self.failures += 1
+            return True
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == self.OPEN
+
+
+class CircuitBreaker:
+    """Host circuit breakers of the process and the fallback for open circuits."""
+
+    def __init__(self) -> None:
+        self._hosts: Dict[str, HostBreaker] = {}
+        self._lock = threading.Lock()
+        self.fallback: Optional[Fallback] = None
+
+    def get(self, host: str) -> HostBreaker:
+        breaker = self._hosts.get(host)
+
+        if breaker is not None:
+            return breaker
+
+        with self._lock:
+            return self._hosts.setdefault(
+                host,
+                HostBreaker(
+                    host=host,
+                    failure_threshold=SETTINGS.API_CIRCUIT_FAILURE_THRESHOLD,
+                    reset_timeout=SETTINGS.API_CIRCUIT_RESET_TIMEOUT,
+                    half_open_max_calls=SETTINGS.API_CIRCUIT_HALF_OPEN_MAX_CALLS,
+                ),
+            )
+
+    def set_fallback(self, fallback: Optional[Fallback]) -> None:
+        """Sets the function, that provides responses to requests with open circuit.
+
+        E.g. serve GET requests from a cache of earlier responses.
+        None removes the fallback.
+        """
+
+        self.fallback = fallback
+
+    def get_fallback_response(
+        self, method: str, url: str, params: Optional[dict]
+    ) -> Optional[requests.Response]:
+        if self.fallback is None:
+            return None
+
+        return self.fallback(method, url, params)
+
+    def clear(self) -> None:
+        """Removes the host breakers and the fallback."""
+
+        with self._lock:
+            self._hosts = {}
+            self.fallback = None
+
+
+CIRCUIT_BREAKER = CircuitBreaker()
@@ -0,0 +1,123 @@
+import concurrent.futures
+import contextlib
+import contextvars
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_BACKGROUND_EXECUTOR: contextvars.ContextVar[
+    Optional[concurrent.futures.ThreadPoolExecutor]
+] = contextvars.ContextVar("corva_background_executor", default=None)
+
+
+def submit_in_context(
+    executor: concurrent.futures.Executor, fn: Callable[..., R], *args: Any
+) -> "concurrent.futures.Future[R]":
+    """Submits the callable to run in a copy of the current context.
+
+    Executors don't propagate context variables to worker threads by default.
+    """
+
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+def map_grouped(
+    fn: Callable[[Sequence[T]], List[R]],
+    items: Sequence[T],
+    key: Callable[[T], Optional[Hashable]],
+    max_workers: int,
+) -> List[R]:
+    """Runs groups of items concurrently, keeping the order inside each group.
+
+    Items with the same key get into one group and are processed sequentially by
+    a single fn call. Items with None key get into separate groups.
+
+    Args:
+        fn: processes a group of items and returns one result per item.
+        items: items to process.
+        key: returns group key of the item.
+        max_workers: maximum number of groups processed at the same time.
+
+    Raises:
+        Exception: exception raised by fn for the group, which has the earliest
+            first item.
+
+    Returns:
+        Results in the order of the items.
+    """
+
+    groups: Dict[Hashable, List[int]] = {}
+
+    for idx, item in enumerate(items):
+        item_key = key(item)
+        groups.setdefault(idx if item_key is None else (item_key,), []).append(idx)
+
+    results: List[Any] = [None] * len(items)
+
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=min(max_workers, len(groups)) or 1
+    ) as executor:
+        futures = [
+            (
+                indexes,
+                submit_in_context(executor, fn, [items[idx] for idx in indexes]),
+            )
+            for indexes in groups.values()
+        ]
+
+        try:
+            for indexes, future in futures:
+                for idx, result in zip(indexes, future.result()):
+                    results[idx] = result
+        except BaseException:
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+
+    return results
+
+
+@contextlib.contextmanager
+def background_tasks(max_workers: int = 8) -> Iterator[None]:
+    """Runs callables passed to run_in_background concurrently.
+
+    Waits for all of them to finish on exit, so they complete before the Lambda
+    invocation ends.
+    """
+
+    executor = concurrent.futures.ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="corva-background"
+    )
+    token = _BACKGROUND_EXECUTOR.set(executor)
+
+    try:
+        yield
+    finally:
+        _BACKGROUND_EXECUTOR.reset(token)
+        executor.shutdown(wait=True)
+
+
+def run_in_background(fn: Callable[..., Any], *args: Any) -> None:
+    """Runs the callable in background, if inside background_tasks block.
+
+    Runs it right away otherwise. The callable must handle its own exceptions, as
+    nobody waits for its result.
+    """
+
+    executor = _BACKGROUND_EXECUTOR.get()
+
+    if executor is None:
+        fn(*args)
+        return
+
+    submit_in_context(executor, fn, *args)
@@ -1,5 +1,6 @@
 import datetime
 import logging
+from typing import Dict, Literal, Optional
 
 import pydantic_settings
 from pydantic import AnyHttpUrl, BeforeValidator, TypeAdapter
@@ -49,11 +50,25 @@ class Settings(pydantic_settings.BaseSettings):
     # cache
     CACHE_URL: str
     CACHE_SKIP_MIGRATION: int = 0
+    # seconds to wait for a free cache connection, when all of them are in use
+    CACHE_POOL_TIMEOUT: float = 5
 
     # logger
     LOG_LEVEL: str = 'INFO'
+    LOG_FORMAT: Literal['text', 'json'] = 'text'
     LOG_THRESHOLD_MESSAGE_SIZE: int = 1000
     LOG_THRESHOLD_MESSAGE_COUNT: int = 15
+    # error messages logged after reaching LOG_THRESHOLD_MESSAGE_COUNT. `0` keeps
+    # LOG_THRESHOLD_MESSAGE_COUNT a hard limit
+    LOG_THRESHOLD_ERROR_COUNT: int = 0
+    # messages with the same template logged in a row. `0` disables rate limiting
+    LOG_TEMPLATE_BURST: int = 0
+    # messages with the same template logged per second after the burst
+    LOG_TEMPLATE_RATE: float = 1.0
+    # logs are written to stdout in batches of this many chars. `0` disables buffering
+    LOG_BUFFER_SIZE: int = 64 * 1024
+    # max seconds logs stay in the buffer
+    LOG_BUFFER_FLUSH_INTERVAL: float = 1.0
 
     # company and app
     APP_KEY: str  # <provider-name-with-dashes>.<app-name-with-dashes>
@@ -61,6 +76,14 @@ class Settings(pydantic_settings.BaseSettings):
 
     # secrets
     SECRETS_CACHE_TTL: int = int(datetime.timedelta(minutes=5).total_seconds())
+    # serve expired secrets for this long, while refreshing them in background
+    SECRETS_CACHE_STALE_TTL: int = int(datetime.timedelta(minutes=1).total_seconds())
+    # serve expired secrets for this long, if unable to refresh them
+    SECRETS_CACHE_STALE_IF_ERROR_TTL: int = int(
+        datetime.timedelta(minutes=10).total_seconds()
+    )
+    # start refreshing secrets in background this long before they expire
+    SECRETS_CACHE_REFRESH_AHEAD: int = 30
 
     # keep-alive
     POOL_CONNECTIONS_COUNT: int = 20  # Total pools count
@@ -71,6 +94,61 @@ class Settings(pydantic_settings.BaseSettings):
     MAX_RETRY_COUNT: MaxRetryValidator = DEFAULT_MAX_RETRY_COUNT
     BACKOFF_FACTOR: float = 1.0
 
+    # tracing. Spans of invocation phases are exported as JSON lines
+    TRACING_EXPORTER: Literal['none', 'stdout', 'file'] = 'none'
+    TRACING_FILE: str = '/tmp/corva-traces.jsonl'
+
+    # metrics. Written to stdout in CloudWatch Embedded Metric Format
+    METRICS_ENABLED: bool = False
+    METRICS_NAMESPACE: str = 'Corva/SDK'
+
+    # performance report logged at the end of each invocation
+    PERF_REPORT: bool = False
+    # phase (span name) -> max total milliseconds. Example: '{"corva.app": 5000}'
+    PERF_BUDGETS_MS: Dict[str, float] = {}
+    # warn when remaining Lambda time gets below this
+    PERF_MIN_REMAINING_TIME_MS: float = 1000
+
+    # profiling. Fraction of invocations to profile, `0` disables profiling
+    PROFILE_SAMPLE_RATE: float = 0
+    # seconds between stack samples
+    PROFILE_INTERVAL: float = 0.01
+    # directory to save profiles to. Profiles are logged, if not set
+    PROFILE_DIR: Optional[str] = None
+
+    # time before the Lambda timeout kept for saving max record values,
+    # task statuses and schedule completions. Other calls fail without it
+    DEADLINE_RESERVE_MS: float = 2000
+
+    # rate limiting, shared by all Api instances. Max requests per second per host,
+    # `0` disables rate limiting
+    API_RATE_LIMIT: float = 0
+    # max concurrent requests per host, `0` disables concurrency limiting
+    API_CONCURRENCY_LIMIT: int = 0
+    # max ratio of retried requests to all requests per host,
+    # `0` disables the retry budget
+    API_RETRY_BUDGET_RATIO: float = 0
+    # retries allowed per host before any requests
+    API_RETRY_BUDGET_BURST: float = 10
+
+    # hedging. Slow GET requests are duplicated, the first response wins
+    API_HEDGING: bool = False
+    # max ratio of hedged requests to all GET requests per host
+    API_HEDGE_BUDGET_RATIO: float = 0.05
+    # hedges allowed per host before any requests
+    API_HEDGE_BUDGET_BURST: float = 2
+    # min delay before hedging, the delay is p95 of recent request latencies
+    API_HEDGE_MIN_DELAY_MS: float = 20
+
+    # circuit breaker, shared by all Api instances. Failed attempts in a row
+    # (connection errors, timeouts, 5xx statuses) that open the circuit of a host,
+    # `0` disables the circuit breaker
+    API_CIRCUIT_FAILURE_THRESHOLD: int = 0
+    # seconds requests to a host with open circuit fail fast before probing it
+    API_CIRCUIT_RESET_TIMEOUT: float = 30
+    # probe requests in flight allowed while the circuit is half-open
+    API_CIRCUIT_HALF_OPEN_MAX_CALLS: int = 1
+
     # OTEL
     OTEL_LOG_SENDING_DISABLED: bool = False
 
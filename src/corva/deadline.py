@@ -0,0 +1,129 @@
+"""Invocation deadline, which limits timeouts and retries of SDK calls.
+
+The deadline is read from the Lambda context once per invocation and is shared
+by all threads of the invocation through context variables. Api and cache calls
+fit their timeouts and retries into the time left before the deadline, minus
+`DEADLINE_RESERVE_MS` kept for the final writes (max record values, task
+statuses, schedule completions), which may use the reserve.
+"""
+
+import contextlib
+import contextvars
+import time
+from typing import Any, Iterator, Optional
+
+from corva.configuration import SETTINGS
+
+
+class DeadlineExceededError(Exception):
+    """Raised when there is no time left for the call before the Lambda timeout.
+
+    Not a TimeoutError subclass, as requests wraps OSErrors into ConnectionError.
+    """
+
+
+_DEADLINE: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    'corva_deadline', default=None
+)
+_USING_RESERVE: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    'corva_deadline_using_reserve', default=False
+)
+
+
+@contextlib.contextmanager
+def from_aws_context(aws_context: Any) -> Iterator[None]:
+    """Sets the deadline to the Lambda timeout for the code inside the context.
+
+    Does nothing, if the context does not provide remaining time.
+    """
+
+    get_remaining_time_in_millis = getattr(
+        aws_context, 'get_remaining_time_in_millis', None
+    )
+
+    if get_remaining_time_in_millis is None:
+        yield
+        return
+
+    with setting(time.monotonic() + get_remaining_time_in_millis() / 1000):
+        yield
+
+
+@contextlib.contextmanager
+def setting(deadline: Optional[float]) -> Iterator[None]:
+    """Sets the deadline (`time.monotonic` seconds) for the code inside the context."""
+
+    token = _DEADLINE.set(deadline)
+
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+@contextlib.contextmanager
+def using_reserve() -> Iterator[None]:
+    """Allows the code inside the context to use the reserved time."""
+
+    token = _USING_RESERVE.set(True)
+
+    try:
+        yield
+    finally:
+        _USING_RESERVE.reset(token)
+
+
+def get_remaining() -> Optional[float]:
+    """Returns seconds left before the deadline, None if there is no deadline."""
+
+    deadline = _DEADLINE.get()
+
+    if deadline is None:
+        return None
+
+    return deadline - time.monotonic()
+
+
+def get_budget() -> Optional[float]:
+    """Returns seconds available for calls, None if there is no deadline."""
+
+    budget = get_remaining()
+
+    if budget is None:
+        return None
+
+    if not _USING_RESERVE.get():
+        budget -= SETTINGS.DEADLINE_RESERVE_MS / 1000
+
+    return budget
+
+
+def check() -> Optional[float]:
+    """Returns the budget, raises if there is no time left.
+
+    Raises:
+        DeadlineExceededError: if the budget is exhausted.
+    """
+
+    budget = get_budget()
+
+    if budget is not None and budget <= 0:
+        raise DeadlineExceededError(
+            'Not enough time left before the Lambda timeout '
+            f'(reserve={SETTINGS.DEADLINE_RESERVE_MS}ms, '
+            f'using reserve={_USING_RESERVE.get()}).'
+        )
+
+    return budget
+
+
+def fit_timeout(timeout: float) -> float:
+    """Shrinks the timeout to fit the budget.
+
+    Raises:
+        DeadlineExceededError: if the budget is exhausted.
+    """
+
+    budget = check()
+
+    return timeout if budget is None else min(timeout, budget)
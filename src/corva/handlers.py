@@ -1,15 +1,19 @@
 import contextlib
 import functools
+import heapq
 import itertools
 import logging
-import sys
+import operator
 import warnings
 from typing import (
     Any,
     Callable,
     Dict,
+    Iterator,
     List,
     Optional,
+    Sequence,
+    Set,
     Tuple,
     Type,
     TypeVar,
@@ -20,22 +24,52 @@ from typing import (
 import pydantic
 import redis
 
+from corva import concurrency as corva_concurrency
+from corva import deadline, metrics, perf, profiling, tracing
 from corva.api import Api
 from corva.configuration import SETTINGS
-from corva.logger import CORVA_LOGGER, CorvaLoggerHandler, LoggingContext
+from corva.logger import (
+    CORVA_LOGGER,
+    STDOUT_BUFFER,
+    BufferedStreamHandler,
+    CorvaLoggerHandler,
+    LoggingContext,
+)
 from corva.models import validators
 from corva.models.base import RawBaseEvent
 from corva.models.context import CorvaContext
 from corva.models.merge.merge import PartialRerunMergeEvent
 from corva.models.merge.raw import RawPartialRerunMergeEvent
+from corva.models.scheduled.prefetch import DatasetSpec, Prefetched
 from corva.models.scheduled.raw import RawScheduledDataTimeEvent, RawScheduledEvent
-from corva.models.scheduled.scheduled import ScheduledEvent, ScheduledNaturalTimeEvent
+from corva.models.scheduled.scheduled import (
+    ScheduledDataTimeEvent,
+    ScheduledEvent,
+    ScheduledNaturalTimeEvent,
+)
 from corva.models.scheduled.scheduler_type import SchedulerType
-from corva.models.stream.raw import RawStreamEvent
-from corva.models.stream.stream import StreamEvent
+from corva.models.stream.columns import records_to_columns
+from corva.models.stream.compact import (
+    CompactDepthRecord,
+    CompactRecords,
+    CompactTimeRecord,
+)
+from corva.models.stream.log_type import LogType
+from corva.models.stream.raw import RawStreamDictsEvent, RawStreamEvent, RecordsAs
+from corva.models.stream.stream import (
+    StreamColumnsEvent,
+    StreamCompactEvent,
+    StreamDictsEvent,
+    StreamEvent,
+)
 from corva.models.task import RawTaskEvent, TaskEvent, TaskStatus
 from corva.service import service
-from corva.service.api_sdk import CachingApiSdk, CorvaApiSdk
+from corva.service.api_sdk import (
+    ApiSdkProtocol,
+    CachingApiSdk,
+    CorvaApiSdk,
+    PrefetchingApiSdk,
+)
 from corva.service.cache_sdk import UserRedisSdk
 from corva.validate_app_init import validate_app_type_context
 
@@ -62,22 +96,92 @@ def get_cache_key(
     )
 
 
+def validate_concurrency(concurrency: int) -> None:
+    if concurrency < 1:
+        raise ValueError(f"concurrency must be positive, got {concurrency}.")
+
+
+def get_api_sdk(api: Api, prefetch: bool) -> ApiSdkProtocol:
+    """Returns secrets api sdk.
+
+    Arguments:
+        prefetch: if True - start fetching the secrets right away. Apps call it
+          before other invocation setup steps to overlap them with the fetch.
+    """
+
+    api_sdk = CachingApiSdk(
+        api_sdk=CorvaApiSdk(api_adapter=api),
+        ttl=SETTINGS.SECRETS_CACHE_TTL,
+        stale_ttl=SETTINGS.SECRETS_CACHE_STALE_TTL,
+        stale_if_error_ttl=SETTINGS.SECRETS_CACHE_STALE_IF_ERROR_TTL,
+        refresh_ahead=SETTINGS.SECRETS_CACHE_REFRESH_AHEAD,
+    )
+
+    if not prefetch:
+        return api_sdk
+
+    return PrefetchingApiSdk(api_sdk=api_sdk, app_key=SETTINGS.APP_KEY)
+
+
+def get_corva_logger_handler() -> CorvaLoggerHandler:
+    return CorvaLoggerHandler(
+        max_message_size=SETTINGS.LOG_THRESHOLD_MESSAGE_SIZE,
+        max_message_count=SETTINGS.LOG_THRESHOLD_MESSAGE_COUNT,
+        logger=CORVA_LOGGER,
+        placeholder=" ...",
+        max_error_count=SETTINGS.LOG_THRESHOLD_ERROR_COUNT,
+        template_burst=SETTINGS.LOG_TEMPLATE_BURST,
+        template_rate=SETTINGS.LOG_TEMPLATE_RATE,
+    )
+
+
+def get_base_logging_context(
+    aws_request_id: str, user_handler: Optional[logging.Handler]
+) -> LoggingContext:
+    return LoggingContext(
+        aws_request_id=aws_request_id,
+        asset_id=None,
+        app_connection_id=None,
+        handler=BufferedStreamHandler(),
+        user_handler=user_handler,
+        logger=CORVA_LOGGER,
+    )
+
+
 def base_handler(
     func: Callable,
     raw_event_type: Type[RawBaseEvent],
     handler: Optional[logging.Handler],
     merge_events: bool = False,
+    raw_event_parser: Optional[Callable[[Any], Sequence[Any]]] = None,
+    concurrency: int = 1,
 ) -> Callable[[Any, Any], List[Any]]:
+    """Wraps the app into Lambda handler.
+
+    Arguments:
+        raw_event_parser: parses the incoming event for direct app calls instead of
+          `raw_event_type.from_raw_event`.
+        concurrency: maximum number of events processed at the same time.
+          Events of the same asset are always processed one by one in the
+          incoming order.
+    """
+
     @functools.wraps(func)
     def wrapper(aws_event: Any, aws_context: Any) -> List[Any]:
-        with LoggingContext(
-            aws_request_id=aws_context.aws_request_id,
-            asset_id=None,
-            app_connection_id=None,
-            handler=logging.StreamHandler(stream=sys.stdout),
-            user_handler=handler,
-            logger=CORVA_LOGGER,
-        ) as logging_ctx:
+        # metrics are flushed before logs, so they get into the same stdout batch
+        with STDOUT_BUFFER.flushing(), metrics.collecting(), get_base_logging_context(
+            aws_request_id=aws_context.aws_request_id, user_handler=handler
+        ) as logging_ctx, deadline.from_aws_context(
+            aws_context
+        ), perf.reporting(aws_context), profiling.profiling(
+            aws_context.aws_request_id
+        ), tracing.span(
+            'corva.invocation',
+            {
+                'faas.invocation_id': aws_context.aws_request_id,
+                'code.function': func.__name__,
+            },
+        ):
             # Verify either current call from app_decorator or not
             # for instance from partial rerun merge
             (
@@ -101,31 +205,71 @@ def base_handler(
 
             if is_direct_app_call:
                 # Means current app call is not RawPartialRerunMergeEvent or similar
-                validate_app_type_context(aws_event, raw_event_type)
+                with tracing.span('corva.validate_event'):
+                    validate_app_type_context(aws_event, raw_event_type)
 
             try:
                 context = CorvaContext.from_aws(
                     aws_event=aws_event, aws_context=aws_context
                 )
 
-                redis_client = redis.Redis.from_url(
-                    url=SETTINGS.CACHE_URL, decode_responses=True, max_connections=1
+                redis_client = redis.Redis(
+                    connection_pool=redis.BlockingConnectionPool.from_url(
+                        url=SETTINGS.CACHE_URL,
+                        decode_responses=True,
+                        max_connections=concurrency,
+                        # app threads beyond `concurrency` wait for a connection
+                        timeout=SETTINGS.CACHE_POOL_TIMEOUT,
+                        # cache calls must not outlive the invocation
+                        socket_timeout=deadline.get_remaining(),
+                    )
                 )
-                raw_events = data_transformation_type.from_raw_event(event=aws_event)
-                specific_callable = custom_handler or func
-
-                results = [
-                    specific_callable(
-                        raw_event,
-                        context.api_key,
-                        context.aws_request_id,
-                        logging_ctx,
-                        redis_client,
+                with tracing.span('corva.parse_event') as parse_span:
+                    if is_direct_app_call and raw_event_parser is not None:
+                        raw_events = raw_event_parser(aws_event)
+                    else:
+                        raw_events = data_transformation_type.from_raw_event(
+                            event=aws_event
+                        )
+                    parse_span.set_attribute('corva.event_count', len(raw_events))
+                specific_callable = trace_event(custom_handler or func)
+
+                # schedule completions are sent while the next events are run
+                with corva_concurrency.background_tasks():
+                    if concurrency == 1 or len(raw_events) < 2:
+                        return [
+                            specific_callable(
+                                raw_event,
+                                context.api_key,
+                                context.aws_request_id,
+                                logging_ctx,
+                                redis_client,
+                            )
+                            for raw_event in raw_events
+                        ]
+
+                    def run_events(events: Sequence[Any]) -> List[Any]:
+                        # each worker gets its own logging context, as apps modify it
+                        with get_base_logging_context(
+                            aws_request_id=context.aws_request_id, user_handler=handler
+                        ) as worker_logging_ctx:
+                            return [
+                                specific_callable(
+                                    event,
+                                    context.api_key,
+                                    context.aws_request_id,
+                                    worker_logging_ctx,
+                                    redis_client,
+                                )
+                                for event in events
+                            ]
+
+                    return corva_concurrency.map_grouped(
+                        fn=run_events,
+                        items=raw_events,
+                        key=get_event_asset_id,
+                        max_workers=concurrency,
                     )
-                    for raw_event in raw_events
-                ]
-
-                return results
 
             except Exception:
                 CORVA_LOGGER.exception("The app failed to execute.")
@@ -134,11 +278,36 @@ def base_handler(
     return wrapper
 
 
+def get_event_asset_id(event: Any) -> Optional[int]:
+    if isinstance(event, RawPartialRerunMergeEvent):
+        return event.data.asset_id
+
+    return getattr(event, "asset_id", None)
+
+
+def trace_event(func: Callable) -> Callable:
+    """Runs each event processing inside its own span, if tracing is enabled."""
+
+    if not tracing.is_enabled():
+        return func
+
+    @functools.wraps(func)
+    def wrapper(event: Any, *args: Any) -> Any:
+        with tracing.span('corva.event', {'corva.asset_id': get_event_asset_id(event)}):
+            return func(event, *args)
+
+    return wrapper
+
+
 def stream(
     func: Optional[Callable[[StreamEventT, Api, UserRedisSdk], Any]] = None,
     *,
     handler: Optional[logging.Handler] = None,
     merge_events: bool = False,
+    records_as: RecordsAs = "models",
+    concurrency: int = 1,
+    late_records_window: Optional[float] = None,
+    late_records_resolution: float = 1,
 ) -> Callable:
     """Runs stream app.
 
@@ -146,10 +315,43 @@ def stream(
         handler: logging handler to include in Corva logger.
         merge_events: if True - merge all incoming events into one before
           passing them to func
+        records_as: how to pass the records to func. "models" - as a
+          StreamTimeEvent or StreamDepthEvent; "dicts" - as a StreamDictsEvent with
+          raw record dicts; "columns" - as a StreamColumnsEvent with a column table;
+          "compact" - as a StreamCompactEvent with slotted records, that read
+          fields from raw record dicts. "dicts", "columns" and "compact" skip
+          building a pydantic model for every record.
+        concurrency: maximum number of incoming events processed at the same time
+          in a thread pool. Events of the same asset are processed one by one.
+        late_records_window: if set - accept records, that arrive out of order and
+          are up to this many seconds (feet for depth apps) behind the max processed
+          record value, exactly once. By default such records are dropped.
+        late_records_resolution: granularity of the late records window. Records
+          that fall into the same bucket of this size are considered duplicates.
     """
 
     if func is None:
-        return functools.partial(stream, handler=handler, merge_events=merge_events)
+        return functools.partial(
+            stream,
+            handler=handler,
+            merge_events=merge_events,
+            records_as=records_as,
+            concurrency=concurrency,
+            late_records_window=late_records_window,
+            late_records_resolution=late_records_resolution,
+        )
+
+    if records_as not in ("models", "dicts", "columns", "compact"):
+        raise ValueError(f"Unsupported records_as value: {records_as!r}.")
+
+    validate_concurrency(concurrency)
+
+    if late_records_window is not None and (
+        late_records_window <= 0 or late_records_resolution <= 0
+    ):
+        raise ValueError(
+            "late_records_window and late_records_resolution must be positive."
+        )
 
     @functools.wraps(func)
     @functools.partial(
@@ -157,9 +359,13 @@ def stream(
         raw_event_type=RawStreamEvent,
         handler=handler,
         merge_events=merge_events,
+        raw_event_parser=(
+            None if records_as == "models" else RawStreamDictsEvent.from_raw_event
+        ),
+        concurrency=concurrency,
     )
     def wrapper(
-        event: RawStreamEvent,
+        event: Union[RawStreamEvent, RawStreamDictsEvent],
         api_key: str,
         aws_request_id: str,
         logging_ctx: LoggingContext,
@@ -188,37 +394,50 @@ def stream(
             hash_name=hash_name, redis_dsn=SETTINGS.CACHE_URL, redis_client=redis_client
         )
 
-        records = event.filter_records(
-            old_max_record_value=event.get_cached_max_record_value(cache=user_cache_sdk)
+        with tracing.span('corva.filter_records') as filter_span:
+            old_max_record_value = event.get_cached_max_record_value(
+                cache=user_cache_sdk
+            )
+            window = (
+                None
+                if late_records_window is None
+                else event.get_cached_late_records_window(
+                    cache=user_cache_sdk,
+                    size=late_records_window,
+                    resolution=late_records_resolution,
+                )
+            )
+
+            records = event.filter_records(
+                old_max_record_value=old_max_record_value, window=window
+            )
+            filter_span.set_attribute('corva.records_received', len(event.records))
+            filter_span.set_attribute('corva.record_count', len(records))
+
+        metrics.increment('stream.records_received', len(event.records))
+        metrics.increment(
+            'stream.records_filtered', len(event.records) - len(records)
         )
 
         if not records:
             # we've got the duplicate data if there are no records left after filtering
             return
 
-        app_event = event.metadata.log_type.event.model_validate(
-            event.model_copy(update={"records": records}, deep=True).model_dump()
+        app_event = get_stream_app_event(
+            event=event, records=records, records_as=records_as
         )
         with LoggingContext(
             aws_request_id=aws_request_id,
             asset_id=event.asset_id,
             app_connection_id=event.app_connection_id,
-            handler=CorvaLoggerHandler(
-                max_message_size=SETTINGS.LOG_THRESHOLD_MESSAGE_SIZE,
-                max_message_count=SETTINGS.LOG_THRESHOLD_MESSAGE_COUNT,
-                logger=CORVA_LOGGER,
-                placeholder=" ...",
-            ),
+            handler=get_corva_logger_handler(),
             user_handler=handler,
             logger=CORVA_LOGGER,
         ):
             result = service.run_app(
                 has_secrets=event.has_secrets,
                 app_key=SETTINGS.APP_KEY,
-                api_sdk=CachingApiSdk(
-                    api_sdk=CorvaApiSdk(api_adapter=api),
-                    ttl=SETTINGS.SECRETS_CACHE_TTL,
-                ),
+                api_sdk=get_api_sdk(api=api, prefetch=False),
                 app=functools.partial(
                     cast(Callable[[StreamEvent, Api, UserRedisSdk], Any], func),
                     app_event,
@@ -228,7 +447,15 @@ def stream(
             )
 
         try:
-            event.set_cached_max_record_value(cache=user_cache_sdk)
+            with tracing.span('corva.save_max_record_value'), deadline.using_reserve():
+                if window is None:
+                    event.set_cached_max_record_value(cache=user_cache_sdk)
+                else:
+                    event.set_cached_late_records_window(
+                        cache=user_cache_sdk,
+                        window=window,
+                        old_max_record_value=old_max_record_value,
+                    )
         except Exception as e:
             # lambda succeeds if we're unable to cache the value
             CORVA_LOGGER.warning(f"Could not save data to cache. Details: {str(e)}.")
@@ -238,11 +465,85 @@ def stream(
     return wrapper
 
 
+def get_stream_app_event(
+    event: Union[RawStreamEvent, RawStreamDictsEvent],
+    records: Sequence[Any],
+    records_as: RecordsAs,
+) -> StreamEvent:
+    if isinstance(event, RawStreamEvent):
+        return event.metadata.log_type.event.model_validate(
+            event.model_copy(update={"records": records}, deep=True).model_dump()
+        )
+
+    # fields were validated while parsing the raw event - skip validation
+    fields: Dict[str, Any] = {
+        "asset_id": event.asset_id,
+        "company_id": event.company_id,
+        "log_identifier": event.log_identifier,
+        "rerun": event.rerun,
+    }
+
+    if records_as == "columns":
+        return StreamColumnsEvent.model_construct(
+            columns=records_to_columns(records), **fields
+        )
+
+    if records_as == "compact":
+        return StreamCompactEvent.model_construct(
+            records=CompactRecords(
+                raw=list(records),
+                record_type=(
+                    CompactTimeRecord
+                    if event.metadata.log_type == LogType.time
+                    else CompactDepthRecord
+                ),
+            ),
+            **fields,
+        )
+
+    return StreamDictsEvent.model_construct(records=list(records), **fields)
+
+
+@contextlib.contextmanager
+def prefetch_datasets(
+    specs: Sequence[DatasetSpec], event: ScheduledEvent, api: Api
+) -> Iterator[Prefetched]:
+    """Starts fetching the datasets for the data time event time range.
+
+    Unfinished fetches are abandoned on exit, as the app doesn't need them anymore.
+    """
+
+    if not specs or not isinstance(event, ScheduledDataTimeEvent):
+        yield event.prefetched
+        return
+
+    query = {
+        "asset_id": event.asset_id,
+        "timestamp": {"$gte": event.start_time, "$lte": event.end_time},
+    }
+    sort = {"timestamp": 1}
+
+    prefetched = Prefetched.start(
+        {
+            spec.key: functools.partial(spec.fetch, api, query=query, sort=sort)
+            for spec in specs
+        }
+    )
+    event.set_prefetched(prefetched)
+
+    try:
+        yield prefetched
+    finally:
+        prefetched.close()
+
+
 def scheduled(
     func: Optional[Callable[[ScheduledEventT, Api, UserRedisSdk], Any]] = None,
     *,
     handler: Optional[logging.Handler] = None,
     merge_events: bool = False,
+    concurrency: int = 1,
+    prefetch: Sequence[DatasetSpec] = (),
 ) -> Callable:
     """Runs scheduled app.
 
@@ -250,10 +551,26 @@ def scheduled(
         handler: logging handler to include in Corva logger.
         merge_events: if True - merge all incoming events into one before
           passing them to func
+        concurrency: maximum number of incoming events processed at the same time
+          in a thread pool. Events of the same asset are processed one by one.
+        prefetch: datasets to fetch for the data time event time range. Fetches
+          start concurrently before the app is run and the results are available
+          in `event.prefetched`.
     """
 
     if func is None:
-        return functools.partial(scheduled, handler=handler, merge_events=merge_events)
+        return functools.partial(
+            scheduled,
+            handler=handler,
+            merge_events=merge_events,
+            concurrency=concurrency,
+            prefetch=prefetch,
+        )
+
+    validate_concurrency(concurrency)
+
+    if len({spec.key for spec in prefetch}) != len(prefetch):
+        raise ValueError("Prefetched dataset names must be unique.")
 
     @functools.wraps(func)
     @functools.partial(
@@ -261,6 +578,7 @@ def scheduled(
         raw_event_type=RawScheduledEvent,
         handler=handler,
         merge_events=merge_events,
+        concurrency=concurrency,
     )
     def wrapper(
         event: RawScheduledEvent,
@@ -280,18 +598,6 @@ def scheduled(
             app_connection_id=event.app_connection_id,
         )
 
-        hash_name = get_cache_key(
-            provider=SETTINGS.PROVIDER,
-            asset_id=event.asset_id,
-            app_stream_id=event.app_stream_id,
-            app_key=SETTINGS.APP_KEY,
-            app_connection_id=event.app_connection_id,
-        )
-
-        user_cache_sdk = UserRedisSdk(
-            hash_name=hash_name, redis_dsn=SETTINGS.CACHE_URL, redis_client=redis_client
-        )
-
         if isinstance(event, RawScheduledDataTimeEvent) and event.merge_metadata:
             event = event.rebuild_with_modified_times(
                 event.merge_metadata.start_time, event.merge_metadata.end_time
@@ -299,52 +605,126 @@ def scheduled(
 
         app_event = event.scheduler_type.event.model_validate(event.model_dump())
 
-        with LoggingContext(
-            aws_request_id=aws_request_id,
-            asset_id=event.asset_id,
-            app_connection_id=event.app_connection_id,
-            handler=CorvaLoggerHandler(
-                max_message_size=SETTINGS.LOG_THRESHOLD_MESSAGE_SIZE,
-                max_message_count=SETTINGS.LOG_THRESHOLD_MESSAGE_COUNT,
-                logger=CORVA_LOGGER,
-                placeholder=" ...",
-            ),
-            user_handler=handler,
-            logger=CORVA_LOGGER,
+        # datasets get fetched while the rest of the invocation is set up
+        with prefetch_datasets(
+            specs=prefetch, event=cast(ScheduledEvent, app_event), api=api
         ):
-            try:
-                result = service.run_app(
-                    has_secrets=event.has_secrets,
-                    app_key=SETTINGS.APP_KEY,
-                    api_sdk=CachingApiSdk(
-                        api_sdk=CorvaApiSdk(api_adapter=api),
-                        ttl=SETTINGS.SECRETS_CACHE_TTL,
-                    ),
-                    app=functools.partial(
-                        cast(Callable[[ScheduledEvent, Api, UserRedisSdk], Any], func),
-                        cast(ScheduledEvent, app_event),
-                        api,
-                        user_cache_sdk,
-                    ),
-                )
-            except Exception:
-                if isinstance(app_event, ScheduledNaturalTimeEvent):
-                    set_schedule_as_completed(event=event, api=api)
-                raise
-            else:
-                set_schedule_as_completed(event=event, api=api)
+            api_sdk = get_api_sdk(api=api, prefetch=event.has_secrets)
 
-        return result
+            hash_name = get_cache_key(
+                provider=SETTINGS.PROVIDER,
+                asset_id=event.asset_id,
+                app_stream_id=event.app_stream_id,
+                app_key=SETTINGS.APP_KEY,
+                app_connection_id=event.app_connection_id,
+            )
+
+            user_cache_sdk = UserRedisSdk(
+                hash_name=hash_name,
+                redis_dsn=SETTINGS.CACHE_URL,
+                redis_client=redis_client,
+            )
+
+            return _run_scheduled_app(
+                func=func,
+                event=event,
+                app_event=cast(ScheduledEvent, app_event),
+                api=api,
+                api_sdk=api_sdk,
+                user_cache_sdk=user_cache_sdk,
+                aws_request_id=aws_request_id,
+                handler=handler,
+            )
 
     return wrapper
 
 
-def set_schedule_as_completed(event: RawScheduledEvent, api: Api) -> None:
-    try:
-        event.set_schedule_as_completed(api=api)
-    except Exception as e:
-        # lambda succeeds if we're unable to set completed status
-        CORVA_LOGGER.warning(f"Could not set schedule as completed. Details: {str(e)}.")
+def _run_scheduled_app(
+    func: Callable[[ScheduledEventT, Api, UserRedisSdk], Any],
+    event: RawScheduledEvent,
+    app_event: ScheduledEvent,
+    api: Api,
+    api_sdk: ApiSdkProtocol,
+    user_cache_sdk: UserRedisSdk,
+    aws_request_id: str,
+    handler: Optional[logging.Handler],
+) -> Any:
+    with LoggingContext(
+        aws_request_id=aws_request_id,
+        asset_id=event.asset_id,
+        app_connection_id=event.app_connection_id,
+        handler=get_corva_logger_handler(),
+        user_handler=handler,
+        logger=CORVA_LOGGER,
+    ):
+        try:
+            result = service.run_app(
+                has_secrets=event.has_secrets,
+                app_key=SETTINGS.APP_KEY,
+                api_sdk=api_sdk,
+                app=functools.partial(
+                    cast(Callable[[ScheduledEvent, Api, UserRedisSdk], Any], func),
+                    app_event,
+                    api,
+                    user_cache_sdk,
+                ),
+            )
+        except Exception:
+            if isinstance(app_event, ScheduledNaturalTimeEvent):
+                set_schedule_as_completed(
+                    event=event,
+                    api=api,
+                    aws_request_id=aws_request_id,
+                    handler=handler,
+                )
+            raise
+        else:
+            set_schedule_as_completed(
+                event=event,
+                api=api,
+                aws_request_id=aws_request_id,
+                handler=handler,
+            )
+
+    return result
+
+
+def set_schedule_as_completed(
+    event: RawScheduledEvent,
+    api: Api,
+    aws_request_id: str,
+    handler: Optional[logging.Handler],
+) -> None:
+    corva_concurrency.run_in_background(
+        _set_schedule_as_completed, event, api, aws_request_id, handler
+    )
+
+
+def _set_schedule_as_completed(
+    event: RawScheduledEvent,
+    api: Api,
+    aws_request_id: str,
+    handler: Optional[logging.Handler],
+) -> None:
+    # the task may outlive the app's logging context, so it gets its own
+    with LoggingContext(
+        aws_request_id=aws_request_id,
+        asset_id=event.asset_id,
+        app_connection_id=event.app_connection_id,
+        handler=get_corva_logger_handler(),
+        user_handler=handler,
+        logger=CORVA_LOGGER,
+    ):
+        try:
+            with tracing.span(
+                'corva.set_schedule_as_completed'
+            ), deadline.using_reserve():
+                event.set_schedule_as_completed(api=api)
+        except Exception as e:
+            # lambda succeeds if we're unable to set completed status
+            CORVA_LOGGER.warning(
+                f"Could not set schedule as completed. Details: {str(e)}."
+            )
 
 
 def task(
@@ -384,9 +764,11 @@ def task(
             app_key=SETTINGS.APP_KEY,
             app_connection_id=None,
         )
+        api_sdk = get_api_sdk(api=api, prefetch=event.has_secrets)
 
         try:
-            app_event = event.get_task_event(api=api)
+            with tracing.span('corva.get_task_event'):
+                app_event = event.get_task_event(api=api)
 
             logging_ctx.asset_id = app_event.asset_id
 
@@ -394,22 +776,14 @@ def task(
                 aws_request_id=aws_request_id,
                 asset_id=app_event.asset_id,
                 app_connection_id=None,
-                handler=CorvaLoggerHandler(
-                    max_message_size=SETTINGS.LOG_THRESHOLD_MESSAGE_SIZE,
-                    max_message_count=SETTINGS.LOG_THRESHOLD_MESSAGE_COUNT,
-                    logger=CORVA_LOGGER,
-                    placeholder=" ...",
-                ),
+                handler=get_corva_logger_handler(),
                 user_handler=handler,
                 logger=CORVA_LOGGER,
             ):
                 result = service.run_app(
                     has_secrets=event.has_secrets,
                     app_key=SETTINGS.APP_KEY,
-                    api_sdk=CachingApiSdk(
-                        api_sdk=CorvaApiSdk(api_adapter=api),
-                        ttl=SETTINGS.SECRETS_CACHE_TTL,
-                    ),
+                    api_sdk=api_sdk,
                     app=functools.partial(
                         cast(Callable[[TaskEvent, Api], Any], func), app_event, api
                     ),
@@ -436,11 +810,12 @@ def task(
 
         finally:
             try:
-                event.update_task_data(
-                    api=api,
-                    status=status,
-                    data=data,
-                ).raise_for_status()
+                with tracing.span('corva.update_task_data'), deadline.using_reserve():
+                    event.update_task_data(
+                        api=api,
+                        status=status,
+                        data=data,
+                    ).raise_for_status()
             except Exception as e:
                 # lambda succeeds if we're unable to update task data
                 CORVA_LOGGER.warning(f"Could not update task data. Details: {str(e)}.")
@@ -481,6 +856,7 @@ def partial_rerun_merge(
             api_key=api_key,
             app_key=SETTINGS.APP_KEY,
         )
+        api_sdk = get_api_sdk(api=api, prefetch=event.has_secrets)
 
         asset_cache_hash_name = get_cache_key(
             provider=SETTINGS.PROVIDER,
@@ -514,22 +890,14 @@ def partial_rerun_merge(
             aws_request_id=aws_request_id,
             asset_id=event.data.asset_id,
             app_connection_id=event.data.app_connection_id,
-            handler=CorvaLoggerHandler(
-                max_message_size=SETTINGS.LOG_THRESHOLD_MESSAGE_SIZE,
-                max_message_count=SETTINGS.LOG_THRESHOLD_MESSAGE_COUNT,
-                logger=CORVA_LOGGER,
-                placeholder=" ...",
-            ),
+            handler=get_corva_logger_handler(),
             user_handler=handler,
             logger=CORVA_LOGGER,
         ):
             result = service.run_app(
                 has_secrets=event.has_secrets,
                 app_key=SETTINGS.APP_KEY,
-                api_sdk=CachingApiSdk(
-                    api_sdk=CorvaApiSdk(api_adapter=api),
-                    ttl=SETTINGS.SECRETS_CACHE_TTL,
-                ),
+                api_sdk=api_sdk,
                 app=functools.partial(
                     cast(
                         Callable[
@@ -620,8 +988,7 @@ def _merge_events(
 
     elif data_transformation_type is RawStreamEvent:
         # stream event
-        for event in aws_event[1:]:
-            aws_event[0]["records"].extend(event["records"])
+        aws_event[0]["records"] = _merge_stream_records(aws_event)
         aws_event = [aws_event[0]]
 
     else:
@@ -631,3 +998,91 @@ def _merge_events(
         )
 
     return aws_event
+
+
+def _merge_stream_records(aws_event: List[dict]) -> List[Any]:
+    """
+    Merges records of stream events into one list sorted by record value
+    (timestamp for time events and measured depth for depth events).
+    Uses k-way merge, as records of each event are usually sorted already.
+    Records without data are dropped. Duplicate records (same record value and
+    collection) are kept only once.
+    If any event is completed - single "completed" record is put at the end.
+    """
+    log_type = LogType(aws_event[0]["metadata"]["log_type"])
+    value_key = "timestamp" if log_type == LogType.time else "measured_depth"
+
+    completed_record = None
+    records_per_event: List[List[Any]] = []
+
+    for event in aws_event:
+        records = list(event["records"])
+
+        if records and _get_record_field(records[-1], "collection") == "wits.completed":
+            completed_record = records.pop()
+
+        # validation drops such records later, they must not shadow their
+        # duplicates with data
+        records_per_event.append(
+            [
+                record
+                for record in records
+                if _get_record_field(record, "data") is not None
+            ]
+        )
+
+    values_per_event = [
+        [_get_record_field(record, value_key) for record in records]
+        for records in records_per_event
+    ]
+
+    if not all(
+        isinstance(value, (int, float)) and not isinstance(value, bool)
+        for values in values_per_event
+        for value in values
+    ):
+        # invalid records - leave the order as is, validation will report them
+        merged = list(itertools.chain.from_iterable(records_per_event))
+    else:
+        sorted_events = [
+            (
+                zip(values, itertools.repeat(idx), records)
+                if all(prev <= cur for prev, cur in zip(values, values[1:]))
+                else sorted(
+                    zip(values, itertools.repeat(idx), records),
+                    key=operator.itemgetter(0),
+                )
+            )
+            for idx, (values, records) in enumerate(
+                zip(values_per_event, records_per_event)
+            )
+        ]
+
+        merged = []
+        current_value = None
+        # records are sorted, so only collections of the current value are kept
+        seen_collections: Set[Any] = set()
+        # event index breaks ties, so records are never compared to each other
+        for value, _, record in heapq.merge(*sorted_events, key=lambda item: item[:2]):
+            if value != current_value:
+                current_value = value
+                seen_collections.clear()
+
+            collection = _get_record_field(record, "collection")
+
+            if collection in seen_collections:
+                continue
+
+            seen_collections.add(collection)
+            merged.append(record)
+
+    if completed_record is not None:
+        merged.append(completed_record)
+
+    return merged
+
+
+def _get_record_field(record: Any, name: str) -> Any:
+    if isinstance(record, dict):
+        return record.get(name)
+    return getattr(record, name, None)
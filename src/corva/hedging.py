@@ -0,0 +1,180 @@
+"""Hedged Corva API GET requests.
+
+If a GET request takes longer than the recent p95 latency of the host, a
+duplicate request is sent and the first response wins. Hedges are limited to a
+fraction of requests and are not sent while the host throttles requests.
+Enabled with the `API_HEDGING` setting.
+"""
+
+import collections
+import concurrent.futures
+import threading
+import time
+from typing import Callable, Deque, Dict, Optional
+
+import requests
+
+from corva import metrics
+from corva.concurrency import submit_in_context
+from corva.configuration import SETTINGS
+from corva.rate_limit import RATE_LIMITER
+
+
+class HostHedger:
+    """Latencies and hedge budget of a host.
+
+    Args:
+        budget_ratio: max ratio of hedged requests to all requests.
+        budget_burst: hedges allowed before any requests.
+        min_delay: min seconds to wait before hedging.
+    """
+
+    WINDOW = 100  # latest latencies to derive the delay from
+    MIN_SAMPLES = 20
+    PERCENTILE = 0.95
+
+    def __init__(self, budget_ratio: float, budget_burst: float, min_delay: float):
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self.min_delay = min_delay
+        self.tokens = budget_burst
+        self.latencies: Deque[float] = collections.deque(maxlen=self.WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+
+    def on_request(self) -> Optional[float]:
+        """Adds hedge tokens. Returns seconds to wait before hedging, if known."""
+
+        with self._lock:
+            self.tokens = min(self.budget_burst, self.tokens + self.budget_ratio)
+
+            if len(self.latencies) < self.MIN_SAMPLES:
+                return None
+
+            latencies = sorted(self.latencies)
+
+        return max(
+            latencies[int(self.PERCENTILE * (len(latencies) - 1))], self.min_delay
+        )
+
+    def try_hedge(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+
+            self.tokens -= 1
+            return True
+
+
+class Hedger:
+    """Host hedgers of the process."""
+
+    MAX_WORKERS = 32
+
+    def __init__(self) -> None:
+        self._hosts: Dict[str, HostHedger] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+    def get(self, host: str) -> HostHedger:
+        hedger = self._hosts.get(host)
+
+        if hedger is not None:
+            return hedger
+
+        with self._lock:
+            return self._hosts.setdefault(
+                host,
+                HostHedger(
+                    budget_ratio=SETTINGS.API_HEDGE_BUDGET_RATIO,
+                    budget_burst=SETTINGS.API_HEDGE_BUDGET_BURST,
+                    min_delay=SETTINGS.API_HEDGE_MIN_DELAY_MS / 1000,
+                ),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hosts = {}
+
+    def _get_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.MAX_WORKERS, thread_name_prefix='corva-hedge'
+                    )
+
+        return self._executor
+
+    def run(
+        self, host: str, request: Callable[[], requests.Response]
+    ) -> requests.Response:
+        """Runs the request, hedging it if it gets slow."""
+
+        hedger = self.get(host)
+        delay = hedger.on_request()
+
+        if delay is None:
+            return _timed(hedger, request)
+
+        executor = self._get_executor()
+        primary = submit_in_context(executor, _timed, hedger, request)
+
+        try:
+            return primary.result(timeout=delay)
+        except concurrent.futures.TimeoutError:
+            pass
+
+        if RATE_LIMITER.get(host).is_throttled() or not hedger.try_hedge():
+            return primary.result()
+
+        metrics.increment('api.hedge.fired')
+        hedge = submit_in_context(executor, _timed, hedger, request)
+
+        done, _ = concurrent.futures.wait(
+            (primary, hedge), return_when=concurrent.futures.FIRST_COMPLETED
+        )
+        # prefer a successful response, if the first one failed
+        winner = next(
+            (future for future in (primary, hedge) if future in done),
+            primary,
+        )
+
+        if winner.exception() is not None:
+            other = hedge if winner is primary else primary
+            concurrent.futures.wait((other,))
+
+            if other.exception() is None:
+                winner = other
+
+        loser = hedge if winner is primary else primary
+
+        # requests can't be interrupted, the loser is dropped when it finishes
+        if not loser.cancel():
+            loser.add_done_callback(_close_response)
+
+        if winner is hedge:
+            metrics.increment('api.hedge.won')
+
+        return winner.result()
+
+
+def _timed(
+    hedger: HostHedger, request: Callable[[], requests.Response]
+) -> requests.Response:
+    start = time.perf_counter()
+    response = request()
+    hedger.record(time.perf_counter() - start)
+
+    return response
+
+
+def _close_response(future: 'concurrent.futures.Future[requests.Response]') -> None:
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+HEDGER = Hedger()
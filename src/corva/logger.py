@@ -1,10 +1,16 @@
+import atexit
 import contextlib
+import contextvars
+import functools
+import json
 import logging
 import sys
+import threading
 import time
 from contextlib import suppress
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
 
+from corva import metrics
 from corva.configuration import SETTINGS
 
 logging.Formatter.converter = time.gmtime  # log time as UTC
@@ -50,6 +56,29 @@ def _gather_otel_handlers_from_root() -> list[logging.Handler]:
 def get_formatter(
     aws_request_id: bool, asset_id: bool, app_connection_id: bool
 ) -> logging.Formatter:
+    """Returns the formatter for LOG_FORMAT setting, that includes the fields."""
+
+    return _get_formatter(
+        aws_request_id=aws_request_id,
+        asset_id=asset_id,
+        app_connection_id=app_connection_id,
+        log_format=SETTINGS.LOG_FORMAT,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _get_formatter(
+    aws_request_id: bool, asset_id: bool, app_connection_id: bool, log_format: str
+) -> logging.Formatter:
+    # formatters don't have state, so they are shared by all handlers
+
+    if log_format == 'json':
+        return JsonFormatter(
+            aws_request_id=aws_request_id,
+            asset_id=asset_id,
+            app_connection_id=app_connection_id,
+        )
+
     return logging.Formatter(
         f'%(asctime)s.%(msecs)03dZ '
         f'{"%(aws_request_id)s " if aws_request_id else ""}'
@@ -61,6 +90,62 @@ def get_formatter(
     )
 
 
+class JsonFormatter(logging.Formatter):
+    """Formats the record as one line compact JSON object.
+
+    Args:
+        aws_request_id: Whether to include aws_request_id field.
+        asset_id: Whether to include asset_id field.
+        app_connection_id: Whether to include app_connection_id field.
+    """
+
+    ENCODER = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, default=str)
+
+    def __init__(self, aws_request_id: bool, asset_id: bool, app_connection_id: bool):
+        logging.Formatter.__init__(self, datefmt='%Y-%m-%dT%H:%M:%S')
+
+        self.fields = [
+            name
+            for name, include in (
+                ('aws_request_id', aws_request_id),
+                ('asset_id', asset_id),
+                ('app_connection_id', app_connection_id),
+            )
+            if include
+        ]
+
+    def format(self, record: logging.LogRecord) -> str:
+        return self.encode(self.get_fields(record))
+
+    def get_fields(self, record: logging.LogRecord) -> Dict[str, Any]:
+        message = record.getMessage()
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+
+        if record.exc_text:
+            message = f'{message}\n{record.exc_text}'
+
+        if record.stack_info:
+            message = f'{message}\n{self.formatStack(record.stack_info)}'
+
+        fields: Dict[str, Any] = {
+            'timestamp': f'{self.formatTime(record, self.datefmt)}.'
+            f'{int(record.msecs):03d}Z',
+            'level': record.levelname,
+        }
+
+        for name in self.fields:
+            fields[name] = getattr(record, name, None)
+
+        fields['message'] = message
+
+        return fields
+
+    def encode(self, value: Any) -> str:
+        return self.ENCODER.encode(value)
+
+
 class CorvaLoggerFilter(logging.Filter):
     """Injects fields into logging.LogRecord instance for usage in logging.Formatter."""
 
@@ -84,13 +169,105 @@ class CorvaLoggerFilter(logging.Filter):
         return True
 
 
+class StdoutBuffer:
+    """Collects log messages and writes them to sys.stdout in batches.
+
+    Each write to stdout is a syscall and CloudWatch ingests each of them
+    separately, so chatty apps spend noticeable time on logging. The buffer is
+    written out, when it reaches max size, when the oldest message in it gets
+    older than flush interval, and on flush.
+
+    Args:
+        max_size: Buffer size in chars. Zero disables the buffering.
+        flush_interval: Max seconds a message stays in the buffer.
+    """
+
+    def __init__(self, max_size: int, flush_interval: float):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+
+        # buffer is shared by concurrent invocations and keeps messages in order
+        self._lock = threading.Lock()
+        self._messages: List[str] = []
+        self._size = 0
+        self._timer: Optional[threading.Timer] = None
+
+    def write(self, message: str) -> None:
+        if self.max_size <= 0:
+            sys.stdout.write(message)
+            return
+
+        with self._lock:
+            self._messages.append(message)
+            self._size += len(message)
+
+            if self._size >= self.max_size:
+                self._write_out()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write_out()
+
+        sys.stdout.flush()
+
+    @contextlib.contextmanager
+    def flushing(self) -> Iterator[None]:
+        """Flushes the buffer on exit, including the error path."""
+
+        try:
+            yield
+        finally:
+            self.flush()
+
+    def _write_out(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if self._messages:
+            sys.stdout.write(''.join(self._messages))
+            self._messages.clear()
+            self._size = 0
+
+
+STDOUT_BUFFER = StdoutBuffer(
+    max_size=SETTINGS.LOG_BUFFER_SIZE, flush_interval=SETTINGS.LOG_BUFFER_FLUSH_INTERVAL
+)
+atexit.register(STDOUT_BUFFER.flush)
+
+
+class BufferedStreamHandler(logging.StreamHandler):
+    """Logging handler, that writes to STDOUT_BUFFER.
+
+    Doesn't flush after each record, the buffer gets flushed by itself.
+    """
+
+    def __init__(self):
+        logging.StreamHandler.__init__(self, stream=STDOUT_BUFFER)  # type: ignore[call-overload]
+
+    def flush(self) -> None:
+        pass
+
+
 class CorvaLoggerHandler(logging.Handler):
     """Logging handler with constraints.
 
-    The handler logs to sys.stdout and has following functionality:
+    The handler logs to sys.stdout through STDOUT_BUFFER and has following
+    functionality:
         1. Truncates the message to not exceed max message size.
         2. Disables the logging after reaching max message count and
-            logs corresponding warning.
+            logs corresponding warning. Error messages still get logged
+            until max error count is reached.
+        3. Limits the rate of messages with the same template (record.msg),
+            using a token bucket per template. Numbers of suppressed messages
+            are logged on flush.
+
+    Limits are checked before filtering and formatting, so suppressed messages
+    cost nearly nothing.
 
     Args:
         max_message_size: Maximum allowed message size in bytes.
@@ -101,9 +278,19 @@ class CorvaLoggerHandler(logging.Handler):
             message count.
         placeholder: String that will appear at the end of the message
             if it has been truncated.
+        max_error_count: Number of error messages allowed after reaching max
+            message count.
+        template_burst: Number of messages with the same template allowed in a row.
+            Zero disables the rate limiting.
+        template_rate: Number of messages with the same template allowed per second
+            after the burst.
     """
 
     TERMINATOR = '\n'
+    # templates tracked by rate limiting, others share a single bucket
+    MAX_TEMPLATES = 1000
+    # templates to log suppressed messages count for
+    MAX_SUPPRESSED_REPORTS = 5
 
     def __init__(
         self,
@@ -111,6 +298,9 @@ class CorvaLoggerHandler(logging.Handler):
         max_message_count: int,
         logger: logging.Logger,
         placeholder: str,
+        max_error_count: int = 0,
+        template_burst: int = 0,
+        template_rate: float = 0,
     ):
         logging.Handler.__init__(self)
 
@@ -118,10 +308,118 @@ class CorvaLoggerHandler(logging.Handler):
         self.max_message_count = max_message_count
         self.logger = logger
         self.placeholder = f'{placeholder}{self.TERMINATOR}'
+        self.template_burst = template_burst
+        self.template_rate = template_rate
 
         self.logging_warning = False
         # one extra message to log the warning
         self.residue_message_count = self.max_message_count + 1
+        self.residue_error_count = max_error_count
+        # template -> (tokens, last refill time)
+        self.template_buckets: Dict[Any, Tuple[float, float]] = {}
+        self.suppressed_counts: Dict[Any, int] = {}
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR and self.residue_message_count <= 1:
+            if self.residue_error_count == 0:
+                metrics.increment('logs.suppressed')
+                return False
+
+            # message count is reached, but errors still get logged
+            self.residue_error_count -= 1
+            return self.handle_without_limits(record)
+
+        if self.residue_message_count == 0:
+            # skip filtering, locking and formatting as nothing gets logged
+            metrics.increment('logs.suppressed')
+            return False
+
+        if self.logging_warning:
+            return super().handle(record)
+
+        if record.levelno < logging.ERROR and not self.take_template_token(record):
+            return False
+
+        return super().handle(record)
+
+    def handle_without_limits(self, record: logging.LogRecord) -> bool:
+        rv = self.filter(record)
+
+        if rv:
+            with self.lock:  # type: ignore[union-attr]
+                self.log(message=self.format(record))
+
+        return bool(rv)
+
+    def take_template_token(self, record: logging.LogRecord) -> bool:
+        if self.template_burst <= 0:
+            return True
+
+        template = record.msg if isinstance(record.msg, str) else None
+
+        if (
+            template not in self.template_buckets
+            and len(self.template_buckets) >= self.MAX_TEMPLATES
+        ):
+            template = None
+
+        now = time.monotonic()
+        tokens, last_refill = self.template_buckets.get(
+            template, (float(self.template_burst), now)
+        )
+        tokens = min(
+            float(self.template_burst),
+            tokens + (now - last_refill) * self.template_rate,
+        )
+
+        if tokens < 1:
+            self.template_buckets[template] = (tokens, now)
+            self.suppressed_counts[template] = (
+                self.suppressed_counts.get(template, 0) + 1
+            )
+            metrics.increment('logs.suppressed')
+            return False
+
+        self.template_buckets[template] = (tokens - 1, now)
+        return True
+
+    def flush(self) -> None:
+        """Logs numbers of suppressed messages."""
+
+        suppressed_counts = sorted(
+            self.suppressed_counts.items(), key=lambda item: item[1], reverse=True
+        )
+        self.suppressed_counts = {}
+
+        for template, count in suppressed_counts[: self.MAX_SUPPRESSED_REPORTS]:
+            self.handle_without_limits(
+                self.logger.makeRecord(
+                    self.logger.name,
+                    logging.WARNING,
+                    __file__,
+                    0,
+                    'Suppressed %s similar messages: %r.',
+                    (count, template),
+                    None,
+                )
+            )
+
+        other_count = sum(
+            count for _, count in suppressed_counts[self.MAX_SUPPRESSED_REPORTS :]
+        )
+
+        if other_count:
+            self.handle_without_limits(
+                self.logger.makeRecord(
+                    self.logger.name,
+                    logging.WARNING,
+                    __file__,
+                    0,
+                    'Suppressed %s other similar messages.',
+                    (other_count,),
+                    None,
+                )
+            )
 
     def emit(self, record: logging.LogRecord) -> None:
         if self.residue_message_count == 0:
@@ -139,6 +437,9 @@ class CorvaLoggerHandler(logging.Handler):
             )
 
     def format(self, record: logging.LogRecord) -> str:
+        if isinstance(self.formatter, JsonFormatter):
+            return self.format_json(record=record, formatter=self.formatter)
+
         message = super().format(record)
 
         # https://github.com/debug-js/debug/issues/296#issuecomment-289595923
@@ -163,8 +464,126 @@ class CorvaLoggerHandler(logging.Handler):
 
         return message
 
+    def format_json(self, record: logging.LogRecord, formatter: JsonFormatter) -> str:
+        """Formats the record as JSON, truncating the message field to keep it valid.
+
+        JSON has no raw new lines, so it doesn't need CloudWatch specific
+        replacements.
+        """
+
+        fields = formatter.get_fields(record)
+        message = f'{formatter.encode(fields)}{self.TERMINATOR}'
+
+        if len(message) <= self.max_message_size:
+            return message
+
+        placeholder = self.placeholder[: -len(self.TERMINATOR)]
+        text, fields['message'] = fields['message'], ''
+        # chars left for the message, that are counted escaped
+        budget = (
+            self.max_message_size
+            - len(formatter.encode(fields))
+            - len(self.TERMINATOR)
+            - len(formatter.encode(placeholder))
+            + 2  # quotes
+        )
+
+        message_end_idx = 0
+        for char in text:
+            budget -= len(formatter.encode(char)) - 2
+            if budget < 0:
+                break
+            message_end_idx += 1
+
+        if message_end_idx == 0:
+            return ''
+
+        fields['message'] = text[:message_end_idx] + placeholder
+
+        return f'{formatter.encode(fields)}{self.TERMINATOR}'
+
     def log(self, message: str) -> None:
-        sys.stdout.write(message)
+        STDOUT_BUFFER.write(message)
+
+
+# Handlers set by LoggingContext, keyed by logger name. Stored in a context variable,
+# so concurrently running invocations (e.g., in different threads) don't override
+# each other's handlers.
+_CONTEXT_HANDLERS: contextvars.ContextVar[Mapping[str, List[logging.Handler]]] = (
+    contextvars.ContextVar("corva_context_handlers", default={})
+)
+
+
+class ContextHandler(logging.Handler):
+    """Passes log records to the handlers set by LoggingContext in current context.
+
+    The handler replaces logger's own handlers while there is at least one active
+    LoggingContext for the logger. Records logged from a context without
+    LoggingContext (e.g., from threads started by the app, which don't inherit
+    the context) go to the handlers of the latest entered active LoggingContext.
+    Logger's own handlers are used when there are no active contexts.
+
+    Args:
+        logger_name: Name of the logger the handler is attached to.
+    """
+
+    _lock = threading.Lock()
+    _instances: Dict[str, "ContextHandler"] = {}
+
+    def __init__(self, logger_name: str):
+        logging.Handler.__init__(self)
+
+        self.logger_name = logger_name
+        self.saved_handlers: List[logging.Handler] = []
+        # handlers of active contexts in the order they were entered
+        self.active_handlers: List[List[logging.Handler]] = []
+
+    @classmethod
+    def attach(cls, logger: logging.Logger, handlers: List[logging.Handler]) -> None:
+        with cls._lock:
+            handler = cls._instances.setdefault(logger.name, cls(logger.name))
+
+            if not handler.active_handlers:
+                handler.saved_handlers = logger.handlers
+                logger.handlers = [handler]
+
+            handler.active_handlers.append(handlers)
+
+    @classmethod
+    def detach(cls, logger: logging.Logger, handlers: List[logging.Handler]) -> None:
+        with cls._lock:
+            handler = cls._instances[logger.name]
+            # contexts may exit in any order, when entered from different threads
+            handler.active_handlers = [
+                active for active in handler.active_handlers if active is not handlers
+            ]
+
+            if not handler.active_handlers:
+                logger.handlers = handler.saved_handlers
+
+    def get_handlers(self) -> List[logging.Handler]:
+        handlers = _CONTEXT_HANDLERS.get().get(self.logger_name)
+
+        if handlers is not None:
+            return handlers
+
+        # copy to not race with attach and detach
+        active_handlers = list(self.active_handlers)
+
+        if active_handlers:
+            return active_handlers[-1]
+
+        return self.saved_handlers
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        for handler in self.get_handlers():
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.handle(record)
 
 
 class LoggingContext(contextlib.ContextDecorator):
@@ -180,14 +599,15 @@ class LoggingContext(contextlib.ContextDecorator):
     Context allows changing filter's fields dynamically. It will update logging
     formatter as needed.
 
-    Logger gets its old handlers back at the end of the context.
+    Handlers are set for the current context only (see ContextHandler), so
+    contexts can be entered concurrently from multiple threads.
 
     Attributes:
         filter: Logging filter that gets set in the handler.
         handler: Logging handler that gets modified and set in the logger.
         user_handler: Logging handler that gets set in the logger without modifications.
         logger: Logger to configure.
-        old_handlers: Logger's own handlers before the update.
+        handlers: Handlers that are used by the logger inside the context.
     """
 
     def __init__(
@@ -245,8 +665,6 @@ class LoggingContext(contextlib.ContextDecorator):
         )
 
     def __enter__(self):
-        self.old_handlers = self.logger.handlers
-
         # Build the handler chain for CORVA_LOGGER.
         handlers = [self.handler]
         if self.user_handler:
@@ -263,11 +681,17 @@ class LoggingContext(contextlib.ContextDecorator):
                     if handler not in handlers:
                         handlers.append(handler)
 
-        self.logger.handlers = handlers
+        self.handlers = handlers
+        self._token = _CONTEXT_HANDLERS.set(
+            {**_CONTEXT_HANDLERS.get(), self.logger.name: handlers}
+        )
+        ContextHandler.attach(self.logger, handlers)
 
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.logger.handlers = self.old_handlers
+        self.handler.flush()
+        ContextHandler.detach(self.logger, self.handlers)
+        _CONTEXT_HANDLERS.reset(self._token)
 
         return False  # exception will be propagated
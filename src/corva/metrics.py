@@ -0,0 +1,199 @@
+"""Invocation metrics in CloudWatch Embedded Metric Format (EMF).
+
+Metrics get aggregated in memory during the invocation and are written to stdout
+as EMF JSON lines once the invocation finishes. CloudWatch extracts them from the
+logs, so no agent or network calls are needed.
+
+Example:
+    from corva import metrics
+
+    metrics.increment('my_app.wells_processed')
+    metrics.observe('my_app.compute', 12.5, unit='Milliseconds')
+"""
+
+import contextlib
+import contextvars
+import json
+import math
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from corva.configuration import SETTINGS
+
+
+class MetricsRegistry:
+    """Aggregates counters and value distributions.
+
+    Args:
+        namespace: CloudWatch metrics namespace.
+        dimensions: dimension name -> value, added to all metrics.
+    """
+
+    # EMF limit of metrics per document and of distinct values per metric
+    MAX_METRICS = 100
+    MAX_VALUES = 100
+    ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+    def __init__(self, namespace: str, dimensions: Dict[str, str]):
+        self.namespace = namespace
+        self.dimensions = dimensions
+        self.counters: Dict[str, Tuple[float, str]] = {}
+        # name -> (value -> count, unit)
+        self.histograms: Dict[str, Tuple[Dict[float, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, unit: str = 'Count') -> None:
+        with self._lock:
+            current, _ = self.counters.get(name, (0, unit))
+            self.counters[name] = (current + value, unit)
+
+    def observe(self, name: str, value: float, unit: str = 'Milliseconds') -> None:
+        # two significant digits keep the number of distinct values low
+        # with a few percent precision loss
+        value = _round_significant(value, digits=2)
+
+        with self._lock:
+            counts, _ = self.histograms.setdefault(name, ({}, unit))
+            counts[value] = counts.get(value, 0) + 1
+
+    def to_emf(self, timestamp: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Returns EMF documents with all metrics."""
+
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+
+        with self._lock:
+            values: List[Tuple[str, str, Any]] = [
+                (name, unit, value) for name, (value, unit) in self.counters.items()
+            ]
+
+            for name, (counts, unit) in self.histograms.items():
+                items = sorted(counts.items())
+
+                # values over the limit go to extra documents under the same name
+                for start in range(0, len(items), self.MAX_VALUES):
+                    chunk = items[start : start + self.MAX_VALUES]
+                    values.append(
+                        (
+                            name,
+                            unit,
+                            {
+                                'Values': [value for value, _ in chunk],
+                                'Counts': [count for _, count in chunk],
+                            },
+                        )
+                    )
+
+        documents: List[Dict[str, Any]] = []
+
+        for name, unit, value in values:
+            document = next(
+                (
+                    document
+                    for document in documents
+                    if name not in document
+                    and len(document['_aws']['CloudWatchMetrics'][0]['Metrics'])
+                    < self.MAX_METRICS
+                ),
+                None,
+            )
+
+            if document is None:
+                document = {
+                    '_aws': {
+                        'Timestamp': timestamp,
+                        'CloudWatchMetrics': [
+                            {
+                                'Namespace': self.namespace,
+                                'Dimensions': [list(self.dimensions)],
+                                'Metrics': [],
+                            }
+                        ],
+                    },
+                    **self.dimensions,
+                }
+                documents.append(document)
+
+            document['_aws']['CloudWatchMetrics'][0]['Metrics'].append(
+                {'Name': name, 'Unit': unit}
+            )
+            document[name] = value
+
+        return documents
+
+    def flush(self) -> None:
+        """Writes EMF documents to stdout and clears the metrics."""
+
+        from corva.logger import STDOUT_BUFFER
+
+        documents = self.to_emf()
+
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+
+        for document in documents:
+            STDOUT_BUFFER.write(f'{self.ENCODER.encode(document)}\n')
+
+
+def _round_significant(value: float, digits: int) -> float:
+    if value == 0 or not math.isfinite(value):
+        return value
+
+    return round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+_REGISTRY: contextvars.ContextVar[Optional[MetricsRegistry]] = contextvars.ContextVar(
+    'corva_metrics_registry', default=None
+)
+
+
+@contextlib.contextmanager
+def collecting(
+    namespace: Optional[str] = None, dimensions: Optional[Dict[str, str]] = None
+) -> Iterator[Optional[MetricsRegistry]]:
+    """Collects metrics inside the context and flushes them on exit.
+
+    Yields None and collects nothing, if metrics are disabled.
+    """
+
+    if not SETTINGS.METRICS_ENABLED:
+        yield None
+        return
+
+    registry = MetricsRegistry(
+        namespace=namespace or SETTINGS.METRICS_NAMESPACE,
+        dimensions=(
+            {'AppKey': SETTINGS.APP_KEY} if dimensions is None else dimensions
+        ),
+    )
+    token = _REGISTRY.set(registry)
+
+    try:
+        yield registry
+    finally:
+        _REGISTRY.reset(token)
+        registry.flush()
+
+
+def increment(name: str, value: float = 1, unit: str = 'Count') -> None:
+    """Adds the value to the counter. Does nothing outside of invocation."""
+
+    registry = _REGISTRY.get()
+
+    if registry is not None:
+        registry.increment(name=name, value=value, unit=unit)
+
+
+def observe(name: str, value: float, unit: str = 'Milliseconds') -> None:
+    """Records the value of the distribution. Does nothing outside of invocation."""
+
+    registry = _REGISTRY.get()
+
+    if registry is not None:
+        registry.observe(name=name, value=value, unit=unit)
+
+
+def is_collecting() -> bool:
+    return _REGISTRY.get() is not None
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 import abc
+import functools
 from enum import Enum
-from typing import Any, Sequence
+from typing import Any, List, Sequence, Type
 
 import pydantic
 from pydantic import ConfigDict
@@ -15,7 +16,7 @@ class AppType(str, Enum):
 
 
 class CorvaBaseEvent(pydantic.BaseModel):
-    model_config = ConfigDict(extra="allow", frozen=False)
+    model_config = ConfigDict(extra="allow", frozen=False, defer_build=True)
 
 
 class RawBaseEvent(abc.ABC):
@@ -23,3 +24,16 @@ class RawBaseEvent(abc.ABC):
     @abc.abstractmethod
     def from_raw_event(event: Any) -> Sequence[RawBaseEvent]:
         pass
+
+
+@functools.lru_cache(maxsize=None)
+def get_list_adapter(
+    model: Type[pydantic.BaseModel],
+) -> pydantic.TypeAdapter[List[Any]]:
+    """Returns the adapter, that validates lists of the model.
+
+    Adapters cost much more to build than to validate an event with,
+    so each one gets built once, on first use.
+    """
+
+    return pydantic.TypeAdapter(List[model])  # type: ignore[valid-type]
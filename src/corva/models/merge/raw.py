@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, ConfigDict, TypeAdapter
+from pydantic import BaseModel, ConfigDict
 
 from corva.models.base import CorvaBaseEvent, RawBaseEvent
 from corva.models.merge.enums import EventType, RerunMode, SourceType
@@ -37,4 +37,4 @@ class RawPartialRerunMergeEvent(CorvaBaseEvent, RawBaseEvent):
 
     @staticmethod
     def from_raw_event(event: Dict[str, Any]) -> List[RawPartialRerunMergeEvent]:
-        return [TypeAdapter(RawPartialRerunMergeEvent).validate_python(event)]
+        return [RawPartialRerunMergeEvent.model_validate(event)]
@@ -0,0 +1,107 @@
+import concurrent.futures
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+import pydantic
+
+from corva.api import Api
+from corva.concurrency import submit_in_context
+
+
+class DatasetSpec(pydantic.BaseModel):
+    """Dataset to fetch for the scheduled event time range before running the app.
+
+    Attributes:
+        provider: company name, that owns the dataset.
+        dataset: dataset name.
+        fields: comma separated list of fields to return. Example: "timestamp,data".
+        limit: page size. All records in the time range are fetched page by page.
+        name: key to access the data in `event.prefetched`. Defaults to dataset name.
+    """
+
+    model_config = pydantic.ConfigDict(frozen=True)
+
+    provider: str
+    dataset: str
+    fields: Optional[str] = None
+    limit: int = pydantic.Field(default=1000, gt=0)
+    name: Optional[str] = None
+
+    def __init__(self, provider: str, dataset: str, **data: Any):
+        super().__init__(provider=provider, dataset=dataset, **data)
+
+    @property
+    def key(self) -> str:
+        return self.name or self.dataset
+
+    def fetch(self, api: Api, query: dict, sort: dict) -> List[dict]:
+        result: List[dict] = []
+
+        while True:
+            page = api.get_dataset(
+                provider=self.provider,
+                dataset=self.dataset,
+                query=query,
+                sort=sort,
+                limit=self.limit,
+                skip=len(result),
+                fields=self.fields,
+            )
+            result.extend(page)
+
+            if len(page) < self.limit:
+                return result
+
+
+class Prefetched(Mapping[str, List[dict]]):
+    """Datasets, that are being fetched in background threads.
+
+    Item access waits for the fetch to finish and raises its exception, if any.
+    """
+
+    def __init__(
+        self,
+        futures: Optional[Dict[str, "concurrent.futures.Future[List[dict]]"]] = None,
+        executor: Optional[concurrent.futures.ThreadPoolExecutor] = None,
+    ):
+        self._futures = futures or {}
+        self._executor = executor
+
+    @classmethod
+    def start(cls, fetches: Mapping[str, Callable[[], List[dict]]]) -> "Prefetched":
+        if not fetches:
+            return cls()
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(fetches), thread_name_prefix="corva-prefetch"
+        )
+
+        return cls(
+            futures={
+                name: submit_in_context(executor, fetch)
+                for name, fetch in fetches.items()
+            },
+            executor=executor,
+        )
+
+    def future(self, name: str) -> "concurrent.futures.Future[List[dict]]":
+        """Returns the fetch future to wait for the data with a timeout."""
+
+        return self._futures[name]
+
+    def close(self) -> None:
+        """Cancels fetches, that have not started yet, without waiting."""
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __getitem__(self, name: str) -> List[dict]:
+        return self._futures[name].result()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._futures)
+
+    def __len__(self) -> int:
+        return len(self._futures)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self._futures)})"
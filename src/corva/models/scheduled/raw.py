@@ -3,12 +3,12 @@ from __future__ import annotations
 import itertools
 from typing import List, Optional, Union
 
-from pydantic import Field, TypeAdapter, field_validator, model_validator
+from pydantic import Field, field_validator, model_validator
 from typing_extensions import Self
 
 from corva.api import Api
 from corva.models import validators
-from corva.models.base import CorvaBaseEvent, RawBaseEvent
+from corva.models.base import CorvaBaseEvent, RawBaseEvent, get_list_adapter
 from corva.models.rerun import RerunDepth, RerunTime
 from corva.models.scheduled.scheduler_type import SchedulerType
 
@@ -41,9 +41,8 @@ class RawScheduledEvent(CorvaBaseEvent, RawBaseEvent):
         # flatten the event into 1d array
         flattened_event: List[dict] = list(itertools.chain(*event))
 
-        parsed_raw_events = (
-            TypeAdapter(List[RawScheduledEvent])
-            .validate_python(flattened_event)
+        parsed_raw_events = get_list_adapter(RawScheduledEvent).validate_python(
+            flattened_event
         )
 
         events = [
@@ -4,11 +4,25 @@ import pydantic
 
 from corva.models.base import CorvaBaseEvent
 from corva.models.rerun import RerunDepth, RerunTime
+from corva.models.scheduled.prefetch import Prefetched
 
 
 class ScheduledEvent(CorvaBaseEvent):
     """Base class for scheduled event data."""
 
+    _prefetched: Prefetched = pydantic.PrivateAttr(default_factory=Prefetched)
+
+    @property
+    def prefetched(self) -> Prefetched:
+        """Datasets requested with `@scheduled(prefetch=...)`."""
+
+        return self._prefetched
+
+    def set_prefetched(self, prefetched: Prefetched) -> None:
+        """Attaches datasets, that are being fetched for the event."""
+
+        self._prefetched = prefetched
+
 
 class ScheduledDataTimeEvent(ScheduledEvent):
     """Data time scheduled event data.
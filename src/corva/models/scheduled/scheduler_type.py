@@ -1,5 +1,6 @@
 import enum
-from typing import Type, cast
+import functools
+from typing import Dict, Type
 
 import pydantic
 
@@ -11,30 +12,41 @@ class SchedulerType(enum.Enum):
 
     @property
     def raw_event(self):
-        from corva.models.scheduled.raw import (
-            RawScheduledDataTimeEvent,
-            RawScheduledDepthEvent,
-            RawScheduledNaturalTimeEvent,
-        )
-
-        mapping = {
-            type(self).natural_time: RawScheduledNaturalTimeEvent,
-            type(self).data_time: RawScheduledDataTimeEvent,
-            type(self).data_depth_milestone: RawScheduledDepthEvent,
-        }
-        return mapping[self]
+        return _get_raw_events()[self]
 
     @property
     def event(self) -> Type[pydantic.BaseModel]:
-        from corva.models.scheduled.scheduled import (
-            ScheduledDataTimeEvent,
-            ScheduledDepthEvent,
-            ScheduledNaturalTimeEvent,
-        )
-
-        mapping = {
-            type(self).natural_time: ScheduledNaturalTimeEvent,
-            type(self).data_time: ScheduledDataTimeEvent,
-            type(self).data_depth_milestone: ScheduledDepthEvent,
-        }
-        return cast(Type[pydantic.BaseModel], mapping[self])
+        return _get_events()[self]
+
+
+# lookup tables get built on first access, as the models import this module
+
+
+@functools.lru_cache(maxsize=1)
+def _get_raw_events() -> Dict[SchedulerType, type]:
+    from corva.models.scheduled.raw import (
+        RawScheduledDataTimeEvent,
+        RawScheduledDepthEvent,
+        RawScheduledNaturalTimeEvent,
+    )
+
+    return {
+        SchedulerType.natural_time: RawScheduledNaturalTimeEvent,
+        SchedulerType.data_time: RawScheduledDataTimeEvent,
+        SchedulerType.data_depth_milestone: RawScheduledDepthEvent,
+    }
+
+
+@functools.lru_cache(maxsize=1)
+def _get_events() -> Dict[SchedulerType, Type[pydantic.BaseModel]]:
+    from corva.models.scheduled.scheduled import (
+        ScheduledDataTimeEvent,
+        ScheduledDepthEvent,
+        ScheduledNaturalTimeEvent,
+    )
+
+    return {
+        SchedulerType.natural_time: ScheduledNaturalTimeEvent,
+        SchedulerType.data_time: ScheduledDataTimeEvent,
+        SchedulerType.data_depth_milestone: ScheduledDepthEvent,
+    }
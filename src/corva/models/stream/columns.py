@@ -0,0 +1,132 @@
+import array
+import functools
+import importlib
+import math
+from typing import Any, Collection, Dict, List, Optional, Sequence, Tuple
+
+
+def records_to_columns(records: Sequence[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Builds a column table from raw record dicts in one pass.
+
+    Top-level record fields become columns with the same name. Fields of the
+    `data` dict become columns prefixed with `data.` (e.g. `data.hole_depth`).
+    Missing values are filled with None.
+
+    Example:
+        [{"timestamp": 1, "data": {"rop": 2}}, {"timestamp": 3, "data": {}}] ->
+        {"timestamp": [1, 3], "data.rop": [2, None]}
+    """
+
+    size = len(records)
+    columns: Dict[str, List[Any]] = {}
+
+    for idx, record in enumerate(records):
+        for key, value in record.items():
+            if key == "data" and isinstance(value, dict):
+                for data_key, data_value in value.items():
+                    column_name = f"data.{data_key}"
+                    column = columns.get(column_name)
+                    if column is None:
+                        column = columns[column_name] = [None] * size
+                    column[idx] = data_value
+                continue
+
+            column = columns.get(key)
+            if column is None:
+                column = columns[key] = [None] * size
+            column[idx] = value
+
+    return columns
+
+
+@functools.lru_cache(maxsize=1)
+def get_numpy() -> Optional[Any]:
+    """Returns numpy module if it is installed."""
+
+    try:
+        return importlib.import_module("numpy")
+    except ImportError:
+        return None
+
+
+def _get_value(record: Any, path: Tuple[str, ...]) -> Any:
+    if isinstance(record, dict):
+        value = record.get(path[0])
+    else:
+        value = getattr(record, path[0], None)
+
+    for key in path[1:]:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+
+    return value
+
+
+def records_to_arrays(
+    records: Sequence[Any],
+    fields: Sequence[str],
+    null_values: Collection[float] = (),
+    int_fields: Collection[str] = (),
+) -> Dict[str, Any]:
+    """Builds contiguous typed arrays from records in one pass.
+
+    Args:
+        records: record models or raw record dicts.
+        fields: record fields to build arrays for. Use dots to access nested
+            fields, e.g. `data.hole_depth`.
+        null_values: values that mean no data, e.g. WITS -999.25. Such values and
+            missing values are stored as NaN.
+        int_fields: fields to store as 64-bit integers. Other fields are stored as
+            64-bit floats.
+
+    Raises:
+        ValueError: if integer field contains null value.
+
+    Returns:
+        Field name to array mapping. Arrays are numpy arrays if numpy is installed
+        and array.array instances otherwise. Fields with values, that are not
+        numbers (e.g. strings or dicts), are returned as plain lists.
+    """
+
+    nulls = frozenset(null_values)
+    paths = [tuple(field.split(".")) for field in fields]
+    is_ints = [field in int_fields for field in fields]
+    columns: List[Any] = [array.array("q" if is_int else "d") for is_int in is_ints]
+
+    for record in records:
+        for idx, (path, is_int) in enumerate(zip(paths, is_ints)):
+            value = _get_value(record, path)
+
+            try:
+                is_null = value is None or value in nulls
+            except TypeError:  # unhashable value, e.g. dict
+                is_null = False
+
+            if is_null:
+                if is_int:
+                    raise ValueError(
+                        f"Integer field {'.'.join(path)!r} contains null value."
+                    )
+                value = math.nan
+
+            try:
+                columns[idx].append(value)
+            except TypeError:
+                # the value doesn't fit typed array, fall back to a list column
+                columns[idx] = list(columns[idx])
+                columns[idx].append(value)
+
+    numpy = get_numpy()
+
+    if numpy is None:
+        return dict(zip(fields, columns))
+
+    return {
+        field: (
+            numpy.frombuffer(column, dtype=numpy.int64 if is_int else numpy.float64)
+            if isinstance(column, array.array)
+            else column
+        )
+        for field, column, is_int in zip(fields, columns, is_ints)
+    }
@@ -0,0 +1,128 @@
+from typing import Any, Dict, Iterator, List, Sequence, Type, Union, overload
+
+
+class CompactRecord:
+    """Stream record, that reads its fields from the raw record dict.
+
+    Fields are not copied or validated: every attribute access is a dict lookup,
+    so `data` and `metadata` get resolved only if the app uses them.
+    Raw record fields, other than the declared ones, are available as attributes
+    too, like extra fields of the record models.
+    """
+
+    __slots__ = ("_raw",)
+
+    def __init__(self, raw: Dict[str, Any]):
+        self._raw = raw
+
+    # missing dicts get stored in the raw record, so changes to them are kept,
+    # like with the default values of the record models
+    @property
+    def data(self) -> dict:
+        return self._raw.setdefault("data", {})
+
+    @property
+    def metadata(self) -> dict:
+        return self._raw.setdefault("metadata", {})
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith("_"):
+            raise AttributeError(name)
+
+        try:
+            return self._raw[name]
+        except KeyError:
+            raise AttributeError(
+                f"{type(self).__name__!r} object has no attribute {name!r}"
+            ) from None
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactRecord):
+            return NotImplemented
+
+        return self._raw == other._raw
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._raw!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the raw record dict."""
+
+        return self._raw
+
+
+class CompactTimeRecord(CompactRecord):
+    """Compact stream time record.
+
+    Attributes:
+        timestamp: Unix timestamp.
+        data: record data.
+        metadata: record metadata.
+    """
+
+    __slots__ = ()
+
+    @property
+    def timestamp(self) -> int:
+        return self._raw["timestamp"]
+
+
+class CompactDepthRecord(CompactRecord):
+    """Compact stream depth record.
+
+    Attributes:
+        measured_depth: measured depth (ft).
+        data: record data.
+        metadata: record metadata.
+    """
+
+    __slots__ = ()
+
+    @property
+    def measured_depth(self) -> float:
+        return self._raw["measured_depth"]
+
+
+class CompactRecords(Sequence[CompactRecord]):
+    """Sequence of compact records, backed by a list of raw record dicts.
+
+    Records are created on access and are not stored, so the sequence takes one
+    pointer per record on top of the raw records.
+    """
+
+    __slots__ = ("raw", "record_type")
+
+    def __init__(
+        self, raw: List[Dict[str, Any]], record_type: Type[CompactRecord]
+    ) -> None:
+        self.raw = raw
+        self.record_type = record_type
+
+    @overload
+    def __getitem__(self, index: int) -> CompactRecord: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "CompactRecords": ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[CompactRecord, "CompactRecords"]:
+        if isinstance(index, slice):
+            return CompactRecords(raw=self.raw[index], record_type=self.record_type)
+
+        return self.record_type(self.raw[index])
+
+    def __iter__(self) -> Iterator[CompactRecord]:
+        return map(self.record_type, self.raw)
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactRecords):
+            return NotImplemented
+
+        return self.record_type is other.record_type and self.raw == other.raw
+
+    def __repr__(self) -> str:
+        return f"CompactRecords({self.record_type.__name__}, {len(self)} records)"
@@ -0,0 +1,159 @@
+import base64
+import binascii
+import math
+from typing import List, Optional, Sequence, Union
+
+
+class LateRecordsWindow:
+    """Remembers processed record values in a bounded window below the watermark.
+
+    Watermark is the max processed record value. By default stream apps drop all
+    records at or below the watermark. The window allows accepting late records
+    inside it exactly once.
+
+    The window is split into buckets of `resolution` size. Processed buckets are
+    stored as a ring bitmap, so the window takes a fixed number of bytes
+    regardless of the number of records. Records that fall into the same bucket are
+    considered duplicates.
+
+    Args:
+        size: window size in record value units (seconds or feet).
+        resolution: bucket size in record value units.
+        end_bucket: the newest bucket in the window.
+        floor: record values at or below the floor are always rejected. Set to the
+            watermark, when the window is created, as there is no information about
+            records processed before.
+        bits: bitmap of processed buckets.
+    """
+
+    def __init__(
+        self,
+        size: float,
+        resolution: float,
+        end_bucket: Optional[int] = None,
+        floor: Optional[float] = None,
+        bits: Optional[bytearray] = None,
+    ):
+        if size <= 0 or resolution <= 0:
+            raise ValueError("Window size and resolution must be positive.")
+
+        self.size = size
+        self.resolution = resolution
+        self.bits_count = max(1, math.ceil(size / resolution))
+        self.end_bucket = end_bucket
+        self.floor = floor
+        self.bits = bits if bits is not None else bytearray(self.bytes_count)
+
+    @property
+    def bytes_count(self) -> int:
+        return (self.bits_count + 7) // 8
+
+    @classmethod
+    def loads(
+        cls, value: Optional[str], size: float, resolution: float
+    ) -> "LateRecordsWindow":
+        """Loads the window from a cache value. Invalid values give empty window."""
+
+        empty = cls(size=size, resolution=resolution)
+
+        if not value:
+            return empty
+
+        try:
+            end_bucket, floor, encoded_bits = value.split(":")
+            bits = bytearray(base64.b64decode(encoded_bits, validate=True))
+            window = cls(
+                size=size,
+                resolution=resolution,
+                end_bucket=int(end_bucket),
+                floor=float(floor) if floor else None,
+                bits=bits,
+            )
+        except (ValueError, binascii.Error):
+            return empty
+
+        if len(bits) != window.bytes_count:
+            # window settings were changed - start from scratch
+            return empty
+
+        return window
+
+    def dumps(self) -> str:
+        return ":".join(
+            (
+                "" if self.end_bucket is None else str(self.end_bucket),
+                "" if self.floor is None else repr(self.floor),
+                base64.b64encode(bytes(self.bits)).decode(),
+            )
+        )
+
+    def filter(
+        self, values: Sequence[Union[int, float]], watermark: Optional[float]
+    ) -> List[bool]:
+        """Returns whether to accept each value and remembers accepted ones.
+
+        Values above the watermark are always accepted. Values at or below the
+        watermark are accepted, if they fall into the window and were not
+        accepted before. The window gets advanced to the max value of the batch
+        first, so the result does not depend on the order of the values.
+        """
+
+        if self.end_bucket is None:
+            self.floor = watermark
+
+        new_values = [
+            value for value in values if watermark is None or value > watermark
+        ]
+
+        if new_values:
+            bucket = math.floor(max(new_values) / self.resolution)
+
+            if self.end_bucket is None or bucket > self.end_bucket:
+                self._advance(bucket)
+
+        result = []
+
+        for value in values:
+            bucket = math.floor(value / self.resolution)
+
+            if watermark is None or value > watermark:
+                self._test_and_set(bucket)
+                result.append(True)
+                continue
+
+            result.append(
+                (self.floor is None or value > self.floor)
+                and self._test_and_set(bucket)
+            )
+
+        return result
+
+    def _advance(self, bucket: int) -> None:
+        if self.end_bucket is None or bucket - self.end_bucket >= self.bits_count:
+            self.bits[:] = bytes(self.bytes_count)
+        else:
+            for cleared in range(self.end_bucket + 1, bucket + 1):
+                position = cleared % self.bits_count
+                self.bits[position >> 3] &= ~(1 << (position & 7))
+
+        self.end_bucket = bucket
+
+    def _test_and_set(self, bucket: int) -> bool:
+        """Marks the bucket as processed. Returns False if it was marked already
+        or is outside of the window."""
+
+        if (
+            self.end_bucket is None
+            or bucket > self.end_bucket
+            or bucket <= self.end_bucket - self.bits_count
+        ):
+            return False
+
+        position = bucket % self.bits_count
+        mask = 1 << (position & 7)
+
+        if self.bits[position >> 3] & mask:
+            return False
+
+        self.bits[position >> 3] |= mask
+        return True
@@ -1,4 +1,6 @@
 import enum
+import functools
+from typing import Dict
 
 
 class LogType(enum.Enum):
@@ -7,17 +9,25 @@ class LogType(enum.Enum):
 
     @property
     def raw_event(self):
-        from corva.models.stream.raw import RawStreamDepthEvent, RawStreamTimeEvent
-
-        mapping = {
-            type(self).time: RawStreamTimeEvent,
-            type(self).depth: RawStreamDepthEvent,
-        }
-        return mapping[self]
+        return _get_raw_events()[self]
 
     @property
     def event(self):
-        from corva.models.stream.stream import StreamDepthEvent, StreamTimeEvent
+        return _get_events()[self]
+
+
+# lookup tables get built on first access, as the models import this module
+
+
+@functools.lru_cache(maxsize=1)
+def _get_raw_events() -> Dict[LogType, type]:
+    from corva.models.stream.raw import RawStreamDepthEvent, RawStreamTimeEvent
+
+    return {LogType.time: RawStreamTimeEvent, LogType.depth: RawStreamDepthEvent}
+
+
+@functools.lru_cache(maxsize=1)
+def _get_events() -> Dict[LogType, type]:
+    from corva.models.stream.stream import StreamDepthEvent, StreamTimeEvent
 
-        mapping = {type(self).time: StreamTimeEvent, type(self).depth: StreamDepthEvent}
-        return mapping[self]
+    return {LogType.time: StreamTimeEvent, LogType.depth: StreamDepthEvent}
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import abc
 import copy
+import functools
 from typing import (
     TYPE_CHECKING,
     Any,
@@ -13,12 +14,21 @@ from typing import (
     Union,
 )
 
-from pydantic import Field, TypeAdapter, create_model, model_validator
-from typing_extensions import Annotated
+from pydantic import (
+    Field,
+    TypeAdapter,
+    ValidationError,
+    ValidationInfo,
+    create_model,
+    field_validator,
+    model_validator,
+)
+from typing_extensions import Annotated, Literal
 
 from corva.configuration import SETTINGS
-from corva.models.base import CorvaBaseEvent, RawBaseEvent
+from corva.models.base import CorvaBaseEvent, RawBaseEvent, get_list_adapter
 from corva.models.rerun import RerunDepth, RerunTime
+from corva.models.stream.dedup import LateRecordsWindow
 from corva.models.stream.initial import InitialStreamEvent
 from corva.models.stream.log_type import LogType
 from corva.service.cache_sdk import UserCacheSdkProtocol
@@ -77,6 +87,29 @@ class RawMetadata(CorvaBaseEvent):
     log_identifier: Optional[str] = None
 
 
+# How `@stream` hands records over to the app:
+#   "models" - pydantic record models (default);
+#   "dicts" - raw record dicts;
+#   "columns" - a column table built from raw record dicts;
+#   "compact" - slotted records, that read fields from raw record dicts.
+RecordsAs = Literal["models", "dicts", "columns", "compact"]
+
+
+def drop_records_without_data(data: Any) -> Any:
+    """Removes records, which have `data` field set to None."""
+
+    if isinstance(data, dict) and isinstance(data.get('records'), list):
+        data['records'] = [
+            record
+            for record in data['records']
+            if (
+                (isinstance(record, dict) and record.get("data") is not None)
+                or (hasattr(record, "data") and record.data is not None)
+            )
+        ]
+    return data
+
+
 if TYPE_CHECKING:
     RecordsBase = Sequence[RawBaseRecord]
     RecordsTime = Sequence[RawTimeRecord]
@@ -87,14 +120,35 @@ else:
     RecordsDepth = Annotated[List[RawDepthRecord], Field(min_length=1)]
 
 
-class RawStreamEvent(CorvaBaseEvent, RawBaseEvent):
-    records: RecordsBase
+class RawStreamBaseEvent(CorvaBaseEvent):
+    """Raw stream event logic, shared by events with record models and with raw
+    record dicts.
+
+    Subclasses narrow the `records` type and tell how to read the records.
+    """
+
+    records: Sequence[Any]
     metadata: RawMetadata
     asset_id: int = None  # type: ignore
     company_id: int = None  # type: ignore
 
-    # private attributes
-    _max_record_value_cache_key: ClassVar[str]
+    @property
+    @abc.abstractmethod
+    def max_record_value_cache_key(self) -> str:
+        pass
+
+    @abc.abstractmethod
+    def get_record_value(self, record: Any) -> Union[int, float]:
+        pass
+
+    @abc.abstractmethod
+    def get_record_collection(self, record: Any) -> Optional[str]:
+        pass
+
+    def copy_records(self) -> List[Any]:
+        """Returns the records, that filter_records may hand over to the app."""
+
+        return list(self.records)
 
     @property
     def app_connection_id(self) -> int:
@@ -118,30 +172,16 @@ class RawStreamEvent(CorvaBaseEvent, RawBaseEvent):
         if not self.records:
             return False
 
-        return self.records[-1].collection == "wits.completed"
+        return self.get_record_collection(self.records[-1]) == "wits.completed"
 
     @property
     def max_record_value(self) -> Union[int, float]:
-        return max(record.record_value for record in self.records)
-
-    @staticmethod
-    def from_raw_event(event: List[dict]) -> List[RawStreamEvent]:
-        initial_events: List[InitialStreamEvent] = (
-            TypeAdapter(List[InitialStreamEvent])
-            .validate_python(event)
-        )
-
-        result = [
-            initial_event.metadata.log_type.raw_event.model_validate(sub_event)
-            for initial_event, sub_event in zip(initial_events, event)
-        ]
-
-        return result
+        return max(self.get_record_value(record) for record in self.records)
 
     def get_cached_max_record_value(
         self, cache: UserCacheSdkProtocol
     ) -> Optional[float]:
-        result = cache.get(key=self._max_record_value_cache_key)
+        result = cache.get(key=self.max_record_value_cache_key)
 
         if result is None:
             return result
@@ -150,30 +190,109 @@ class RawStreamEvent(CorvaBaseEvent, RawBaseEvent):
 
     def set_cached_max_record_value(self, cache: UserCacheSdkProtocol) -> None:
         cache.set(
-            key=self._max_record_value_cache_key, value=str(self.max_record_value)
+            key=self.max_record_value_cache_key, value=str(self.max_record_value)
+        )
+
+    def get_cached_late_records_window(
+        self, cache: UserCacheSdkProtocol, size: float, resolution: float
+    ) -> LateRecordsWindow:
+        return LateRecordsWindow.loads(
+            cache.get(key=f"{self.max_record_value_cache_key}_window"),
+            size=size,
+            resolution=resolution,
         )
 
+    def set_cached_late_records_window(
+        self,
+        cache: UserCacheSdkProtocol,
+        window: LateRecordsWindow,
+        old_max_record_value: Optional[float],
+    ) -> None:
+        """Saves the window together with the max record value.
+
+        Max record value never decreases, as the event may contain late records
+        only.
+        """
+
+        key = self.max_record_value_cache_key
+        data = [(f"{key}_window", window.dumps())]
+
+        if (
+            old_max_record_value is None
+            or self.max_record_value > old_max_record_value
+        ):
+            data.append((key, str(self.max_record_value)))
+
+        cache.set_many(data=data)
+
     def filter_records(
         self,
         old_max_record_value: Optional[float],
-    ) -> List[RawBaseRecord]:
-        new_records = copy.deepcopy(self.records)
+        window: Optional[LateRecordsWindow] = None,
+    ) -> List[Any]:
+        new_records = self.copy_records()
 
         if self.is_completed:
             new_records = new_records[:-1]  # remove "completed" record
 
-        if old_max_record_value is None:
-            return list(new_records)
+        values = [self.get_record_value(record) for record in new_records]
 
-        values = [record.record_value for record in new_records]
+        if window is not None:
+            return [
+                record
+                for record, keep in zip(
+                    new_records, window.filter(values, old_max_record_value)
+                )
+                if keep
+            ]
+
+        if old_max_record_value is None:
+            return new_records
 
-        new_records = [
+        return [
             record
             for record, value in zip(new_records, values)
             if value > old_max_record_value
         ]
 
-        return new_records
+    @model_validator(mode="before")
+    @classmethod
+    def validate_records(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        return drop_records_without_data(data)
+
+
+class RawStreamEvent(RawStreamBaseEvent, RawBaseEvent):
+    records: RecordsBase
+
+    # private attributes
+    _max_record_value_cache_key: ClassVar[str]
+
+    @property
+    def max_record_value_cache_key(self) -> str:
+        return self._max_record_value_cache_key
+
+    def get_record_value(self, record: RawBaseRecord) -> Union[int, float]:
+        return record.record_value
+
+    def get_record_collection(self, record: RawBaseRecord) -> Optional[str]:
+        return record.collection
+
+    def copy_records(self) -> List[RawBaseRecord]:
+        # the app gets its own copies of the record models
+        return copy.deepcopy(list(self.records))
+
+    @staticmethod
+    def from_raw_event(event: List[dict]) -> List[RawStreamEvent]:
+        initial_events: List[InitialStreamEvent] = get_list_adapter(
+            InitialStreamEvent
+        ).validate_python(event)
+
+        result = [
+            initial_event.metadata.log_type.raw_event.model_validate(sub_event)
+            for initial_event, sub_event in zip(initial_events, event)
+        ]
+
+        return result
 
     @model_validator(mode="after")
     def set_asset_id(self) -> 'RawStreamEvent':
@@ -197,20 +316,6 @@ class RawStreamEvent(CorvaBaseEvent, RawBaseEvent):
 
         return self
 
-    @model_validator(mode="before")
-    @classmethod
-    def validate_records(cls, data: Dict[str, Any]) -> Dict[str, Any]:
-        if isinstance(data.get('records'), list):
-            data['records'] = [
-                record
-                for record in data['records']
-                if (
-                    (isinstance(record, dict) and record.get("data") is not None)
-                    or (hasattr(record, "data") and record.data is not None)
-                )
-            ]
-        return data
-
 
 class RawStreamTimeEvent(RawStreamEvent):
     records: RecordsTime
@@ -233,3 +338,108 @@ class RawStreamDepthEvent(RawStreamEvent):
         self.log_identifier = metadata.log_identifier
 
         return self
+
+
+@functools.lru_cache(maxsize=None)
+def get_value_adapter(value_type: type) -> TypeAdapter[Any]:
+    """Returns the adapter, that coerces record values like record models do."""
+
+    return TypeAdapter(value_type)
+
+
+class RawStreamDictsEvent(RawStreamBaseEvent):
+    """Raw stream event, that keeps its records as raw dicts.
+
+    Validates the event envelope the same way as RawStreamEvent does, but skips
+    building a pydantic model for every record.
+    """
+
+    records: List[Dict[str, Any]]
+    rerun: Optional[Union[RerunTime, RerunDepth]] = None
+    log_identifier: Optional[str] = None
+
+    _record_value_keys: ClassVar[Dict[LogType, str]] = {
+        LogType.time: "timestamp",
+        LogType.depth: "measured_depth",
+    }
+    # types of the record values in RawTimeRecord and RawDepthRecord
+    _record_value_types: ClassVar[Dict[LogType, type]] = {
+        LogType.time: int,
+        LogType.depth: float,
+    }
+
+    @property
+    def record_value_key(self) -> str:
+        return self._record_value_keys[self.metadata.log_type]
+
+    @property
+    def max_record_value_cache_key(self) -> str:
+        return self.metadata.log_type.raw_event._max_record_value_cache_key
+
+    def get_record_value(self, record: Dict[str, Any]) -> Union[int, float]:
+        return record[self.record_value_key]
+
+    def get_record_collection(self, record: Dict[str, Any]) -> Optional[str]:
+        return record.get("collection")
+
+    @staticmethod
+    def from_raw_event(event: List[dict]) -> List[RawStreamDictsEvent]:
+        return get_list_adapter(RawStreamDictsEvent).validate_python(event)
+
+    @field_validator("rerun", mode="before")
+    @classmethod
+    def validate_rerun(cls, v: Any, info: ValidationInfo) -> Any:
+        """Parses rerun metadata according to the log type."""
+
+        metadata = info.data.get("metadata")
+
+        if v is None or metadata is None:
+            return v
+
+        if metadata.log_type == LogType.time:
+            return RerunTime.model_validate(v)
+
+        return RerunDepth.model_validate(v)
+
+    @model_validator(mode="after")
+    def set_fields(self) -> 'RawStreamDictsEvent':
+        """Validates records and calculates asset_id, company_id and
+        log_identifier fields."""
+
+        log_type = self.metadata.log_type
+        key = self.record_value_key
+
+        if log_type == LogType.depth and not self.records:
+            raise ValueError("Depth event must contain at least one record.")
+
+        value_type = self._record_value_types[log_type]
+
+        for record in self.records:
+            value = record.get(key)
+
+            if value is None:
+                raise ValueError(f"Record is missing required {key!r} field.")
+
+            if type(value) is not value_type:
+                # records get filtered and compared by their values, so they are
+                # coerced the same way as in the record models
+                try:
+                    record[key] = get_value_adapter(value_type).validate_python(
+                        value
+                    )
+                except ValidationError as exc:
+                    raise ValueError(f"Record has invalid {key!r} field.") from exc
+
+        if self.records:
+            try:
+                self.asset_id = int(self.records[0]["asset_id"])
+                self.company_id = int(self.records[0]["company_id"])
+            except (KeyError, TypeError, ValueError) as exc:
+                raise ValueError(
+                    "Record must contain valid asset_id and company_id fields."
+                ) from exc
+
+        if log_type == LogType.depth:
+            self.log_identifier = self.metadata.log_identifier
+
+        return self
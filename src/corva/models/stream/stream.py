@@ -1,10 +1,21 @@
-from typing import TYPE_CHECKING, List, Optional, Sequence
-
-from pydantic import Field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Collection,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
+
+from pydantic import ConfigDict, Field
 from typing_extensions import Annotated
 
 from corva.models.base import CorvaBaseEvent
 from corva.models.rerun import RerunDepth, RerunTime
+from corva.models.stream.columns import records_to_arrays
+from corva.models.stream.compact import CompactRecords, CompactTimeRecord
 
 
 class StreamTimeRecord(CorvaBaseEvent):
@@ -62,6 +73,33 @@ class StreamTimeEvent(StreamEvent):
     records: RecordsTime
     rerun: Optional[RerunTime] = None
 
+    def to_columns(
+        self, fields: Sequence[str], null_values: Collection[float] = ()
+    ) -> Dict[str, Any]:
+        """Builds contiguous typed arrays from the records.
+
+        Arrays are numpy arrays if numpy is installed and array.array instances
+        otherwise. `timestamp` is stored as 64-bit integers, other fields are stored
+        as 64-bit floats with NaN for missing values.
+
+        Args:
+            fields: record fields to build arrays for. Use dots to access nested
+                fields, e.g. `data.hole_depth`.
+            null_values: values that mean no data, e.g. WITS -999.25. Such values
+                are stored as NaN.
+
+        Returns:
+            Field name to array mapping. Fields with values, that are not numbers,
+            are returned as plain lists.
+        """
+
+        return records_to_arrays(
+            self.records,
+            fields=fields,
+            null_values=null_values,
+            int_fields=("timestamp",),
+        )
+
 
 class StreamDepthEvent(StreamEvent):
     """Stream depth event data.
@@ -79,3 +117,108 @@ class StreamDepthEvent(StreamEvent):
     # TODO: remove `Optional` in v2 as it was added for backward compatibility.
     log_identifier: Optional[str] = None
     rerun: Optional[RerunDepth] = None
+
+    def to_columns(
+        self, fields: Sequence[str], null_values: Collection[float] = ()
+    ) -> Dict[str, Any]:
+        """Builds contiguous typed arrays from the records.
+
+        Arrays are numpy arrays if numpy is installed and array.array instances
+        otherwise. Fields are stored as 64-bit floats with NaN for missing values.
+
+        Args:
+            fields: record fields to build arrays for. Use dots to access nested
+                fields, e.g. `data.hole_depth`.
+            null_values: values that mean no data, e.g. WITS -999.25. Such values
+                are stored as NaN.
+
+        Returns:
+            Field name to array mapping. Fields with values, that are not numbers,
+            are returned as plain lists.
+        """
+
+        return records_to_arrays(self.records, fields=fields, null_values=null_values)
+
+
+class StreamDictsEvent(StreamEvent):
+    """Stream event data with records passed as raw dicts.
+
+    Used by `@stream(records_as="dicts")` apps.
+
+    Attributes:
+        asset_id: asset id.
+        company_id: company id.
+        records: raw data records.
+        log_identifier: app stream log identifier. Set for depth events only.
+        rerun: rerun metadata.
+    """
+
+    asset_id: int
+    company_id: int
+    records: List[Dict[str, Any]]
+    log_identifier: Optional[str] = None
+    rerun: Optional[Union[RerunTime, RerunDepth]] = None
+
+
+class StreamColumnsEvent(StreamEvent):
+    """Stream event data with records passed as a column table.
+
+    Used by `@stream(records_as="columns")` apps.
+
+    Attributes:
+        asset_id: asset id.
+        company_id: company id.
+        columns: column name to column values mapping. Fields of the record `data`
+            dict are prefixed with `data.` (e.g. `data.hole_depth`).
+        log_identifier: app stream log identifier. Set for depth events only.
+        rerun: rerun metadata.
+    """
+
+    asset_id: int
+    company_id: int
+    columns: Dict[str, List[Any]]
+    log_identifier: Optional[str] = None
+    rerun: Optional[Union[RerunTime, RerunDepth]] = None
+
+
+class StreamCompactEvent(StreamEvent):
+    """Stream event data with records passed as compact records.
+
+    Used by `@stream(records_as="compact")` apps. Records keep the attribute
+    access of the record models (`record.timestamp`, `record.data`), but read
+    fields from the raw record dicts instead of copying them into pydantic models.
+
+    Attributes:
+        asset_id: asset id.
+        company_id: company id.
+        records: CompactTimeRecord or CompactDepthRecord records.
+        log_identifier: app stream log identifier. Set for depth events only.
+        rerun: rerun metadata.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    asset_id: int
+    company_id: int
+    records: CompactRecords
+    log_identifier: Optional[str] = None
+    rerun: Optional[Union[RerunTime, RerunDepth]] = None
+
+    def to_columns(
+        self, fields: Sequence[str], null_values: Collection[float] = ()
+    ) -> Dict[str, Any]:
+        """Builds contiguous typed arrays from the records.
+
+        Same as StreamTimeEvent.to_columns and StreamDepthEvent.to_columns.
+        """
+
+        return records_to_arrays(
+            self.records.raw,
+            fields=fields,
+            null_values=null_values,
+            int_fields=(
+                ("timestamp",)
+                if self.records.record_type is CompactTimeRecord
+                else ()
+            ),
+        )
@@ -0,0 +1,183 @@
+"""Per-invocation performance report and latency budget watchdog.
+
+The report is built from the tracing spans of the invocation, so it needs no
+extra instrumentation. Enabled with the `PERF_REPORT` setting.
+"""
+
+import contextlib
+import contextvars
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from corva import tracing
+from corva.configuration import SETTINGS
+from corva.logger import CORVA_LOGGER
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore[assignment]
+
+
+class PerfReport:
+    """Collects finished spans of the invocation and summarizes them.
+
+    Args:
+        budgets: phase (span name) -> max total milliseconds.
+    """
+
+    API_SPAN = 'corva.api.request'
+    CACHE_SPAN_PREFIX = 'corva.cache.'
+    INVOCATION_SPAN = 'corva.invocation'
+
+    def __init__(self, budgets: Optional[Mapping[str, float]] = None):
+        self.budgets = budgets or {}
+        self.started = time.perf_counter()
+        # name -> (count, total ms)
+        self.phases: Dict[str, Tuple[int, float]] = {}
+        self.api_durations: List[float] = []
+        self.cache_round_trips = 0
+        self.cache_duration = 0.0
+        self.records = 0
+        self._lock = threading.Lock()
+
+    def export(self, span: tracing.Span) -> None:
+        duration = ((span.end_time or span.start_time) - span.start_time) / 1e6
+
+        with self._lock:
+            if span.name == self.API_SPAN:
+                self.api_durations.append(duration)
+            elif span.name.startswith(self.CACHE_SPAN_PREFIX):
+                self.cache_round_trips += 1
+                self.cache_duration += duration
+            elif span.name != self.INVOCATION_SPAN:
+                count, total = self.phases.get(span.name, (0, 0.0))
+                self.phases[span.name] = (count + 1, total + duration)
+
+            self.records += span.attributes.get('corva.record_count', 0)
+
+    def over_budget(self) -> List[Tuple[str, float, float]]:
+        """Returns phases, that took longer than their budget."""
+
+        with self._lock:
+            return [
+                (name, total, self.budgets[name])
+                for name, (_, total) in self.phases.items()
+                if name in self.budgets and total > self.budgets[name]
+            ]
+
+    def summary(self) -> str:
+        with self._lock:
+            phases = ', '.join(
+                f'{name.removeprefix("corva.")}={total:.1f}ms'
+                + (f'(x{count})' if count > 1 else '')
+                for name, (count, total) in sorted(
+                    self.phases.items(), key=lambda item: item[1][1], reverse=True
+                )
+            )
+            api_durations = sorted(self.api_durations)
+            parts = [
+                f'total={(time.perf_counter() - self.started) * 1000:.1f}ms',
+                f'phases: {phases or "-"}',
+                (
+                    f'api: {len(api_durations)} calls, '
+                    f'p50={api_durations[len(api_durations) // 2]:.1f}ms, '
+                    f'max={api_durations[-1]:.1f}ms'
+                    if api_durations
+                    else 'api: 0 calls'
+                ),
+                (
+                    f'cache: {self.cache_round_trips} round trips, '
+                    f'{self.cache_duration:.1f}ms'
+                ),
+                f'records: {self.records}',
+            ]
+
+        peak_rss = get_peak_rss()
+
+        if peak_rss is not None:
+            parts.append(f'peak rss: {peak_rss / 2**20:.1f}MB')
+
+        if tracemalloc.is_tracing():
+            parts.append(
+                f'tracemalloc peak: {tracemalloc.get_traced_memory()[1] / 2**20:.1f}MB'
+            )
+
+        return '; '.join(parts)
+
+
+def get_peak_rss() -> Optional[int]:
+    """Returns peak resident set size of the process in bytes, if available."""
+
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def get_remaining_time(aws_context: Any) -> Optional[float]:
+    """Returns remaining Lambda time in milliseconds, if available."""
+
+    get_remaining_time_in_millis = getattr(
+        aws_context, 'get_remaining_time_in_millis', None
+    )
+
+    if get_remaining_time_in_millis is None:
+        return None
+
+    return float(get_remaining_time_in_millis())
+
+
+def _warn_low_remaining_time(report: PerfReport, aws_context: Any) -> None:
+    CORVA_LOGGER.warning(
+        f'Low remaining Lambda time: {get_remaining_time(aws_context):.0f}ms. '
+        f'Performance so far: {report.summary()}.'
+    )
+
+
+@contextlib.contextmanager
+def reporting(aws_context: Any) -> Iterator[Optional[PerfReport]]:
+    """Logs the performance report of the code inside the context.
+
+    Warns about phases over their budget and, while running, about low
+    remaining Lambda time, so slow invocations get noticed before they time out.
+    Yields None and does nothing, if the report is disabled.
+    """
+
+    if not SETTINGS.PERF_REPORT:
+        yield None
+        return
+
+    report = PerfReport(budgets=SETTINGS.PERF_BUDGETS_MS)
+    watchdog: Optional[threading.Timer] = None
+    remaining_time = get_remaining_time(aws_context)
+
+    if remaining_time is not None:
+        # the copied context keeps logging handlers of the invocation
+        watchdog = threading.Timer(
+            max(remaining_time - SETTINGS.PERF_MIN_REMAINING_TIME_MS, 0) / 1000,
+            contextvars.copy_context().run,
+            args=(_warn_low_remaining_time, report, aws_context),
+        )
+        watchdog.daemon = True
+        watchdog.start()
+
+    try:
+        with tracing.exporting(report):
+            yield report
+    finally:
+        if watchdog is not None:
+            watchdog.cancel()
+
+        for name, total, budget in report.over_budget():
+            CORVA_LOGGER.warning(
+                f'Phase {name!r} took {total:.1f}ms, over its {budget:.0f}ms budget.'
+            )
+
+        CORVA_LOGGER.info(f'Performance report: {report.summary()}.')
@@ -0,0 +1,149 @@
+"""Statistical stack sampling of sampled invocations.
+
+A daemon thread takes stacks of all other threads every `PROFILE_INTERVAL`
+seconds. Stacks are written in collapsed format ("frame;frame;frame count"),
+which flamegraph tools (flamegraph.pl, speedscope, inferno) read directly.
+Profiling is disabled by default, see `PROFILE_SAMPLE_RATE`.
+"""
+
+import contextlib
+import contextvars
+import os
+import random
+import sys
+import threading
+import time
+from types import CodeType
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from corva.configuration import SETTINGS
+from corva.logger import CORVA_LOGGER
+
+
+class StackSampler:
+    """Samples stacks of all threads in a background thread.
+
+    Args:
+        interval: seconds between samples.
+    """
+
+    MAX_DEPTH = 128
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        # stacks are keyed by code objects, labels are built once on output
+        self.stacks: Dict[Tuple[CodeType, ...], int] = {}
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='corva-profiler', daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+
+                stack: List[CodeType] = []
+                current: Optional[Any] = frame
+
+                while current is not None and len(stack) < self.MAX_DEPTH:
+                    stack.append(current.f_code)
+                    current = current.f_back
+
+                key = tuple(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """Returns stacks in collapsed format, one stack per line."""
+
+        labels: Dict[CodeType, str] = {}
+        lines = []
+
+        for stack, count in self.stacks.items():
+            for code in stack:
+                if code not in labels:
+                    labels[code] = _get_label(code)
+
+            lines.append(f'{";".join(labels[code] for code in stack)} {count}')
+
+        return '\n'.join(sorted(lines))
+
+
+def _get_label(code: CodeType) -> str:
+    path = code.co_filename.replace('\\', '/').split('/')
+    location = '/'.join(path[-2:])
+    # semicolons separate frames in collapsed format
+    return f'{code.co_qualname} ({location}:{code.co_firstlineno})'.replace(';', ',')
+
+
+_ACTIVE: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    'corva_profiling_active', default=False
+)
+
+
+@contextlib.contextmanager
+def profiling(name: str) -> Iterator[Optional[StackSampler]]:
+    """Profiles the code inside the context for a sampled fraction of calls.
+
+    Nested contexts are no-ops, so the outermost one profiles the whole call.
+    Yields None, if the call is not sampled.
+
+    Args:
+        name: profile name, e.g. AWS request id. Used in the file name.
+    """
+
+    if (
+        SETTINGS.PROFILE_SAMPLE_RATE <= 0
+        or _ACTIVE.get()
+        or random.random() >= SETTINGS.PROFILE_SAMPLE_RATE
+    ):
+        yield None
+        return
+
+    sampler = StackSampler(interval=SETTINGS.PROFILE_INTERVAL)
+    token = _ACTIVE.set(True)
+    sampler.start()
+
+    try:
+        yield sampler
+    finally:
+        sampler.stop()
+        _ACTIVE.reset(token)
+
+        try:
+            write_profile(name=name, sampler=sampler)
+        except Exception as e:
+            # profiling must never fail the app
+            CORVA_LOGGER.warning(f'Could not write the profile. Details: {str(e)}.')
+
+
+def write_profile(name: str, sampler: StackSampler) -> None:
+    collapsed = sampler.collapsed()
+
+    if SETTINGS.PROFILE_DIR is None:
+        CORVA_LOGGER.info(
+            f'Profile of {sampler.sample_count} samples '
+            f'every {sampler.interval}s:\n{collapsed}'
+        )
+        return
+
+    os.makedirs(SETTINGS.PROFILE_DIR, exist_ok=True)
+    path = os.path.join(SETTINGS.PROFILE_DIR, f'{name}-{time.time_ns()}.collapsed')
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(collapsed)
+
+    CORVA_LOGGER.info(f'Profile of {sampler.sample_count} samples saved to {path}.')
@@ -0,0 +1,243 @@
+"""Process-wide adaptive rate limiting of Corva API requests per host.
+
+All Api instances share the limiters, so a fleet of concurrent requests backs off
+together instead of retrying independently and amplifying the load.
+"""
+
+import email.utils
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+from corva import deadline
+from corva.configuration import SETTINGS
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Returns seconds to wait from Retry-After header value: seconds or HTTP date."""
+
+    if not value:
+        return None
+
+    value = value.strip()
+
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+class HostLimiter:
+    """Limits requests to a single host.
+
+    1. Concurrency and request rate adapt with AIMD (additive increase,
+        multiplicative decrease): throttling responses (429, 503) halve them,
+        other responses slowly bring them back to the maximums.
+    2. Retry-After of throttling responses pauses all requests to the host.
+    3. Retry budget: each request adds `retry_budget_ratio` tokens, each retry
+        takes one, so retries can't exceed that fraction of the traffic
+        (plus `retry_budget_burst`).
+
+    1 and 2 apply, if concurrency or rate limiting is enabled.
+
+    Args:
+        max_concurrency: max number of requests in flight.
+            `0` disables concurrency limiting.
+        max_rate: max requests per second. `0` disables rate limiting.
+        retry_budget_ratio: max ratio of retries to requests.
+            `0` disables the retry budget.
+        retry_budget_burst: retries allowed before any requests.
+    """
+
+    THROTTLE_STATUS_CODES = (429, 503)
+    DECREASE_FACTOR = 0.5
+    # throttling responses of a single burst decrease the limits once
+    DECREASE_COOLDOWN = 1.0  # seconds
+    # part of max rate restored per successful response
+    RATE_INCREASE_STEP = 0.01
+    MIN_RATE_FACTOR = 0.1
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_rate: float,
+        retry_budget_ratio: float,
+        retry_budget_burst: float,
+    ):
+        self.max_concurrency = max(max_concurrency, 0)
+        self.concurrency = float(self.max_concurrency)
+        self.max_rate = max_rate
+        self.rate = max_rate
+        self.tokens = max(max_rate, 1.0)
+        self.retry_budget_ratio = retry_budget_ratio
+        self.retry_budget_burst = retry_budget_burst
+        self.retry_tokens = retry_budget_burst
+
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_refill = time.monotonic()
+        self.last_decrease = -math.inf
+        self._condition = threading.Condition()
+
+    def _get_wait(self, now: float) -> Optional[float]:
+        """Returns seconds to wait before sending, None to wait for a release."""
+
+        if self.max_concurrency and self.in_flight >= int(self.concurrency):
+            return None
+
+        wait = max(self.blocked_until - now, 0.0)
+
+        if self.rate > 0:
+            self.tokens = min(
+                max(self.rate, 1.0), self.tokens + (now - self.last_refill) * self.rate
+            )
+            self.last_refill = now
+
+            if self.tokens < 1:
+                wait = max(wait, (1 - self.tokens) / self.rate)
+
+        return wait
+
+    def acquire(self) -> None:
+        """Waits for the permission to send a request.
+
+        Raises:
+            DeadlineExceededError: if the wait does not fit into the deadline.
+        """
+
+        with self._condition:
+            while True:
+                wait = self._get_wait(time.monotonic())
+
+                if wait == 0:
+                    break
+
+                budget = deadline.get_budget()
+
+                if budget is not None and budget <= (wait or 0):
+                    raise deadline.DeadlineExceededError(
+                        'Not enough time left to wait for the rate limit.'
+                    )
+
+                self._condition.wait(timeout=budget if wait is None else wait)
+
+            self.in_flight += 1
+
+            if self.rate > 0:
+                self.tokens -= 1
+
+            self.retry_tokens = min(
+                self.retry_budget_burst, self.retry_tokens + self.retry_budget_ratio
+            )
+
+    def release(self, status: Optional[int], retry_after: Optional[float]) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._update(status=status, retry_after=retry_after)
+            self._condition.notify_all()
+
+    def on_response(self, status: Optional[int], retry_after: Optional[float]) -> None:
+        """Adapts the limits to the response of a retried attempt."""
+
+        with self._condition:
+            self._update(status=status, retry_after=retry_after)
+            self._condition.notify_all()
+
+    def _update(self, status: Optional[int], retry_after: Optional[float]) -> None:
+        if status is None:
+            return  # connection errors say nothing about the load
+
+        if not self.max_concurrency and not self.max_rate:
+            return  # no limits to adapt
+
+        now = time.monotonic()
+
+        if status not in self.THROTTLE_STATUS_CODES:
+            if self.max_concurrency:
+                self.concurrency = min(
+                    float(self.max_concurrency),
+                    self.concurrency + 1 / self.concurrency,
+                )
+            self.rate = min(
+                self.max_rate, self.rate + self.max_rate * self.RATE_INCREASE_STEP
+            )
+            return
+
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+        if now - self.last_decrease >= self.DECREASE_COOLDOWN:
+            self.last_decrease = now
+            if self.max_concurrency:
+                self.concurrency = max(
+                    1.0, self.concurrency * self.DECREASE_FACTOR
+                )
+            self.rate = max(
+                self.max_rate * self.MIN_RATE_FACTOR,
+                self.rate * self.DECREASE_FACTOR,
+            )
+
+    def is_throttled(self) -> bool:
+        """Returns True, if the limits are lowered after throttling responses."""
+
+        with self._condition:
+            return (
+                self.concurrency < self.max_concurrency or self.rate < self.max_rate
+            )
+
+    def get_blocked_time(self) -> float:
+        """Returns seconds left until the host accepts requests again."""
+
+        with self._condition:
+            return max(self.blocked_until - time.monotonic(), 0.0)
+
+    def try_retry(self) -> bool:
+        """Takes a retry token. Returns False, if the retry budget is exhausted."""
+
+        if not self.retry_budget_ratio:
+            return True
+
+        with self._condition:
+            if self.retry_tokens < 1:
+                return False
+
+            self.retry_tokens -= 1
+            return True
+
+
+class RateLimiter:
+    """Host limiters of the process."""
+
+    def __init__(self) -> None:
+        self._hosts: Dict[str, HostLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, host: str) -> HostLimiter:
+        limiter = self._hosts.get(host)
+
+        if limiter is not None:
+            return limiter
+
+        with self._lock:
+            return self._hosts.setdefault(
+                host,
+                HostLimiter(
+                    max_concurrency=SETTINGS.API_CONCURRENCY_LIMIT,
+                    max_rate=SETTINGS.API_RATE_LIMIT,
+                    retry_budget_ratio=SETTINGS.API_RETRY_BUDGET_RATIO,
+                    retry_budget_burst=SETTINGS.API_RETRY_BUDGET_BURST,
+                ),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hosts = {}
+
+
+RATE_LIMITER = RateLimiter()
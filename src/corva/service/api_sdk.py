@@ -1,7 +1,12 @@
+import concurrent.futures
 import datetime
+import threading
+import time
 from typing import Dict, Optional, Protocol, Tuple
 
-from corva import api
+from corva import api, deadline
+from corva.concurrency import submit_in_context
+from corva.logger import CORVA_LOGGER
 
 
 class ApiSdkProtocol(Protocol):
@@ -9,28 +14,169 @@ class ApiSdkProtocol(Protocol):
         ...
 
 
+# shared by all invocations, threads are started on demand
+SECRETS_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    thread_name_prefix="corva-secrets"
+)
+# background refreshes, separate from SECRETS_EXECUTOR: prefetches running there
+# may wait for a refresh in progress, which must not queue behind them
+SECRETS_REFRESH_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    thread_name_prefix="corva-secrets-refresh"
+)
+
+
 class CachingApiSdk:
+    """Caches the secrets in memory between invocations.
+
+    Fresh secrets are returned right away. Secrets, that are about to expire or
+    expired less than `stale_ttl` seconds ago, are returned right away too and
+    get refreshed in background. Concurrent fetches of the same app key are
+    deduplicated. If the fetch fails, secrets that expired less than
+    `stale_if_error_ttl` seconds ago are returned instead of raising.
+
+    Args:
+        api_sdk: fetches the secrets.
+        ttl: seconds the secrets are fresh for.
+        stale_ttl: seconds after the expiry to serve the secrets while refreshing.
+        stale_if_error_ttl: seconds after the expiry to serve the secrets if the
+            fetch fails.
+        refresh_ahead: seconds before the expiry to start refreshing in background.
+    """
+
+    # background refreshes may outlive the invocation, so they get their own
+    # deadline instead of the invocation one
+    REFRESH_TIMEOUT = 30  # seconds
+
     SECRETS_CACHE: Dict[str, Tuple[datetime.datetime, Dict[str, str]]] = {}
+    # fetches in progress, to not fetch the same app key concurrently
+    IN_FLIGHT: Dict[str, "concurrent.futures.Future[Dict[str, str]]"] = {}
+    # guards SECRETS_CACHE and IN_FLIGHT, which are shared by concurrent invocations
+    _lock = threading.Lock()
 
-    def __init__(self, api_sdk: ApiSdkProtocol, ttl: int):
+    def __init__(
+        self,
+        api_sdk: ApiSdkProtocol,
+        ttl: int,
+        stale_ttl: int = 0,
+        stale_if_error_ttl: int = 0,
+        refresh_ahead: int = 0,
+    ):
         self.api_sdk = api_sdk
         self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.stale_if_error_ttl = stale_if_error_ttl
+        self.refresh_ahead = refresh_ahead
 
     def get_secrets(self, app_key: str) -> Dict[str, str]:
-        cache_entry = self.SECRETS_CACHE.get(app_key)
+        with self._lock:
+            cache_entry = self.SECRETS_CACHE.get(app_key)
 
-        if cache_entry is not None and cache_entry[0] > datetime.datetime.now(
-            tz=datetime.timezone.utc
-        ):
-            secrets = cache_entry[1]
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+
+        if cache_entry is not None:
+            expireat, secrets = cache_entry
+
+            if now < expireat - datetime.timedelta(seconds=self.refresh_ahead):
+                return secrets
+
+            if now < expireat + datetime.timedelta(seconds=self.stale_ttl):
+                self._fetch(app_key=app_key, background=True)
+                return secrets
+
+        try:
+            return self._fetch(app_key=app_key, background=False).result()
+        except Exception as e:
+            if cache_entry is None or now >= cache_entry[0] + datetime.timedelta(
+                seconds=self.stale_if_error_ttl
+            ):
+                raise
+
+            CORVA_LOGGER.warning(
+                f"Could not fetch secrets, using expired ones. Details: {str(e)}."
+            )
+            return cache_entry[1]
+
+    def _fetch(
+        self, app_key: str, background: bool
+    ) -> "concurrent.futures.Future[Dict[str, str]]":
+        """Starts the fetch or joins the one in progress."""
+
+        with self._lock:
+            future = self.IN_FLIGHT.get(app_key)
+
+            if future is not None:
+                return future
+
+            future = concurrent.futures.Future()
+            self.IN_FLIGHT[app_key] = future
+
+        if background:
+            future.add_done_callback(_log_refresh_error)
+            # the invocation context keeps the refresh errors in the invocation
+            # logs, the refresh sets its own deadline
+            submit_in_context(
+                SECRETS_REFRESH_EXECUTOR, self._run_refresh, app_key, future
+            )
         else:
+            self._run_fetch(app_key=app_key, future=future)
+
+        return future
+
+    def _run_refresh(
+        self, app_key: str, future: "concurrent.futures.Future[Dict[str, str]]"
+    ) -> None:
+        with deadline.setting(time.monotonic() + self.REFRESH_TIMEOUT):
+            self._run_fetch(app_key=app_key, future=future)
+
+    def _run_fetch(
+        self, app_key: str, future: "concurrent.futures.Future[Dict[str, str]]"
+    ) -> None:
+        try:
             secrets = self.api_sdk.get_secrets(app_key=app_key)
-            expireat = datetime.datetime.now(
-                tz=datetime.timezone.utc
-            ) + datetime.timedelta(seconds=self.ttl)
+        except Exception as e:
+            with self._lock:
+                self.IN_FLIGHT.pop(app_key, None)
+
+            future.set_exception(e)
+            return
+
+        expireat = datetime.datetime.now(
+            tz=datetime.timezone.utc
+        ) + datetime.timedelta(seconds=self.ttl)
+
+        with self._lock:
             self.SECRETS_CACHE[app_key] = (expireat, secrets)
+            self.IN_FLIGHT.pop(app_key, None)
 
-        return secrets
+        future.set_result(secrets)
+
+
+def _log_refresh_error(future: "concurrent.futures.Future[Dict[str, str]]") -> None:
+    exc = future.exception()
+
+    if exc is not None:
+        CORVA_LOGGER.warning(f"Could not refresh secrets. Details: {str(exc)}.")
+
+
+class PrefetchingApiSdk:
+    """Starts fetching the secrets in a background thread on creation.
+
+    Allows overlapping the secrets fetch with other invocation setup steps.
+    Fetch errors are raised from get_secrets.
+    """
+
+    def __init__(self, api_sdk: ApiSdkProtocol, app_key: str):
+        self.api_sdk = api_sdk
+        self.app_key = app_key
+        self.future = submit_in_context(
+            SECRETS_EXECUTOR, api_sdk.get_secrets, app_key
+        )
+
+    def get_secrets(self, app_key: str) -> Dict[str, str]:
+        if app_key != self.app_key:
+            return self.api_sdk.get_secrets(app_key=app_key)
+
+        return self.future.result()
 
 
 class CorvaApiSdk:
@@ -1,11 +1,11 @@
 import datetime
+import threading
 from functools import wraps
 from typing import Callable, Dict, Optional, Protocol, Sequence, Tuple, Union, cast
 
-import fakeredis
 import redis
 
-from corva import cache_adapter
+from corva import cache_adapter, tracing
 from corva.configuration import SETTINGS
 
 
@@ -51,13 +51,16 @@ def ensure_migrated_once(method: Callable) -> Callable:
             return method(self, *args, **kwargs)
 
         if not self._migrated:
-            try:
-                self.migrator.run()
-            finally:
-                # Regardless of outcome (True/False), mark as attempted to avoid
-                # repeating the check on every call. Subsequent calls operate on
-                # the new-hash namespace.
-                self._migrated = True
+            with self._migration_lock:
+                if not self._migrated:
+                    try:
+                        with tracing.span('corva.cache.migrate'):
+                            self.migrator.run()
+                    finally:
+                        # Regardless of outcome (True/False), mark as attempted to
+                        # avoid repeating the check on every call. Subsequent calls
+                        # operate on the new-hash namespace.
+                        self._migrated = True
 
         return method(self, *args, **kwargs)
 
@@ -83,6 +86,9 @@ class UserRedisSdk:
         # use either provided redis client, or initialize "fake" client
         # (usually used for tests), or initialize real new client
         if use_fakes:
+            # imported lazily, as only tests use it
+            import fakeredis
+
             redis_client = fakeredis.FakeRedis.from_url(
                 url=redis_dsn, decode_responses=True
             )
@@ -93,6 +99,7 @@ class UserRedisSdk:
         self._original_hash_name = hash_name
         self._redis_client = cast(redis.Redis, redis_client)
         self._migrated = False
+        self._migration_lock = threading.Lock()
 
         self.cache_repo = cache_adapter.RedisRepository(
             hash_name=cache_adapter.HashMigrator.NEW_HASH_PREFIX + hash_name,
@@ -1,7 +1,6 @@
 from typing import Any, Callable
-from unittest import mock
 
-from corva import shared
+from corva import profiling, shared, tracing
 from corva.service.api_sdk import ApiSdkProtocol
 
 
@@ -11,9 +10,14 @@ def run_app(
     api_sdk: ApiSdkProtocol,
     app: Callable[[], Any],
 ) -> Any:
-    secrets = api_sdk.get_secrets(app_key=app_key) if has_secrets else {}
+    if has_secrets:
+        with tracing.span('corva.get_secrets'):
+            secrets = api_sdk.get_secrets(app_key=app_key)
+    else:
+        secrets = {}
 
-    with mock.patch.dict(shared.SECRETS, values=secrets, clear=True):
-        result = app()
+    with shared.SECRETS.use(secrets), tracing.span('corva.app'):
+        with profiling.profiling('app'):
+            result = app()
 
     return result
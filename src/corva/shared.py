@@ -1,3 +1,82 @@
-from typing import Dict
+import contextlib
+import contextvars
+import threading
+from typing import Dict, Iterator, List, Mapping, MutableMapping, Optional
 
-SECRETS: Dict[str, str] = {}
+# secrets of the current app, None outside of the app
+_SECRETS: contextvars.ContextVar[Optional[Dict[str, str]]] = contextvars.ContextVar(
+    "corva_secrets", default=None
+)
+# process-wide secrets, used outside of the apps
+_GLOBAL_SECRETS: Dict[str, str] = {}
+# secrets of the running apps in the order they were started
+_ACTIVE_SECRETS: List[Dict[str, str]] = []
+_ACTIVE_SECRETS_LOCK = threading.Lock()
+
+
+def _get_secrets() -> Dict[str, str]:
+    secrets = _SECRETS.get()
+
+    if secrets is not None:
+        return secrets
+
+    # threads started by the app don't inherit the context, they get the secrets
+    # of the latest started app
+    active_secrets = _ACTIVE_SECRETS[-1:]
+
+    return active_secrets[0] if active_secrets else _GLOBAL_SECRETS
+
+
+class Secrets(MutableMapping[str, str]):
+    """Mapping of the app secrets.
+
+    Secrets are stored in a context variable, so concurrently running apps
+    (e.g., in different threads) see their own secrets. Threads started by the app
+    don't inherit the context and see the secrets of the latest started app.
+    Item assignment and `mock.patch.dict` change the secrets of the current
+    context, which are the process-wide secrets outside of the app.
+    """
+
+    def __getitem__(self, key: str) -> str:
+        return _get_secrets()[key]
+
+    def __setitem__(self, key: str, value: str) -> None:
+        _get_secrets()[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del _get_secrets()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_get_secrets())
+
+    def __len__(self) -> int:
+        return len(_get_secrets())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+    @contextlib.contextmanager
+    def use(self, secrets: Mapping[str, str]) -> Iterator[None]:
+        """Sets the secrets for the current context."""
+
+        context_secrets = dict(secrets)
+        token = _SECRETS.set(context_secrets)
+
+        with _ACTIVE_SECRETS_LOCK:
+            _ACTIVE_SECRETS.append(context_secrets)
+
+        try:
+            yield
+        finally:
+            _SECRETS.reset(token)
+
+            with _ACTIVE_SECRETS_LOCK:
+                # apps may finish in any order, when run in different threads
+                _ACTIVE_SECRETS[:] = [
+                    active
+                    for active in _ACTIVE_SECRETS
+                    if active is not context_secrets
+                ]
+
+
+SECRETS = Secrets()
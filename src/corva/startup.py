@@ -0,0 +1,154 @@
+"""Warmup of the SDK in the Lambda init phase.
+
+`warmup` moves one-time setup out of the first invocation: validators of event
+models get built, Corva API connections get opened and the Redis server version
+gets checked while the app module is imported. With SnapStart the snapshot keeps
+all of it, except the connections, which get reopened after restore.
+"""
+
+import random
+from typing import Any, Callable, Iterator, Optional, Type
+
+import pydantic
+import redis
+
+from corva import api_utils
+from corva.api import Api
+from corva.cache_adapter import HashMigrator
+from corva.configuration import SETTINGS
+from corva.handlers import get_api_sdk
+from corva.logger import CORVA_LOGGER
+from corva.models.base import CorvaBaseEvent, get_list_adapter
+from corva.models.scheduled.raw import RawScheduledEvent
+from corva.models.stream.initial import InitialStreamEvent
+from corva.models.stream.raw import RawStreamDictsEvent
+from corva.validate_app_init import read_manifest
+
+try:
+    import snapshot_restore_py
+except ImportError:  # available in Lambda runtimes with SnapStart only
+    snapshot_restore_py = None  # type: ignore[assignment]
+
+_SNAPSHOT_HOOKS_REGISTERED = False
+
+
+def warmup(*, api_key: Optional[str] = None, connect: bool = True) -> None:
+    """Does one-time SDK setup ahead of the first invocation.
+
+    Call it at the module level of the app, next to the handler.
+    Failed steps get logged and skipped, so warmup never fails the app.
+
+    Args:
+        api_key: API key to fetch the app secrets with. Secrets are not fetched,
+            if not provided.
+        connect: whether to open connections to Corva API and Data API hosts
+            and check the Redis server version.
+    """
+
+    _run_step(build_validators)
+    _run_step(read_manifest)
+
+    if connect:
+        _run_step(connect_api)
+        _run_step(check_redis_server_version)
+
+    if api_key is not None:
+        _run_step(fetch_secrets, api_key)
+
+    register_snapshot_hooks(connect=connect)
+
+
+def _run_step(step: Callable[..., object], *args: Any) -> None:
+    try:
+        step(*args)
+    except Exception as e:
+        CORVA_LOGGER.warning(f'Warmup step {step.__name__!r} failed. Details: {e}.')
+
+
+def _iter_subclasses(
+    cls: Type[pydantic.BaseModel],
+) -> Iterator[Type[pydantic.BaseModel]]:
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _iter_subclasses(subclass)
+
+
+def build_validators() -> None:
+    """Builds validators of event models and adapters, deferred until first use."""
+
+    for model in _iter_subclasses(CorvaBaseEvent):
+        if not model.__pydantic_complete__:
+            model.model_rebuild(force=True)
+
+    # raw events get parsed from lists of these models
+    for model in (InitialStreamEvent, RawScheduledEvent, RawStreamDictsEvent):
+        get_list_adapter(model)
+
+
+def _get_api(api_key: str = '') -> Api:
+    # same settings as Api instances of the handlers, so the adapter is shared
+    return Api(
+        api_url=SETTINGS.API_ROOT_URL,
+        data_api_url=SETTINGS.DATA_API_ROOT_URL,
+        api_key=api_key,
+        app_key=SETTINGS.APP_KEY,
+    )
+
+
+def connect_api() -> None:
+    """Opens connections to Corva API and Data API hosts (DNS, TCP, TLS)."""
+
+    api = _get_api()
+
+    for url in (api.api_url, api.data_api_url):
+        api_utils.connect(session=api._session, url=url, timeout=Api.TIMEOUT_LIMITS[0])
+
+
+def check_redis_server_version() -> None:
+    if SETTINGS.CACHE_SKIP_MIGRATION:
+        return  # the version is required by the cache migration only
+
+    client = redis.Redis.from_url(
+        url=SETTINGS.CACHE_URL,
+        decode_responses=True,
+        socket_timeout=Api.TIMEOUT_LIMITS[0],
+    )
+
+    try:
+        HashMigrator(hash_name='', client=client).check_redis_server_version()
+    finally:
+        client.close()
+
+
+def fetch_secrets(api_key: str) -> None:
+    """Puts the app secrets into the secrets cache."""
+
+    get_api_sdk(api=_get_api(api_key=api_key), prefetch=False).get_secrets(
+        app_key=SETTINGS.APP_KEY
+    )
+
+
+def before_snapshot() -> None:
+    # sockets can't be restored
+    api_utils.close_shared_adapters()
+
+
+def after_restore(connect: bool) -> None:
+    # restored environments must not share the random state, e.g. retry jitter
+    random.seed()
+
+    if connect:
+        _run_step(connect_api)
+
+
+def register_snapshot_hooks(connect: bool) -> None:
+    """Registers SnapStart hooks, if the runtime supports them. Once per process."""
+
+    global _SNAPSHOT_HOOKS_REGISTERED
+
+    if snapshot_restore_py is None or _SNAPSHOT_HOOKS_REGISTERED:
+        return
+
+    snapshot_restore_py.register_before_snapshot(before_snapshot)
+    snapshot_restore_py.register_after_restore(lambda: after_restore(connect=connect))
+    _SNAPSHOT_HOOKS_REGISTERED = True
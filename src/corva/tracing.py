@@ -0,0 +1,304 @@
+"""Tracing of invocation phases.
+
+Spans follow OpenTelemetry data model: 128-bit trace id, 64-bit span id, parent
+span id, start and end times in nanoseconds, attributes and status. Spans are
+created only when an exporter is set, otherwise span() returns a shared no-op
+context, so tracing costs nearly nothing when disabled.
+"""
+
+import contextlib
+import contextvars
+import json
+import random
+import threading
+import time
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    Protocol,
+    Sequence,
+    TextIO,
+    Union,
+)
+
+from corva.configuration import SETTINGS
+
+
+class Span:
+    """Timed operation inside a trace.
+
+    Attributes:
+        name: operation name.
+        trace_id: 32 hex chars trace id, shared by all spans of the trace.
+        span_id: 16 hex chars span id.
+        parent_span_id: span id of the parent span, None for root spans.
+        attributes: operation details.
+        start_time: start time in nanoseconds since epoch.
+        end_time: end time in nanoseconds since epoch.
+        status: "UNSET", "OK" or "ERROR".
+        status_message: error description.
+    """
+
+    __slots__ = (
+        'name',
+        'trace_id',
+        'span_id',
+        'parent_span_id',
+        'attributes',
+        'start_time',
+        'end_time',
+        'status',
+        'status_message',
+    )
+
+    is_recording = True
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str],
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self.parent_span_id = parent_span_id
+        self.attributes = dict(attributes) if attributes else {}
+        self.start_time = time.time_ns()
+        self.end_time: Optional[int] = None
+        self.status = 'UNSET'
+        self.status_message: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        """W3C Trace Context header value."""
+
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = 'ERROR'
+        self.status_message = f'{type(exc).__name__}: {exc}'
+
+    def end(self) -> None:
+        self.end_time = time.time_ns()
+
+        if self.status == 'UNSET':
+            self.status = 'OK'
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_span_id,
+            'start_time_unix_nano': self.start_time,
+            'end_time_unix_nano': self.end_time,
+            'attributes': self.attributes,
+            'status': {'code': self.status, 'message': self.status_message},
+        }
+
+
+class NoOpSpan:
+    """Span, that records nothing. Returned when tracing is disabled."""
+
+    is_recording = False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+
+NOOP_SPAN = NoOpSpan()
+
+
+class SpanExporter(Protocol):
+    def export(self, span: Span) -> None: ...
+
+
+class JsonLinesExporter:
+    """Writes finished spans as JSON lines.
+
+    Args:
+        write: writes a line.
+    """
+
+    ENCODER = json.JSONEncoder(separators=(',', ':'), default=str)
+
+    def __init__(self, write: Callable[[str], Any]):
+        self.write = write
+        self._lock = threading.Lock()
+
+    @classmethod
+    def to_stdout(cls) -> 'JsonLinesExporter':
+        from corva.logger import STDOUT_BUFFER
+
+        return cls(write=STDOUT_BUFFER.write)
+
+    @classmethod
+    def to_file(cls, path: str) -> 'JsonLinesExporter':
+        file: Optional[TextIO] = None
+
+        def write(line: str) -> None:
+            nonlocal file
+
+            # opened on first export, so importing corva does not create the file
+            if file is None:
+                # line buffered, so spans are not lost if the process gets killed
+                file = open(path, 'a', buffering=1, encoding='utf-8')
+
+            file.write(line)
+
+        return cls(write=write)
+
+    def export(self, span: Span) -> None:
+        line = f'{self.ENCODER.encode(span.to_dict())}\n'
+
+        with self._lock:
+            self.write(line)
+
+
+_EXPORTER: Optional[SpanExporter] = None
+_CURRENT_SPAN: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    'corva_current_span', default=None
+)
+# exporter of the current context only, in addition to the global one
+_CONTEXT_EXPORTER: contextvars.ContextVar[Optional[SpanExporter]] = (
+    contextvars.ContextVar('corva_context_exporter', default=None)
+)
+
+
+def set_exporter(exporter: Optional[SpanExporter]) -> None:
+    """Enables tracing with the exporter. None disables the tracing."""
+
+    global _EXPORTER
+    _EXPORTER = exporter
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    return _EXPORTER
+
+
+def is_enabled() -> bool:
+    return _EXPORTER is not None or _CONTEXT_EXPORTER.get() is not None
+
+
+@contextlib.contextmanager
+def exporting(exporter: SpanExporter) -> Iterator[None]:
+    """Exports spans of the current context to the exporter too."""
+
+    token = _CONTEXT_EXPORTER.set(exporter)
+
+    try:
+        yield
+    finally:
+        _CONTEXT_EXPORTER.reset(token)
+
+
+class _SpanContext:
+    __slots__ = ('name', 'attributes', 'exporters', 'span', 'token')
+
+    def __init__(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]],
+        exporters: Sequence[SpanExporter],
+    ):
+        self.name = name
+        self.attributes = attributes
+        self.exporters = exporters
+
+    def __enter__(self) -> Span:
+        parent = _CURRENT_SPAN.get()
+
+        self.span = Span(
+            name=self.name,
+            trace_id=(
+                f'{random.getrandbits(128):032x}' if parent is None else parent.trace_id
+            ),
+            parent_span_id=None if parent is None else parent.span_id,
+            attributes=self.attributes,
+        )
+        self.token = _CURRENT_SPAN.set(self.span)
+
+        return self.span
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _CURRENT_SPAN.reset(self.token)
+
+        if exc_val is not None:
+            self.span.record_exception(exc_val)
+
+        self.span.end()
+
+        for exporter in self.exporters:
+            try:
+                exporter.export(self.span)
+            except Exception:
+                pass  # tracing must never break the app
+
+        return False
+
+
+class _NoOpSpanContext:
+    __slots__ = ()
+
+    def __enter__(self) -> NoOpSpan:
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NOOP_SPAN_CONTEXT = _NoOpSpanContext()
+
+
+def span(
+    name: str, attributes: Optional[Dict[str, Any]] = None
+) -> Union[_SpanContext, _NoOpSpanContext]:
+    """Returns context manager, that traces the code inside it as a span.
+
+    The span becomes a child of the current span.
+    """
+
+    exporter = _EXPORTER
+    context_exporter = _CONTEXT_EXPORTER.get()
+
+    if context_exporter is None:
+        if exporter is None:
+            return _NOOP_SPAN_CONTEXT
+
+        exporters: Sequence[SpanExporter] = (exporter,)
+    elif exporter is None:
+        exporters = (context_exporter,)
+    else:
+        exporters = (exporter, context_exporter)
+
+    return _SpanContext(name=name, attributes=attributes, exporters=exporters)
+
+
+def current_span() -> Union[Span, NoOpSpan]:
+    return _CURRENT_SPAN.get() or NOOP_SPAN
+
+
+def inject(headers: Dict[str, str]) -> None:
+    """Adds trace context of the current span to outgoing request headers."""
+
+    current = _CURRENT_SPAN.get()
+
+    if current is not None:
+        headers['traceparent'] = current.traceparent
+
+
+if SETTINGS.TRACING_EXPORTER == 'stdout':
+    set_exporter(JsonLinesExporter.to_stdout())
+elif SETTINGS.TRACING_EXPORTER == 'file':
+    set_exporter(JsonLinesExporter.to_file(SETTINGS.TRACING_FILE))
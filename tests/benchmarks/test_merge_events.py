@@ -0,0 +1,51 @@
+import copy
+import random
+
+import pytest
+
+from corva.handlers import _merge_stream_records
+
+from .utils import measure, report
+
+
+def get_events(events_count: int, records_count: int) -> list:
+    events = []
+
+    for event_idx in range(events_count):
+        # events overlap by a half
+        start = event_idx * records_count // 2
+        events.append(
+            {
+                "metadata": {"log_type": "time"},
+                "records": [
+                    {"timestamp": timestamp, "collection": "wits", "data": {}}
+                    for timestamp in range(start, start + records_count)
+                ],
+            }
+        )
+
+    return events
+
+
+@pytest.mark.parametrize("events_count", (2, 10, 50))
+def test_merge_sorted_events(events_count):
+    events = get_events(events_count=events_count, records_count=10_000)
+
+    result = _merge_stream_records(events)
+
+    assert len(result) == (events_count + 1) * 5_000
+    report(
+        f"merge {events_count} sorted events",
+        measure(lambda: _merge_stream_records(events)),
+    )
+
+
+def test_merge_unsorted_events():
+    events = get_events(events_count=10, records_count=10_000)
+    for event in events:
+        random.shuffle(event["records"])
+
+    report(
+        "merge 10 unsorted events",
+        measure(lambda: _merge_stream_records(copy.deepcopy(events))),
+    )
@@ -0,0 +1,123 @@
+from typing import Callable, Dict, List
+
+import pytest
+
+from corva.configuration import SETTINGS
+from corva.models.merge.raw import RawPartialRerunMergeEvent
+from corva.models.scheduled.raw import RawScheduledEvent
+from corva.models.stream.raw import RawStreamDictsEvent, RawStreamEvent
+from corva.models.task import RawTaskEvent
+
+from .utils import measure, report
+
+RECORDS_PER_EVENT = 10
+
+
+def get_stream_event(log_type: str) -> dict:
+    value_key = "timestamp" if log_type == "time" else "measured_depth"
+
+    return {
+        "records": [
+            {
+                "asset_id": 1,
+                "company_id": 1,
+                "collection": "wits",
+                value_key: value,
+                "data": {"hole_depth": 1.0, "bit_depth": 1.0},
+            }
+            for value in range(RECORDS_PER_EVENT)
+        ],
+        "metadata": {
+            "app_stream_id": 1,
+            "apps": {SETTINGS.APP_KEY: {"app_connection_id": 1}},
+            "log_type": log_type,
+            "log_identifier": "log",
+        },
+    }
+
+
+SCHEDULED_EVENT = {
+    "asset_id": 1,
+    "company": 1,
+    "schedule": 1,
+    "app_connection": 1,
+    "app_stream": 1,
+    "schedule_start": 1_700_000_000_000,
+    "interval": 60,
+}
+SCHEDULED_EVENTS = {
+    "natural time": {**SCHEDULED_EVENT, "scheduler_type": 1},
+    "data time": {**SCHEDULED_EVENT, "scheduler_type": 2},
+    "depth": {
+        **SCHEDULED_EVENT,
+        "scheduler_type": 4,
+        "top_depth": 0.0,
+        "bottom_depth": 1.0,
+        "log_identifier": "log",
+        "depth_milestone": 1.0,
+    },
+}
+TASK_EVENT = {"task_id": "1", "version": 2}
+MERGE_EVENT = {
+    "event_type": "partial-well-rerun-merge",
+    "data": {
+        "asset_id": 1,
+        "rerun_asset_id": 2,
+        "app_stream_id": 1,
+        "rerun_app_stream_id": 2,
+        "version": 2,
+        "app_connection_id": 1,
+        "rerun_app_connection_id": 2,
+    },
+}
+
+
+def parse_each(parse: Callable[[dict], list]) -> Callable[[List[dict]], list]:
+    """Parses events one by one, as the event type comes one per invocation."""
+
+    return lambda events: [parsed for event in events for parsed in parse(event)]
+
+
+PARSERS: Dict[str, Callable[[int], Callable[[], list]]] = {
+    **{
+        f"stream {log_type}": lambda count, log_type=log_type: (
+            lambda events=[get_stream_event(log_type)] * count: (
+                RawStreamEvent.from_raw_event(events)
+            )
+        )
+        for log_type in ("time", "depth")
+    },
+    "stream dicts": lambda count: (
+        lambda events=[get_stream_event("time")] * count: (
+            RawStreamDictsEvent.from_raw_event(events)
+        )
+    ),
+    **{
+        f"scheduled {name}": lambda count, event=event: (
+            lambda events=[[event] * count]: RawScheduledEvent.from_raw_event(events)
+        )
+        for name, event in SCHEDULED_EVENTS.items()
+    },
+    "task": lambda count: (
+        lambda events=[TASK_EVENT] * count: (
+            parse_each(RawTaskEvent.from_raw_event)(events)
+        )
+    ),
+    "partial rerun merge": lambda count: (
+        lambda events=[MERGE_EVENT] * count: (
+            parse_each(RawPartialRerunMergeEvent.from_raw_event)(events)
+        )
+    ),
+}
+
+
+@pytest.mark.parametrize("events_count", (1, 100, 10_000))
+@pytest.mark.parametrize("event_type", PARSERS)
+def test_parse_events(event_type, events_count):
+    parse = PARSERS[event_type](events_count)
+
+    assert len(parse()) == events_count
+    report(
+        f"parse {events_count} {event_type} events",
+        measure(parse, repeat=3 if events_count == 10_000 else 5),
+    )
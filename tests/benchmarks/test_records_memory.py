@@ -0,0 +1,70 @@
+from typing import Callable, Dict, Tuple
+
+import pytest
+
+from corva.handlers import get_stream_app_event
+from corva.models.stream.raw import RawStreamDictsEvent, RawStreamEvent, RecordsAs
+
+from .test_parse_events import get_stream_event
+from .utils import measure_memory, report_memory
+
+RECORDS_COUNT = 50_000
+# compact records must take at most this share of the record models memory
+COMPACT_MEMORY_RATIO = 0.1
+
+
+def get_events(log_type: str) -> list:
+    event = get_stream_event(log_type)
+    value_key = "timestamp" if log_type == "time" else "measured_depth"
+
+    event["records"] = [
+        {**event["records"][0], value_key: value, "data": {"hole_depth": 1.0}}
+        for value in range(RECORDS_COUNT)
+    ]
+
+    return [event]
+
+
+def build_app_event(events: list, records_as: RecordsAs) -> Callable[[], tuple]:
+    """Does what `@stream` does with the aws event before calling the app."""
+
+    parse = (
+        RawStreamEvent.from_raw_event
+        if records_as == "models"
+        else RawStreamDictsEvent.from_raw_event
+    )
+
+    def build() -> tuple:
+        event = parse(events)[0]
+        records = event.filter_records(old_max_record_value=None)
+        return event, get_stream_app_event(event, records, records_as)
+
+    return build
+
+
+@pytest.fixture(scope="module")
+def memory() -> Dict[Tuple[str, str], Tuple[int, int]]:
+    return {
+        (log_type, records_as): measure_memory(
+            build_app_event(get_events(log_type), records_as)
+        )
+        for log_type in ("time", "depth")
+        for records_as in ("models", "dicts", "compact")
+    }
+
+
+@pytest.mark.parametrize("records_as", ("models", "dicts", "compact"))
+@pytest.mark.parametrize("log_type", ("time", "depth"))
+def test_records_memory(log_type, records_as, memory):
+    retained, peak = memory[log_type, records_as]
+
+    report_memory(f"{RECORDS_COUNT} {log_type} records as {records_as}", retained)
+    report_memory(f"{RECORDS_COUNT} {log_type} records as {records_as} peak", peak)
+
+
+@pytest.mark.parametrize("log_type", ("time", "depth"))
+def test_compact_records_take_less_memory(log_type, memory):
+    compact, _ = memory[log_type, "compact"]
+    models, _ = memory[log_type, "models"]
+
+    assert compact < models * COMPACT_MEMORY_RATIO
@@ -0,0 +1,33 @@
+import gc
+import timeit
+import tracemalloc
+from typing import Callable, Tuple
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, number: int = 1) -> float:
+    """Returns the best time of a single fn call in seconds."""
+
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def report(name: str, seconds: float) -> None:
+    print(f"\n{name}: {seconds * 1000:.3f} ms")
+
+
+def measure_memory(fn: Callable[[], object]) -> Tuple[int, int]:
+    """Returns memory in bytes allocated by fn: retained by its result and peak."""
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = fn()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del result
+    return retained, peak
+
+
+def report_memory(name: str, size: int) -> None:
+    print(f"\n{name}: {size / 2**20:.3f} MiB")
@@ -5,7 +5,10 @@ from fakeredis import FakeRedis
 from redis import Redis
 
 from corva import cache_adapter
+from corva.circuit_breaker import CIRCUIT_BREAKER
 from corva.configuration import SETTINGS
+from corva.hedging import HEDGER
+from corva.rate_limit import RATE_LIMITER
 from corva.testing import TestClient
 from corva.validate_app_init import read_manifest
 
@@ -50,6 +53,17 @@ def clean_read_manifest_lru_cache():
     read_manifest.cache_clear()
 
 
+@pytest.fixture(scope="function", autouse=True)
+def clean_rate_limiter():
+    RATE_LIMITER.clear()
+    HEDGER.clear()
+    CIRCUIT_BREAKER.clear()
+    yield
+    RATE_LIMITER.clear()
+    HEDGER.clear()
+    CIRCUIT_BREAKER.clear()
+
+
 @pytest.fixture(scope="function")
 def context():
     return TestClient._context
@@ -6,8 +6,10 @@ from http import HTTPStatus
 
 import pytest
 import requests
+from pytest_mock import MockerFixture
 from requests_mock import Mocker as RequestsMocker
 
+from corva import api_utils
 from corva.api import Api
 from corva.configuration import SETTINGS
 from corva.handlers import task
@@ -210,3 +212,33 @@ def test__app_insert_data__improves_coverage(api, requests_mock: RequestsMocker)
     )
 
     assert post_mock.called_once is True
+
+
+def test_sessions_with_same_settings_share_adapter(mocker: MockerFixture):
+    settings = {
+        'max_retries': 1,
+        'backoff_factor': 0,
+        'pool_connections_count': 1,
+        'pool_max_size': 1,
+        'pool_block': False,
+    }
+
+    session = api_utils.get_shared_session(**settings)
+    other_session = api_utils.get_shared_session(**settings)
+    adapter = session.get_adapter('https://api.example.com')
+
+    assert other_session is not session
+    assert other_session.get_adapter('https://api.example.com') is adapter
+    assert session.get_adapter('http://api.example.com') is adapter
+    assert (
+        api_utils.get_shared_session(**{**settings, 'max_retries': 2}).get_adapter(
+            'https://api.example.com'
+        )
+        is not adapter
+    )
+
+    close = mocker.spy(adapter, 'close')
+
+    api_utils.close_shared_adapters()
+
+    close.assert_called_once_with()
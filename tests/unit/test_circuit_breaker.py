@@ -0,0 +1,182 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+from requests_mock import Mocker as RequestsMocker
+from urllib3.exceptions import MaxRetryError
+
+from corva import CircuitOpenError
+from corva.api_utils import DeadlineAwareRetry
+from corva.circuit_breaker import CIRCUIT_BREAKER, HostBreaker
+from corva.configuration import SETTINGS
+from corva.handlers import task
+from corva.models.task import TaskEvent
+
+
+def get_breaker(**kwargs) -> HostBreaker:
+    return HostBreaker(
+        **{
+            'host': 'host',
+            'failure_threshold': 2,
+            'reset_timeout': 60,
+            'half_open_max_calls': 1,
+            **kwargs,
+        }
+    )
+
+
+@pytest.fixture
+def api(app_runner, mocker: MockerFixture):
+    mocker.patch.object(SETTINGS, 'API_CIRCUIT_FAILURE_THRESHOLD', 1)
+
+    @task
+    def app(event, api):
+        return api
+
+    return app_runner(app, TaskEvent(asset_id=int(), company_id=int()))
+
+
+@pytest.mark.parametrize(
+    'status, expected', ((200, True), (404, True), (429, None), (503, False))
+)
+def test_is_success(status, expected):
+    assert HostBreaker.is_success(status) is expected
+
+
+def test_failures_in_a_row_open_circuit():
+    breaker = get_breaker()
+
+    breaker.on_failure()
+    breaker.on_success()
+    breaker.on_failure()
+
+    assert breaker.state == HostBreaker.CLOSED
+    assert not breaker.acquire()
+
+    breaker.on_failure()
+
+    assert breaker.is_open()
+
+    with pytest.raises(CircuitOpenError, match='Circuit of host is open'):
+        breaker.acquire()
+
+
+def test_half_open_circuit_lets_probes_through():
+    breaker = get_breaker(failure_threshold=1, reset_timeout=0)
+    breaker.on_failure()
+
+    assert breaker.acquire()
+    assert breaker.state == HostBreaker.HALF_OPEN
+
+    with pytest.raises(CircuitOpenError):
+        breaker.acquire()
+
+    breaker.release(probe=True, success=None)  # unknown outcome frees the slot
+
+    assert breaker.acquire()
+
+    breaker.release(probe=True, success=True)
+
+    assert breaker.state == HostBreaker.CLOSED
+    assert not breaker.acquire()
+
+
+def test_failed_probe_opens_circuit():
+    breaker = get_breaker(failure_threshold=5, reset_timeout=0)
+    for _ in range(5):
+        breaker.on_failure()
+
+    probe = breaker.acquire()
+    breaker.reset_timeout = 60
+    breaker.release(probe=probe, success=False)
+
+    assert breaker.is_open()
+    assert breaker.probes == 0
+
+
+def test_disabled_breaker_never_opens():
+    breaker = get_breaker(failure_threshold=0)
+
+    for _ in range(10):
+        breaker.on_failure()
+
+    assert not breaker.acquire()
+    assert breaker.state == HostBreaker.CLOSED
+
+
+def test_retry_stops_when_circuit_opens(mocker: MockerFixture):
+    mocker.patch.object(SETTINGS, 'API_CIRCUIT_FAILURE_THRESHOLD', 2)
+    pool = SimpleNamespace(host='host')
+    response = SimpleNamespace(
+        status=503, headers={}, get_redirect_location=lambda: False
+    )
+    retry = DeadlineAwareRetry(total=5, status_forcelist=(503,))
+
+    retry = retry.increment(method='GET', url='/', response=response, _pool=pool)
+
+    assert isinstance(retry, DeadlineAwareRetry)
+    assert retry.host == 'host'
+
+    with pytest.raises(MaxRetryError):
+        retry.increment(method='GET', url='/', response=response, _pool=pool)
+
+    # the last attempt is not retried, its outcome gets recorded by Api
+    breaker = CIRCUIT_BREAKER.get('host')
+    assert breaker.failures == 1
+    assert not breaker.is_open()
+
+
+def test_retried_failures_do_not_open_circuit():
+    breaker = get_breaker(failure_threshold=3)
+
+    assert breaker.on_retried_failure()
+    assert breaker.on_retried_failure()
+    assert not breaker.on_retried_failure()  # would open the circuit
+    assert breaker.failures == 2
+
+    breaker.release(probe=False, success=False)  # recorded once, by Api
+
+    assert breaker.is_open()
+    assert not breaker.on_retried_failure()
+
+
+def test_api_fails_fast_with_open_circuit(api, requests_mock: RequestsMocker):
+    adapter = requests_mock.get(f'{SETTINGS.API_ROOT_URL}/', status_code=500)
+
+    assert api.get('/').status_code == 500
+
+    with pytest.raises(CircuitOpenError):
+        api.get('/')
+
+    assert adapter.call_count == 1
+
+
+def test_api_connection_error_opens_circuit(api, requests_mock: RequestsMocker):
+    requests_mock.get(f'{SETTINGS.API_ROOT_URL}/', exc=requests.ConnectionError)
+
+    with pytest.raises(requests.ConnectionError):
+        api.get('/')
+
+    with pytest.raises(CircuitOpenError):
+        api.get('/')
+
+
+def test_api_uses_fallback_with_open_circuit(api, requests_mock: RequestsMocker):
+    requests_mock.get(f'{SETTINGS.API_ROOT_URL}/', status_code=500)
+    api.get('/')
+    cached = requests.Response()
+    cached.status_code = 200
+    calls = []
+
+    def fallback(method, url, params):
+        calls.append((method, url, params))
+        return cached if method == 'GET' else None
+
+    CIRCUIT_BREAKER.set_fallback(fallback)
+
+    assert api.get('/', params={'a': 1}) is cached
+    assert calls == [('GET', f'{SETTINGS.API_ROOT_URL}/', {'a': 1})]
+
+    with pytest.raises(CircuitOpenError):
+        api.post('/')
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from corva import concurrency
+
+
+def test_map_grouped_keeps_order():
+    calls = []
+
+    def fn(items):
+        calls.append(items)
+        return [item * 10 for item in items]
+
+    result = concurrency.map_grouped(
+        fn=fn, items=[1, 2, 3, 4, 5], key=lambda item: item % 2, max_workers=2
+    )
+
+    assert result == [10, 20, 30, 40, 50]
+    assert sorted(calls) == [[1, 3, 5], [2, 4]]
+
+
+def test_map_grouped_runs_groups_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fn(items):
+        barrier.wait()  # fails with BrokenBarrierError if groups run one by one
+        return items
+
+    assert concurrency.map_grouped(
+        fn=fn, items=["a", "b"], key=lambda item: item, max_workers=2
+    ) == ["a", "b"]
+
+
+def test_map_grouped_none_key_makes_separate_groups():
+    result = concurrency.map_grouped(
+        fn=lambda items: [len(items)] * len(items),
+        items=[1, 2, 3],
+        key=lambda item: None,
+        max_workers=3,
+    )
+
+    assert result == [1, 1, 1]
+
+
+def test_map_grouped_raises_first_exception():
+    def fn(items):
+        if items == [2]:
+            time.sleep(0.01)
+            raise ValueError("2")
+        if items == [3]:
+            raise KeyError("3")
+        return items
+
+    with pytest.raises(ValueError):
+        concurrency.map_grouped(
+            fn=fn, items=[1, 2, 3], key=lambda item: item, max_workers=3
+        )
+
+
+def test_run_in_background_runs_right_away_outside_of_background_tasks():
+    result = []
+
+    concurrency.run_in_background(result.append, 1)
+
+    assert result == [1]
+
+
+def test_background_tasks_waits_for_tasks_on_exit():
+    result = []
+
+    with concurrency.background_tasks():
+        concurrency.run_in_background(lambda: (time.sleep(0.05), result.append(1)))
+
+        assert result == []
+
+    assert result == [1]
@@ -0,0 +1,184 @@
+import socketserver
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+from pytest_mock import MockerFixture
+from requests_mock import Mocker as RequestsMocker
+
+from corva import Api, DeadlineExceededError, deadline
+from corva.api_utils import DeadlineAwareRetry, DeadlineTimeout
+from corva.configuration import SETTINGS
+from corva.handlers import stream, task
+from corva.models.stream.log_type import LogType
+from corva.models.stream.raw import (
+    RawAppMetadata,
+    RawMetadata,
+    RawStreamTimeEvent,
+    RawTimeRecord,
+)
+from corva.models.task import TaskEvent
+
+
+@pytest.fixture(autouse=True)
+def reserve(mocker: MockerFixture):
+    mocker.patch.object(SETTINGS, 'DEADLINE_RESERVE_MS', 2000)
+
+
+def in_seconds(seconds: float) -> float:
+    return time.monotonic() + seconds
+
+
+def test_no_deadline_keeps_timeout():
+    assert deadline.get_budget() is None
+    assert deadline.fit_timeout(30) == 30
+
+
+def test_fit_timeout_shrinks_to_budget_without_reserve():
+    with deadline.setting(in_seconds(10)):
+        assert 7.9 < deadline.fit_timeout(30) <= 8
+        assert deadline.fit_timeout(3) == 3
+
+
+def test_exhausted_budget_raises_unless_using_reserve():
+    with deadline.setting(in_seconds(1)):
+        with pytest.raises(DeadlineExceededError):
+            deadline.fit_timeout(30)
+
+        with deadline.using_reserve():
+            assert 0.9 < deadline.fit_timeout(30) <= 1
+
+
+def test_retry_pause_shrinks_to_budget(mocker: MockerFixture):
+    sleep = mocker.patch('time.sleep')
+    retry = DeadlineAwareRetry(total=3, backoff_factor=10**6).increment(
+        method='GET', url='/'
+    ).increment(method='GET', url='/')
+
+    with deadline.setting(in_seconds(6)):
+        retry.sleep()
+
+    # 6s - 2s reserve - 1s for the attempt
+    assert 2.9 < sleep.call_args.args[0] <= 3
+
+
+def test_retry_raises_if_no_time_left_for_attempt(mocker: MockerFixture):
+    sleep = mocker.patch('time.sleep')
+    retry = DeadlineAwareRetry(total=3, backoff_factor=1).increment(
+        method='GET', url='/'
+    )
+
+    with deadline.setting(in_seconds(2.5)):
+        with pytest.raises(DeadlineExceededError):
+            retry.sleep()
+
+    sleep.assert_not_called()
+
+
+def test_timeout_fits_deadline_on_each_clone():
+    timeout = DeadlineTimeout(30)
+
+    assert timeout.clone().read_timeout == 30
+
+    with deadline.setting(in_seconds(5)):
+        assert 2.9 < timeout.clone().read_timeout <= 3  # type: ignore[operator]
+        assert 2.9 < timeout.clone().connect_timeout <= 3  # type: ignore[operator]
+
+    with deadline.setting(in_seconds(1)):
+        with pytest.raises(DeadlineExceededError):
+            timeout.clone()
+
+
+def test_api_request_timeout_fits_deadline(app_runner, requests_mock: RequestsMocker):
+    @task
+    def app(event, api):
+        return api
+
+    api = app_runner(app, TaskEvent(asset_id=int(), company_id=int()))
+    requests_mock.get(f'{SETTINGS.API_ROOT_URL}/')
+
+    with deadline.setting(in_seconds(5)):
+        api.get('/')
+
+    assert isinstance(requests_mock.last_request.timeout, DeadlineTimeout)
+    assert requests_mock.last_request.timeout.read_timeout == Api.TIMEOUT_LIMITS[1]
+
+
+class SlowRetryHandler(socketserver.StreamRequestHandler):
+    """Answers the first request slowly with 503, never answers the retry."""
+
+    def handle(self) -> None:
+        while self.rfile.readline() not in (b'\r\n', b''):
+            pass  # a body-less request ends with an empty line
+
+        self.server.requests += 1  # type: ignore[attr-defined]
+
+        if self.server.requests > 1:  # type: ignore[attr-defined]
+            time.sleep(5)
+            return
+
+        time.sleep(0.5)
+        self.wfile.write(
+            b'HTTP/1.1 503 Service Unavailable\r\n'
+            b'Content-Length: 0\r\nConnection: close\r\n\r\n'
+        )
+
+
+def test_slow_retry_timeout_fits_deadline(mocker: MockerFixture):
+    mocker.patch.object(SETTINGS, 'DEADLINE_RESERVE_MS', 0)
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SlowRetryHandler)
+    server.daemon_threads = True
+    server.requests = 0  # type: ignore[attr-defined]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    api = Api(
+        api_url=url,
+        data_api_url=url,
+        api_key='',
+        app_key='',
+        max_retries=3,
+        backoff_factor_retries=0.001,
+    )
+
+    # the first attempt takes 0.5s, the retry gets 1.3s instead of 1.8s
+    with deadline.setting(in_seconds(1.8)):
+        start = time.monotonic()
+
+        with pytest.raises((DeadlineExceededError, requests.ConnectionError)):
+            api.get('/')
+
+    server.shutdown()
+    server.server_close()
+
+    assert server.requests == 2  # type: ignore[attr-defined]
+    assert time.monotonic() - start < 2.1
+
+
+def test_stream_app_fails_with_typed_error_near_timeout(mocker: MockerFixture):
+    context = SimpleNamespace(
+        aws_request_id='qwerty',
+        client_context=SimpleNamespace(env={'API_KEY': '123'}),
+        get_remaining_time_in_millis=lambda: 1000,
+    )
+    app = mocker.Mock()
+    event = [
+        RawStreamTimeEvent(
+            records=[
+                RawTimeRecord(
+                    asset_id=1, company_id=int(), collection=str(), timestamp=1
+                )
+            ],
+            metadata=RawMetadata(
+                app_stream_id=int(),
+                apps={SETTINGS.APP_KEY: RawAppMetadata(app_connection_id=int())},
+                log_type=LogType.time,
+            ),
+        ).model_dump()
+    ]
+
+    with pytest.raises(DeadlineExceededError):
+        stream(app)(event, context)
+
+    app.assert_not_called()
@@ -0,0 +1,28 @@
+from corva import StreamColumnsEvent, StreamCompactEvent, StreamDictsEvent
+from corva.models.stream.compact import CompactRecords, CompactTimeRecord
+from docs.modules.ROOT.examples.stream_records import tutorial001
+
+
+def test_tutorial001(app_runner):
+    records = [
+        {"timestamp": 1, "data": {"hole_depth": 10.0}},
+        {"timestamp": 2, "data": {"hole_depth": 11.0}},
+    ]
+
+    dicts_event = StreamDictsEvent(asset_id=0, company_id=0, records=records)
+    columns_event = StreamColumnsEvent(
+        asset_id=0,
+        company_id=0,
+        columns={"timestamp": [1, 2], "data.hole_depth": [10.0, 11.0]},
+    )
+
+    assert app_runner(tutorial001.dicts_app, dicts_event) == [10.0, 11.0]
+    assert app_runner(tutorial001.columns_app, columns_event) == [10.0, 11.0]
+
+    compact_event = StreamCompactEvent(
+        asset_id=0,
+        company_id=0,
+        records=CompactRecords(raw=records, record_type=CompactTimeRecord),
+    )
+
+    assert app_runner(tutorial001.compact_app, compact_event) == [10.0, 11.0]
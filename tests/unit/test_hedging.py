@@ -0,0 +1,168 @@
+import threading
+import time
+from typing import List
+from unittest.mock import Mock
+
+import pytest
+from pytest_mock import MockerFixture
+from requests_mock import Mocker as RequestsMocker
+
+from corva import metrics
+from corva.configuration import SETTINGS
+from corva.handlers import task
+from corva.hedging import HEDGER, Hedger, HostHedger
+from corva.logger import STDOUT_BUFFER
+from corva.models.task import TaskEvent
+from corva.rate_limit import RATE_LIMITER
+
+
+@pytest.fixture
+def hedger(mocker: MockerFixture) -> Hedger:
+    mocker.patch.object(SETTINGS, 'API_HEDGE_MIN_DELAY_MS', 10)
+    mocker.patch.object(SETTINGS, 'API_HEDGE_BUDGET_BURST', 1)
+    mocker.patch.object(SETTINGS, 'API_HEDGE_BUDGET_RATIO', 0)
+
+    hedger = Hedger()
+    for _ in range(HostHedger.MIN_SAMPLES):
+        hedger.get('host').record(0.001)
+
+    return hedger
+
+
+class SlowRequests:
+    """Returns responses, the first request is slow."""
+
+    def __init__(self, first_delay: float):
+        self.first_delay = first_delay
+        self.responses: List[Mock] = []
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self) -> Mock:
+        with self._lock:
+            response = Mock(name=f'response{len(self.responses)}')
+            self.responses.append(response)
+            first = len(self.responses) == 1
+
+        if first:
+            self.release.wait(timeout=self.first_delay)
+
+        return response
+
+
+def test_delay_is_p95_of_latencies():
+    host_hedger = HostHedger(budget_ratio=0, budget_burst=0, min_delay=0.001)
+
+    assert host_hedger.on_request() is None  # not enough samples
+
+    for latency in range(1, 101):
+        host_hedger.record(latency / 1000)
+
+    assert host_hedger.on_request() == 0.095
+
+
+def test_delay_is_at_least_min_delay():
+    host_hedger = HostHedger(budget_ratio=0, budget_burst=0, min_delay=1)
+
+    for _ in range(HostHedger.MIN_SAMPLES):
+        host_hedger.record(0.001)
+
+    assert host_hedger.on_request() == 1
+
+
+def test_hedge_budget():
+    host_hedger = HostHedger(budget_ratio=0.5, budget_burst=1, min_delay=0)
+
+    assert host_hedger.try_hedge()
+    assert not host_hedger.try_hedge()
+
+    host_hedger.on_request()
+    host_hedger.on_request()
+
+    assert host_hedger.try_hedge()
+
+
+def test_fast_request_is_not_hedged(hedger: Hedger):
+    requests = SlowRequests(first_delay=0)
+
+    assert hedger.run('host', requests) is requests.responses[0]  # type: ignore
+    assert len(requests.responses) == 1
+
+
+def test_slow_request_is_hedged_and_hedge_wins(hedger: Hedger, mocker: MockerFixture):
+    mocker.patch.object(SETTINGS, 'METRICS_ENABLED', True)
+    requests = SlowRequests(first_delay=5)
+
+    with metrics.collecting() as registry:
+        response = hedger.run('host', requests)  # type: ignore
+        assert registry is not None
+        counters = dict(registry.counters)
+
+    STDOUT_BUFFER.flush()
+
+    assert response is requests.responses[1]
+    assert counters == {
+        'api.hedge.fired': (1, 'Count'),
+        'api.hedge.won': (1, 'Count'),
+    }
+
+    requests.release.set()
+    # the slow response gets closed, once it is done
+    for _ in range(100):
+        if requests.responses[0].close.called:
+            break
+        time.sleep(0.01)
+
+    requests.responses[0].close.assert_called_once()
+
+
+def test_hedge_budget_limits_hedges(hedger: Hedger):
+    hedger.get('host').tokens = 0
+    requests = SlowRequests(first_delay=0.05)
+
+    assert hedger.run('host', requests) is requests.responses[0]  # type: ignore
+    assert len(requests.responses) == 1
+
+
+def test_throttled_host_is_not_hedged(hedger: Hedger, mocker: MockerFixture):
+    mocker.patch.object(SETTINGS, 'API_CONCURRENCY_LIMIT', 20)
+    RATE_LIMITER.get('host').on_response(status=429, retry_after=None)
+    requests = SlowRequests(first_delay=0.05)
+
+    assert hedger.run('host', requests) is requests.responses[0]  # type: ignore
+    assert len(requests.responses) == 1
+
+
+def test_failed_request_loses_to_successful_one(hedger: Hedger):
+    calls = []
+
+    def request():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(0.05)
+            raise Exception('error')
+        time.sleep(0.1)
+        return 'response'
+
+    assert hedger.run('host', request) == 'response'  # type: ignore
+
+
+def test_api_get_goes_through_hedger(
+    app_runner, requests_mock: RequestsMocker, mocker: MockerFixture
+):
+    mocker.patch.object(SETTINGS, 'API_HEDGING', True)
+    run = mocker.spy(HEDGER, 'run')
+
+    @task
+    def app(event, api):
+        return api
+
+    api = app_runner(app, TaskEvent(asset_id=int(), company_id=int()))
+    requests_mock.get(f'{SETTINGS.API_ROOT_URL}/')
+    requests_mock.post(f'{SETTINGS.API_ROOT_URL}/')
+
+    api.get('/')
+    api.post('/')
+
+    run.assert_called_once()
+    assert len(HEDGER.get(run.call_args.kwargs['host']).latencies) == 1
@@ -0,0 +1,65 @@
+import json
+import subprocess
+import sys
+from typing import Any, Dict
+
+# test-only and rarely used dependencies, that get imported on first use
+LAZY_MODULES = ("fakeredis", "semver", "numpy")
+
+# runs in a fresh interpreter, as the tests have imported everything already
+IMPORT_STATE_SCRIPT = """
+import json
+import sys
+
+import corva
+from corva.models.base import CorvaBaseEvent, get_list_adapter
+
+
+def get_subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from get_subclasses(subclass)
+
+
+print(
+    json.dumps(
+        {
+            "modules": sorted(sys.modules),
+            "event_models": len(list(get_subclasses(CorvaBaseEvent))),
+            "built_event_models": sorted(
+                model.__name__
+                for model in get_subclasses(CorvaBaseEvent)
+                if model.__pydantic_complete__
+            ),
+            "list_adapters": get_list_adapter.cache_info().currsize,
+        }
+    )
+)
+"""
+
+
+def get_import_state() -> Dict[str, Any]:
+    """Returns what `import corva` imports and builds in a fresh interpreter."""
+
+    result = subprocess.run(
+        (sys.executable, "-c", IMPORT_STATE_SCRIPT),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    return json.loads(result.stdout)
+
+
+def test_lazy_modules_are_not_imported():
+    modules = get_import_state()["modules"]
+
+    assert not set(LAZY_MODULES) & {module.split(".")[0] for module in modules}
+
+
+def test_event_validators_are_not_built():
+    state = get_import_state()
+
+    assert state["event_models"]
+    assert state["built_event_models"] == []
+    assert state["list_adapters"] == 0
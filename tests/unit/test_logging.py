@@ -1,5 +1,10 @@
+import concurrent.futures
 import datetime
+import json
 import logging
+import sys
+import threading
+import time
 from unittest.mock import MagicMock
 
 import freezegun
@@ -9,7 +14,15 @@ from pytest_mock import MockerFixture
 from corva import Logger
 from corva.configuration import SETTINGS
 from corva.handlers import scheduled, stream, task
-from corva.logger import LoggingContext
+from corva.logger import (
+    STDOUT_BUFFER,
+    ContextHandler,
+    CorvaLoggerHandler,
+    JsonFormatter,
+    LoggingContext,
+    StdoutBuffer,
+    get_formatter,
+)
 from corva.models.context import CorvaContext
 from corva.models.scheduled.raw import RawScheduledDataTimeEvent, RawScheduledEvent
 from corva.models.scheduled.scheduler_type import SchedulerType
@@ -93,6 +106,46 @@ def test_stream_logging(context, capsys):
     )
 
 
+def test_app_threads_logging(context, capsys):
+    @stream
+    def app(event, api, cache):
+        Logger.warning('main thread')
+
+        thread = threading.Thread(target=Logger.warning, args=('worker thread',))
+        thread.start()
+        thread.join()
+
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            executor.submit(Logger.warning, 'pool thread').result()
+
+    event = RawStreamTimeEvent(
+        records=[
+            RawTimeRecord(
+                asset_id=0,
+                company_id=int(),
+                collection=str(),
+                timestamp=int(),
+            ),
+        ],
+        metadata=RawMetadata(
+            app_stream_id=int(),
+            apps={SETTINGS.APP_KEY: RawAppMetadata(app_connection_id=1)},
+            log_type=LogType.time,
+        ),
+    )
+
+    app([event.model_dump()], context)
+
+    lines = capsys.readouterr().out.splitlines()
+
+    assert [line.split(' | ')[1] for line in lines] == [
+        'main thread',
+        'worker thread',
+        'pool thread',
+    ]
+    assert all('ASSET=0 AC=1' in line for line in lines)
+
+
 def test_task_logging(context, capsys, mocker: MockerFixture):
     @task
     def app(event, api):
@@ -349,6 +402,362 @@ def test__otel_handler_passed_to_logging_context__success(monkeypatch, cls_name)
             user_handler=MagicMock(),
             logger=MagicMock(),
     ) as context:
-        assert otel_handler in context.logger.handlers
+        assert otel_handler in context.handlers
 
     logging.getLogger().removeHandler(otel_handler)
+
+
+def test_stdout_buffer_writes_when_full(capsys):
+    buffer = StdoutBuffer(max_size=10, flush_interval=60)
+
+    buffer.write('12345')
+    assert capsys.readouterr().out == ''
+
+    buffer.write('67890')
+    assert capsys.readouterr().out == '1234567890'
+
+
+def test_stdout_buffer_writes_after_flush_interval(capsys):
+    buffer = StdoutBuffer(max_size=1000, flush_interval=0.01)
+
+    buffer.write('message\n')
+    time.sleep(0.1)
+
+    assert capsys.readouterr().out == 'message\n'
+
+
+def test_stdout_buffer_without_size_writes_right_away(capsys):
+    buffer = StdoutBuffer(max_size=0, flush_interval=60)
+
+    buffer.write('message\n')
+
+    assert capsys.readouterr().out == 'message\n'
+
+
+def test_logs_are_flushed_if_app_fails(context, capsys, mocker: MockerFixture):
+    @task
+    def app(event, api):
+        Logger.warning('Hello, World!')
+        raise Exception('Oops!')
+
+    mocker.patch.object(STDOUT_BUFFER, 'max_size', 1_000_000)
+    mocker.patch.object(STDOUT_BUFFER, 'flush_interval', 60)
+    mocker.patch.object(
+        RawTaskEvent,
+        'get_task_event',
+        return_value=TaskEvent(asset_id=0, company_id=int()),
+    )
+    mocker.patch.object(RawTaskEvent, 'update_task_data')
+
+    with pytest.raises(Exception, match='^Oops!$'):
+        app(RawTaskEvent(task_id='0', version=2).model_dump(), context)
+
+    captured = capsys.readouterr().out
+    assert 'Hello, World!' in captured
+    assert 'The app failed to execute.' in captured
+
+
+def test_exhausted_handler_skips_filters(capsys):
+    logger = logging.Logger('test_exhausted_handler_skips_filters')
+    handler = CorvaLoggerHandler(
+        max_message_size=100,
+        max_message_count=1,
+        logger=logger,
+        placeholder=' ...',
+    )
+    filtered = []
+    handler.addFilter(lambda record: filtered.append(record.getMessage()) or True)
+    logger.addHandler(handler)
+
+    logger.warning('first')  # reaches the limit and logs the warning
+    logger.warning('second')
+    STDOUT_BUFFER.flush()
+
+    assert filtered == [
+        'first',
+        'Disabling the logging as maximum number of logged messages was reached: 1.',
+    ]
+
+
+def test_json_log_format(context, capsys, mocker: MockerFixture):
+    @stream
+    def app(event, api, cache):
+        Logger.warning('Hello,\n"World"!')
+
+    event = RawStreamTimeEvent(
+        records=[
+            RawTimeRecord(
+                asset_id=0,
+                company_id=int(),
+                collection=str(),
+                timestamp=int(),
+            ),
+        ],
+        metadata=RawMetadata(
+            app_stream_id=int(),
+            apps={SETTINGS.APP_KEY: RawAppMetadata(app_connection_id=1)},
+            log_type=LogType.time,
+        ),
+    )
+
+    mocker.patch.object(SETTINGS, 'LOG_FORMAT', 'json')
+
+    with freezegun.freeze_time(datetime.datetime(2021, 1, 2, 3, 4, 5, 678910)):
+        app([event.model_dump()], context)
+
+    out = capsys.readouterr().out
+
+    assert out.count('\n') == 1
+    assert json.loads(out) == {
+        'timestamp': '2021-01-02T03:04:05.678Z',
+        'level': 'WARNING',
+        'aws_request_id': 'qwerty',
+        'asset_id': 0,
+        'app_connection_id': 1,
+        'message': 'Hello,\n"World"!',
+    }
+
+
+@pytest.mark.parametrize('max_message_size', (90, 100, 120))
+def test_json_log_message_gets_truncated(max_message_size, capsys):
+    logger = logging.Logger('test_json_log_message_gets_truncated')
+    handler = CorvaLoggerHandler(
+        max_message_size=max_message_size,
+        max_message_count=10,
+        logger=logger,
+        placeholder=' ...',
+    )
+    handler.setFormatter(
+        JsonFormatter(aws_request_id=False, asset_id=False, app_connection_id=False)
+    )
+    logger.addHandler(handler)
+
+    logger.warning('"quoted" ' * 20)
+    STDOUT_BUFFER.flush()
+
+    out = capsys.readouterr().out
+
+    assert len(out) <= max_message_size
+    assert json.loads(out)['message'].endswith(' ...')
+
+
+def test_formatters_are_cached():
+    assert get_formatter(True, True, False) is get_formatter(True, True, False)
+    assert get_formatter(True, True, False) is not get_formatter(True, True, True)
+
+
+def _get_limited_logger(name: str, **kwargs):
+    logger = logging.Logger(name)
+    handler = CorvaLoggerHandler(
+        max_message_size=1000,
+        logger=logger,
+        placeholder=' ...',
+        **{'max_message_count': 100, **kwargs},
+    )
+    handler.setFormatter(logging.Formatter('%(levelname)s %(message)s'))
+    logger.addHandler(handler)
+    return logger, handler
+
+
+def test_same_template_messages_are_rate_limited(capsys, mocker: MockerFixture):
+    logger, handler = _get_limited_logger(
+        'test_same_template_messages_are_rate_limited',
+        template_burst=2,
+        template_rate=1,
+    )
+    monotonic = mocker.patch('corva.logger.time.monotonic', return_value=0)
+
+    for idx in range(5):
+        logger.info('Processed %s', idx)
+    logger.info('Other message')
+
+    monotonic.return_value = 1  # one token gets refilled
+    logger.info('Processed %s', 5)
+    logger.info('Processed %s', 6)
+
+    handler.flush()
+    STDOUT_BUFFER.flush()
+
+    assert capsys.readouterr().out.splitlines() == [
+        'INFO Processed 0',
+        'INFO Processed 1',
+        'INFO Other message',
+        'INFO Processed 5',
+        "WARNING Suppressed 4 similar messages: 'Processed %s'.",
+    ]
+
+
+def test_rare_templates_are_reported_together(capsys, mocker: MockerFixture):
+    logger, handler = _get_limited_logger(
+        'test_rare_templates_are_reported_together', template_burst=1
+    )
+    mocker.patch.object(CorvaLoggerHandler, 'MAX_SUPPRESSED_REPORTS', 1)
+
+    for template in ('First %s', 'First %s', 'First %s', 'Second %s', 'Second %s'):
+        logger.info(template, 0)
+
+    handler.flush()
+    STDOUT_BUFFER.flush()
+
+    assert capsys.readouterr().out.splitlines() == [
+        'INFO First 0',
+        'INFO Second 0',
+        "WARNING Suppressed 2 similar messages: 'First %s'.",
+        'WARNING Suppressed 1 other similar messages.',
+    ]
+
+
+def test_templates_beyond_max_share_one_bucket(capsys, mocker: MockerFixture):
+    logger, handler = _get_limited_logger(
+        'test_templates_beyond_max_share_one_bucket', template_burst=1
+    )
+    mocker.patch.object(CorvaLoggerHandler, 'MAX_TEMPLATES', 1)
+
+    logger.info('First')
+    logger.info('Second')
+    logger.info('Third')
+
+    handler.flush()
+    STDOUT_BUFFER.flush()
+
+    assert capsys.readouterr().out.splitlines() == [
+        'INFO First',
+        'INFO Second',
+        "WARNING Suppressed 1 similar messages: None.",
+    ]
+
+
+def test_context_handler_uses_logger_handlers_without_contexts(capsys):
+    context_handler = ContextHandler('test_context_handler_uses_logger_handlers')
+    context_handler.saved_handlers = [logging.StreamHandler(sys.stdout)]
+
+    context_handler.emit(
+        logging.makeLogRecord({'msg': 'Hi', 'levelno': logging.INFO})
+    )
+
+    assert capsys.readouterr().out == 'Hi\n'
+
+
+def test_suppressed_messages_are_not_filtered(capsys):
+    logger, handler = _get_limited_logger(
+        'test_suppressed_messages_are_not_filtered', template_burst=1
+    )
+    filtered = []
+    handler.addFilter(lambda record: filtered.append(record.getMessage()) or True)
+
+    for idx in range(3):
+        logger.info('Processed %s', idx)
+    STDOUT_BUFFER.flush()
+
+    assert filtered == ['Processed 0']
+
+
+def test_errors_are_not_rate_limited(capsys):
+    logger, handler = _get_limited_logger(
+        'test_errors_are_not_rate_limited', template_burst=1
+    )
+
+    for idx in range(3):
+        logger.error('Failed %s', idx)
+    STDOUT_BUFFER.flush()
+
+    assert capsys.readouterr().out.splitlines() == [
+        'ERROR Failed 0',
+        'ERROR Failed 1',
+        'ERROR Failed 2',
+    ]
+
+
+def test_errors_are_logged_after_reaching_max_message_count(capsys):
+    logger, handler = _get_limited_logger(
+        'test_errors_are_logged_after_reaching_max_message_count',
+        max_message_count=1,
+        max_error_count=2,
+    )
+
+    logger.info('Info 1')
+    logger.info('Info 2')
+    for idx in range(3):
+        logger.error('Error %s', idx)
+    STDOUT_BUFFER.flush()
+
+    assert capsys.readouterr().out.splitlines() == [
+        'INFO Info 1',
+        'WARNING Disabling the logging as maximum number of logged messages '
+        'was reached: 1.',
+        'ERROR Error 0',
+        'ERROR Error 1',
+    ]
+
+
+def test_errors_are_not_logged_after_reaching_max_message_count_by_default(
+    context, capsys, mocker: MockerFixture
+):
+    @task
+    def app(event, api):
+        Logger.warning('Warning')
+        Logger.error('Error')
+
+    mocker.patch.object(SETTINGS, 'LOG_THRESHOLD_MESSAGE_COUNT', 1)
+    mocker.patch.object(
+        RawTaskEvent,
+        'get_task_event',
+        return_value=TaskEvent(asset_id=0, company_id=int()),
+    )
+    mocker.patch.object(RawTaskEvent, 'update_task_data')
+
+    app(RawTaskEvent(task_id='0', version=2).model_dump(), context)
+
+    lines = capsys.readouterr().out.splitlines()
+
+    assert len(lines) == 2
+    assert lines[0].endswith('| Warning')
+    assert 'Disabling the logging' in lines[1]
+
+
+def test_same_template_messages_are_not_rate_limited_by_default(
+    context, capsys, mocker: MockerFixture
+):
+    @task
+    def app(event, api):
+        for idx in range(10):
+            Logger.info('Message %s', idx)
+
+    mocker.patch.object(SETTINGS, 'LOG_THRESHOLD_MESSAGE_COUNT', 100)
+    mocker.patch.object(
+        RawTaskEvent,
+        'get_task_event',
+        return_value=TaskEvent(asset_id=0, company_id=int()),
+    )
+    mocker.patch.object(RawTaskEvent, 'update_task_data')
+
+    app(RawTaskEvent(task_id='0', version=2).model_dump(), context)
+
+    lines = capsys.readouterr().out.splitlines()
+
+    assert len(lines) == 10
+    assert 'Suppressed' not in lines[-1]
+
+
+def test_suppressed_messages_are_reported_when_app_finishes(
+    context, capsys, mocker: MockerFixture
+):
+    @task
+    def app(event, api):
+        for idx in range(10):
+            Logger.warning('Message %s', idx)
+
+    mocker.patch.object(SETTINGS, 'LOG_TEMPLATE_BURST', 3)
+    mocker.patch.object(
+        RawTaskEvent,
+        'get_task_event',
+        return_value=TaskEvent(asset_id=0, company_id=int()),
+    )
+    mocker.patch.object(RawTaskEvent, 'update_task_data')
+
+    app(RawTaskEvent(task_id='0', version=2).model_dump(), context)
+
+    lines = capsys.readouterr().out.splitlines()
+
+    assert len(lines) == 4
+    assert lines[-1].endswith("| Suppressed 7 similar messages: 'Message %s'.")
@@ -0,0 +1,219 @@
+import json
+import logging
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockerFixture
+from requests_mock import Mocker as RequestsMocker
+
+from corva import metrics
+from corva.api import record_request_metrics
+from corva.configuration import SETTINGS
+from corva.handlers import stream, task
+from corva.logger import CORVA_LOGGER, STDOUT_BUFFER, CorvaLoggerHandler
+from corva.models.stream.log_type import LogType
+from corva.models.stream.raw import (
+    RawAppMetadata,
+    RawMetadata,
+    RawStreamTimeEvent,
+    RawTimeRecord,
+)
+from corva.models.task import TaskEvent
+
+
+@pytest.fixture
+def enabled(mocker: MockerFixture):
+    mocker.patch.object(SETTINGS, 'METRICS_ENABLED', True)
+
+
+def get_emf_documents(output: str) -> list:
+    return [
+        document
+        for document in map(json.loads, output.splitlines())
+        if isinstance(document, dict) and '_aws' in document
+    ]
+
+
+def test_to_emf():
+    registry = metrics.MetricsRegistry(namespace='ns', dimensions={'AppKey': 'key'})
+    registry.increment('counter')
+    registry.increment('counter', 2)
+    registry.increment('bytes', 10, unit='Bytes')
+    registry.observe('latency', 12.345)
+    registry.observe('latency', 12.3)
+    registry.observe('latency', 100)
+
+    assert registry.to_emf(timestamp=1) == [
+        {
+            '_aws': {
+                'Timestamp': 1,
+                'CloudWatchMetrics': [
+                    {
+                        'Namespace': 'ns',
+                        'Dimensions': [['AppKey']],
+                        'Metrics': [
+                            {'Name': 'counter', 'Unit': 'Count'},
+                            {'Name': 'bytes', 'Unit': 'Bytes'},
+                            {'Name': 'latency', 'Unit': 'Milliseconds'},
+                        ],
+                    }
+                ],
+            },
+            'AppKey': 'key',
+            'counter': 3,
+            'bytes': 10,
+            'latency': {'Values': [12, 100], 'Counts': [2, 1]},
+        }
+    ]
+
+
+def test_to_emf_splits_documents_over_limits(mocker: MockerFixture):
+    mocker.patch.object(metrics.MetricsRegistry, 'MAX_METRICS', 2)
+    mocker.patch.object(metrics.MetricsRegistry, 'MAX_VALUES', 2)
+    registry = metrics.MetricsRegistry(namespace='ns', dimensions={})
+    registry.increment('a')
+    registry.increment('b')
+    for value in (1, 2, 3):
+        registry.observe('c', value)
+
+    documents = registry.to_emf(timestamp=1)
+
+    names = [
+        [
+            metric['Name']
+            for metric in document['_aws']['CloudWatchMetrics'][0]['Metrics']
+        ]
+        for document in documents
+    ]
+
+    assert names == [['a', 'b'], ['c'], ['c']]
+    assert documents[1]['c'] == {'Values': [1, 2], 'Counts': [1, 1]}
+    assert documents[2]['c'] == {'Values': [3], 'Counts': [1]}
+
+
+def test_disabled_metrics_collect_nothing():
+    with metrics.collecting() as registry:
+        metrics.increment('counter')
+        assert not metrics.is_collecting()
+
+    assert registry is None
+
+
+def test_collecting_flushes_on_exit(enabled, capsys):
+    with metrics.collecting(namespace='ns', dimensions={}) as registry:
+        metrics.increment('counter')
+
+    STDOUT_BUFFER.flush()
+
+    documents = get_emf_documents(capsys.readouterr().out)
+
+    assert registry is not None and registry.counters == {}
+    assert [document['counter'] for document in documents] == [1]
+    assert not metrics.is_collecting()
+
+
+def test_stream_app_flushes_metrics_once(enabled, context, capsys):
+    @stream
+    def stream_app(event, api, cache):
+        metrics.increment('custom')
+
+    event = [
+        RawStreamTimeEvent(
+            records=[
+                RawTimeRecord(
+                    asset_id=1, company_id=int(), collection=str(), timestamp=timestamp
+                )
+                for timestamp in (1, 2, 3)
+            ],
+            metadata=RawMetadata(
+                app_stream_id=int(),
+                apps={SETTINGS.APP_KEY: RawAppMetadata(app_connection_id=int())},
+                log_type=LogType.time,
+            ),
+        ).model_dump()
+    ]
+
+    stream_app(event * 2, context)  # second event records are duplicates
+
+    documents = get_emf_documents(capsys.readouterr().out)
+
+    assert len(documents) == 1
+    assert documents[0]['_aws']['CloudWatchMetrics'][0]['Namespace'] == 'Corva/SDK'
+    assert documents[0]['AppKey'] == SETTINGS.APP_KEY
+    assert documents[0]['custom'] == 1
+    assert documents[0]['stream.records_received'] == 6
+    assert documents[0]['stream.records_filtered'] == 3
+    assert documents[0]['cache.round_trips'] > 0
+    assert sum(documents[0]['cache.duration']['Counts']) == (
+        documents[0]['cache.round_trips']
+    )
+
+
+def test_api_request_metrics(enabled, app_runner, requests_mock: RequestsMocker):
+    @task
+    def app(event, api):
+        return api
+
+    api = app_runner(app, TaskEvent(asset_id=int(), company_id=int()))
+    requests_mock.post(f'{SETTINGS.API_ROOT_URL}/', content=b'12345')
+
+    with metrics.collecting() as registry:
+        api.post('/', data={'key': 'value'})
+        assert registry is not None
+        counters = dict(registry.counters)
+        histograms = dict(registry.histograms)
+
+    assert counters == {
+        'api.bytes_out': (len(b'{"key": "value"}'), 'Bytes'),
+        'api.bytes_in': (5, 'Bytes'),
+    }
+    assert sum(histograms['api.request.duration'][0].values()) == 1
+
+
+def test_api_retries_are_counted_by_status(enabled):
+    response = SimpleNamespace(
+        request=SimpleNamespace(body=None),
+        content=b'',
+        raw=SimpleNamespace(
+            retries=SimpleNamespace(
+                history=[
+                    SimpleNamespace(status=503),
+                    SimpleNamespace(status=503),
+                    SimpleNamespace(status=None),
+                ]
+            )
+        ),
+    )
+
+    with metrics.collecting() as registry:
+        record_request_metrics(response=response, duration=0.1)  # type: ignore
+        assert registry is not None
+        counters = dict(registry.counters)
+
+    assert counters['api.retries.503'] == (2, 'Count')
+    assert counters['api.retries.error'] == (1, 'Count')
+
+
+def test_suppressed_logs_are_counted(enabled):
+    handler = CorvaLoggerHandler(
+        max_message_size=1000,
+        max_message_count=100,
+        logger=CORVA_LOGGER,
+        placeholder='...',
+        template_burst=1,
+        template_rate=0,
+    )
+
+    with metrics.collecting() as registry:
+        for _ in range(3):
+            handler.handle(
+                CORVA_LOGGER.makeRecord(
+                    'corva', logging.INFO, __file__, 0, 'message', None, None
+                )
+            )
+        assert registry is not None
+        counters = dict(registry.counters)
+
+    STDOUT_BUFFER.flush()
+
+    assert counters == {'logs.suppressed': (2, 'Count')}
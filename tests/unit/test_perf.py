@@ -0,0 +1,134 @@
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockerFixture
+
+from corva import perf, tracing
+from corva.configuration import SETTINGS
+from corva.handlers import stream
+from corva.models.stream.log_type import LogType
+from corva.models.stream.raw import (
+    RawAppMetadata,
+    RawMetadata,
+    RawStreamTimeEvent,
+    RawTimeRecord,
+)
+
+EVENT = [
+    RawStreamTimeEvent(
+        records=[
+            RawTimeRecord(asset_id=1, company_id=int(), collection=str(), timestamp=1)
+        ],
+        metadata=RawMetadata(
+            app_stream_id=int(),
+            apps={SETTINGS.APP_KEY: RawAppMetadata(app_connection_id=int())},
+            log_type=LogType.time,
+        ),
+    ).model_dump()
+]
+
+
+@pytest.fixture
+def enabled(mocker: MockerFixture):
+    mocker.patch.object(SETTINGS, 'PERF_REPORT', True)
+
+
+def test_report_is_disabled_by_default(context, capsys):
+    @stream
+    def stream_app(event, api, cache):
+        pass
+
+    stream_app(EVENT, context)
+
+    assert 'Performance report' not in capsys.readouterr().out
+
+
+def test_report_is_logged(enabled, context, capsys):
+    @stream
+    def stream_app(event, api, cache):
+        pass
+
+    stream_app(EVENT, context)
+
+    report = next(
+        line
+        for line in capsys.readouterr().out.splitlines()
+        if 'Performance report' in line
+    )
+
+    assert 'phases: ' in report
+    assert 'app=' in report
+    assert 'filter_records=' in report
+    assert 'api: 0 calls' in report
+    assert 'records: 1' in report
+    assert 'peak rss: ' in report
+
+
+def test_warns_about_phases_over_budget(
+    enabled, context, capsys, mocker: MockerFixture
+):
+    mocker.patch.object(SETTINGS, 'PERF_BUDGETS_MS', {'corva.app': 1})
+
+    @stream
+    def stream_app(event, api, cache):
+        time.sleep(0.01)
+
+    stream_app(EVENT, context)
+
+    assert "Phase 'corva.app' took" in capsys.readouterr().out
+
+
+def test_warns_about_low_remaining_time(enabled, capsys, mocker: MockerFixture):
+    warned = threading.Event()
+    warn = perf._warn_low_remaining_time
+
+    def warn_and_notify(*args):
+        warn(*args)
+        warned.set()
+
+    mocker.patch.object(perf, '_warn_low_remaining_time', warn_and_notify)
+    mocker.patch.object(SETTINGS, 'PERF_MIN_REMAINING_TIME_MS', 1000)
+    mocker.patch.object(SETTINGS, 'DEADLINE_RESERVE_MS', 0)
+    context = SimpleNamespace(
+        aws_request_id='qwerty',
+        client_context=SimpleNamespace(env={'API_KEY': '123'}),
+        get_remaining_time_in_millis=lambda: 1000,
+    )
+
+    @stream
+    def stream_app(event, api, cache):
+        assert warned.wait(timeout=5)
+
+    stream_app(EVENT, context)
+
+    assert 'Low remaining Lambda time: 1000ms' in capsys.readouterr().out
+
+
+def test_summary_of_api_calls():
+    report = perf.PerfReport()
+
+    for duration in (3, 1, 2):
+        span = tracing.Span(name='corva.api.request', trace_id='', parent_span_id=None)
+        span.end_time = span.start_time + duration * 1_000_000
+        report.export(span)
+
+    assert 'api: 3 calls, p50=2.0ms, max=3.0ms' in report.summary()
+
+
+def test_summary_of_memory(mocker: MockerFixture):
+    tracemalloc.start()
+    try:
+        summary = perf.PerfReport().summary()
+    finally:
+        tracemalloc.stop()
+
+    assert 'peak rss: ' in summary
+    assert 'tracemalloc peak: ' in summary
+
+    mocker.patch.object(perf, 'resource', None)
+
+    assert perf.get_peak_rss() is None
+    assert 'peak rss' not in perf.PerfReport().summary()
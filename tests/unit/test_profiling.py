@@ -0,0 +1,99 @@
+import time
+
+import pytest
+from pytest_mock import MockerFixture
+
+from corva import Logger, profiling
+from corva.configuration import SETTINGS
+from corva.handlers import task
+from corva.models.task import RawTaskEvent, TaskEvent
+from corva.service import service
+from corva.service.api_sdk import FakeApiSdk
+
+
+def busy_function():
+    end = time.perf_counter() + 0.1
+
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture
+def enabled(mocker: MockerFixture):
+    mocker.patch.object(SETTINGS, 'PROFILE_SAMPLE_RATE', 1)
+    mocker.patch.object(SETTINGS, 'PROFILE_INTERVAL', 0.001)
+
+
+def test_sampler_collects_collapsed_stacks():
+    sampler = profiling.StackSampler(interval=0.001)
+    sampler.start()
+    busy_function()
+    sampler.stop()
+
+    lines = sampler.collapsed().splitlines()
+
+    assert sampler.sample_count > 0
+    assert any('busy_function (unit/test_profiling.py:14)' in line for line in lines)
+    for line in lines:
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+
+
+def test_profiling_is_disabled_by_default():
+    with profiling.profiling('name') as sampler:
+        pass
+
+    assert sampler is None
+
+
+def test_nested_profiling_is_noop(enabled):
+    with profiling.profiling('outer') as outer:
+        with profiling.profiling('inner') as inner:
+            pass
+
+    assert outer is not None
+    assert inner is None
+
+
+def test_run_app_logs_profile(enabled, mocker: MockerFixture):
+    info = mocker.spy(Logger, 'info')
+
+    service.run_app(
+        has_secrets=False, app_key='', api_sdk=FakeApiSdk(), app=busy_function
+    )
+
+    assert info.call_args.args[0].startswith('Profile of ')
+    assert 'busy_function' in info.call_args.args[0]
+
+
+def test_invocation_profile_is_saved_to_dir(
+    enabled, tmp_path, mocker: MockerFixture, context
+):
+    mocker.patch.object(SETTINGS, 'PROFILE_DIR', str(tmp_path))
+    mocker.patch.object(
+        RawTaskEvent,
+        'get_task_event',
+        return_value=TaskEvent(asset_id=int(), company_id=int()),
+    )
+    mocker.patch.object(RawTaskEvent, 'update_task_data')
+
+    @task
+    def app(event, api):
+        busy_function()
+
+    app(RawTaskEvent(task_id='0', version=2).model_dump(), context)
+
+    [path] = tmp_path.iterdir()
+
+    assert path.name.startswith(f'{context.aws_request_id}-')
+    assert 'busy_function' in path.read_text()
+
+
+def test_profile_write_errors_are_logged(enabled, mocker: MockerFixture):
+    warning = mocker.spy(Logger, 'warning')
+    mocker.patch.object(profiling, 'write_profile', side_effect=Exception('error'))
+
+    with profiling.profiling('name'):
+        pass
+
+    warning.assert_called_once_with('Could not write the profile. Details: error.')
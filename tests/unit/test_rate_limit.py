@@ -0,0 +1,219 @@
+import datetime
+import email.utils
+import threading
+import time
+import urllib.parse
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockerFixture
+from requests_mock import Mocker as RequestsMocker
+from urllib3.exceptions import MaxRetryError
+
+from corva import DeadlineExceededError, deadline
+from corva.api_utils import DeadlineAwareRetry
+from corva.configuration import SETTINGS
+from corva.handlers import task
+from corva.models.task import TaskEvent
+from corva.rate_limit import RATE_LIMITER, HostLimiter, parse_retry_after
+
+
+def get_limiter(**kwargs) -> HostLimiter:
+    return HostLimiter(
+        **{
+            'max_concurrency': 4,
+            'max_rate': 0,
+            'retry_budget_ratio': 0.5,
+            'retry_budget_burst': 1,
+            **kwargs,
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    'value, expected',
+    (
+        (None, None),
+        ('', None),
+        ('5', 5.0),
+        ('invalid', None),
+    ),
+)
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    retry_at = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(
+        seconds=10
+    )
+
+    assert 8 < parse_retry_after(email.utils.format_datetime(retry_at)) <= 10  # type: ignore
+
+
+def test_throttling_halves_limits_once_per_burst():
+    limiter = get_limiter(max_rate=10)
+
+    limiter.on_response(status=429, retry_after=None)
+    limiter.on_response(status=429, retry_after=None)
+
+    assert limiter.concurrency == 2
+    assert limiter.rate == 5
+
+
+def test_success_increases_limits_up_to_max():
+    limiter = get_limiter(max_rate=10)
+    limiter.on_response(status=503, retry_after=None)
+
+    limiter.on_response(status=200, retry_after=None)
+
+    assert limiter.concurrency == 2.5
+    assert limiter.rate == 5.1
+
+    for _ in range(1000):
+        limiter.on_response(status=200, retry_after=None)
+
+    assert limiter.concurrency == 4
+    assert limiter.rate == 10
+
+
+def test_connection_errors_keep_limits():
+    limiter = get_limiter()
+
+    limiter.on_response(status=None, retry_after=None)
+
+    assert limiter.concurrency == 4
+
+
+def test_retry_after_pauses_requests():
+    limiter = get_limiter()
+    limiter.on_response(status=429, retry_after=0.05)
+
+    start = time.monotonic()
+    limiter.acquire()
+
+    assert time.monotonic() - start >= 0.04
+    assert limiter.get_blocked_time() == 0
+
+
+def test_retry_after_over_deadline_raises():
+    limiter = get_limiter()
+    limiter.on_response(status=429, retry_after=60)
+
+    with deadline.setting(time.monotonic() + 10):
+        with pytest.raises(DeadlineExceededError):
+            limiter.acquire()
+
+
+def test_concurrency_limit_waits_for_release():
+    limiter = get_limiter(max_concurrency=1)
+    limiter.acquire()
+    acquired = threading.Event()
+
+    def acquire():
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+
+    assert not acquired.wait(timeout=0.05)
+
+    limiter.release(status=200, retry_after=None)
+
+    assert acquired.wait(timeout=5)
+    thread.join()
+
+
+def test_rate_limit_spaces_requests():
+    limiter = get_limiter(max_rate=20)
+
+    start = time.monotonic()
+    for _ in range(22):  # burst of 20, then 2 requests at 20 per second
+        limiter.acquire()
+        limiter.release(status=200, retry_after=None)
+
+    assert time.monotonic() - start >= 0.09
+
+
+def test_retry_budget_is_a_fraction_of_requests():
+    limiter = get_limiter(retry_budget_ratio=0.5, retry_budget_burst=1)
+
+    assert limiter.try_retry()
+    assert not limiter.try_retry()
+
+    limiter.acquire()
+    limiter.acquire()
+
+    assert limiter.try_retry()
+    assert not limiter.try_retry()
+
+
+@pytest.fixture
+def enable_limits(mocker: MockerFixture):
+    mocker.patch.object(SETTINGS, 'API_CONCURRENCY_LIMIT', 20)
+    mocker.patch.object(SETTINGS, 'API_RETRY_BUDGET_RATIO', 0.2)
+
+
+def test_limits_are_disabled_by_default():
+    limiter = RATE_LIMITER.get('host')
+
+    limiter.on_response(status=429, retry_after=30)
+
+    assert not limiter.is_throttled()
+    assert limiter.get_blocked_time() == 0
+    assert all(limiter.try_retry() for _ in range(100))
+
+
+def test_retry_stops_when_budget_is_exhausted(
+    mocker: MockerFixture, enable_limits
+):
+    mocker.patch.object(SETTINGS, 'API_RETRY_BUDGET_BURST', 1)
+    pool = SimpleNamespace(host='host')
+    response = SimpleNamespace(
+        status=503,
+        headers={'Retry-After': '7'},
+        get_redirect_location=lambda: False,
+    )
+    retry = DeadlineAwareRetry(total=5, status_forcelist=(503,))
+
+    retry = retry.increment(method='GET', url='/', response=response, _pool=pool)
+
+    with pytest.raises(MaxRetryError):
+        retry.increment(method='GET', url='/', response=response, _pool=pool)
+
+    assert 6 < RATE_LIMITER.get('host').get_blocked_time() <= 7
+
+
+def test_retry_waits_for_host_to_accept_requests(
+    mocker: MockerFixture, enable_limits
+):
+    sleep = mocker.patch('time.sleep')
+    RATE_LIMITER.get('host').on_response(status=429, retry_after=30)
+    retry = DeadlineAwareRetry(total=5, backoff_factor=0).increment(
+        method='GET', url='/', _pool=SimpleNamespace(host='host')
+    )
+
+    retry.sleep()
+
+    assert 29 < sleep.call_args.args[0] <= 30
+
+
+def test_api_instances_share_host_limits(
+    app_runner, requests_mock: RequestsMocker, enable_limits
+):
+    @task
+    def app(event, api):
+        return api
+
+    api = app_runner(app, TaskEvent(asset_id=int(), company_id=int()))
+    requests_mock.get(
+        f'{SETTINGS.API_ROOT_URL}/', status_code=429, headers={'Retry-After': '0'}
+    )
+
+    api.get('/')
+
+    limiter = RATE_LIMITER.get(urllib.parse.urlsplit(api.api_url).hostname or '')
+
+    assert limiter.concurrency == limiter.max_concurrency / 2
+    assert limiter.in_flight == 0
@@ -1,16 +1,22 @@
+import json
 import logging
 import re
+import threading
+import time
 from copy import deepcopy
 
 import pytest
 import redis
+import requests
 import requests_mock as requests_mock_lib
 from pytest_mock import MockerFixture
 from requests_mock import Mocker as RequestsMocker
 
-from corva import Logger
+from corva import Logger, handlers
+from corva.configuration import SETTINGS
 from corva.handlers import scheduled
 from corva.models.rerun import RerunTime, RerunTimeRange
+from corva.models.scheduled.prefetch import DatasetSpec, Prefetched
 from corva.models.scheduled.raw import (
     RawScheduledDataTimeEvent,
     RawScheduledDepthEvent,
@@ -383,6 +389,34 @@ def test_log_if_unable_to_set_completed_status(context, mocker: MockerFixture, c
     patch.assert_called_once()
 
 
+def test_set_completed_status_failure_is_logged_with_event_context(
+    context, capsys, mocker: MockerFixture
+):
+    @scheduled
+    def scheduled_app(event, api, cache):
+        pass
+
+    def set_schedule_as_completed(api):
+        time.sleep(0.1)  # fails after the app's logging context exits
+        raise Exception('Oops!')
+
+    mocker.patch.object(
+        RawScheduledEvent,
+        'set_schedule_as_completed',
+        side_effect=set_schedule_as_completed,
+    )
+
+    scheduled_app([[_raw_data_time_event()]], context)
+
+    lines = [
+        line
+        for line in capsys.readouterr().out.splitlines()
+        if 'Could not set schedule as completed' in line
+    ]
+    assert len(lines) == 1
+    assert 'ASSET=1 AC=0' in lines[0]
+
+
 def test_custom_log_handler(context, capsys, mocker: MockerFixture):
     @scheduled(handler=logging.StreamHandler())
     def app(event, api, cache):
@@ -497,11 +531,15 @@ def test_rerun_natural_time_cast_from_ms_to_s(
     assert result_event.rerun.range.end == expected
 
 
-def test_cache_connection_limit(requests_mock: RequestsMocker, context):
+def test_cache_connection_limit(
+    requests_mock: RequestsMocker, context, mocker: MockerFixture
+):
     """
     provided Cache object can't init more than one connection
     """
 
+    mocker.patch.object(SETTINGS, 'CACHE_POOL_TIMEOUT', 0.1)
+
     event = RawScheduledDataTimeEvent(
         asset_id=int(),
         interval=int(),
@@ -532,6 +570,44 @@ def test_cache_connection_limit(requests_mock: RequestsMocker, context):
         scheduled_app(event, context)
 
 
+def test_app_threads_wait_for_cache_connection(
+    requests_mock: RequestsMocker, context
+):
+    event = RawScheduledDataTimeEvent(
+        asset_id=int(),
+        interval=int(),
+        schedule=int(),
+        schedule_start=int(),
+        app_connection=int(),
+        app_stream=int(),
+        company=int(),
+        scheduler_type=SchedulerType.data_time,
+    ).model_dump(
+        by_alias=True,
+        exclude_unset=True,
+    )
+
+    @scheduled
+    def scheduled_app(event, api, cache):
+        errors = []
+
+        def use_cache(idx):
+            try:
+                cache.set(key=str(idx), value=str(idx))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=use_cache, args=(i,)) for i in range(5)]
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+
+        return errors
+
+    requests_mock.post(requests_mock_lib.ANY)
+
+    assert scheduled_app(event, context) == [[]]
+
+
 @pytest.mark.parametrize("merge_events", [True, False])
 def test_merge_events_parameter(merge_events, context, mocker):
     @scheduled(merge_events=merge_events)
@@ -600,3 +676,149 @@ def test_merge_events_parameter(merge_events, context, mocker):
         assert (
             len(result) == 2
         ), "Expected two separate events when merge_events is false."
+
+
+def _raw_data_time_event(**extra) -> dict:
+    return RawScheduledDataTimeEvent(
+        asset_id=1,
+        interval=60,
+        schedule=int(),
+        schedule_start=120,
+        app_connection=int(),
+        app_stream=int(),
+        company=int(),
+        scheduler_type=SchedulerType.data_time,
+        **extra,
+    ).model_dump(by_alias=True, exclude_unset=True)
+
+
+def test_prefetch_fetches_datasets_for_event_time_range(
+    requests_mock: RequestsMocker, context
+):
+    @scheduled(
+        prefetch=[
+            DatasetSpec("corva", "wits", fields="timestamp,data", limit=2),
+            DatasetSpec("corva", "wits.summary-1m", name="summary"),
+        ]
+    )
+    def scheduled_app(event, api, cache):
+        return dict(event.prefetched)
+
+    requests_mock.post(requests_mock_lib.ANY)
+    wits_mock = requests_mock.get(
+        re.compile('/api/v1/data/corva/wits/'),
+        [
+            {'json': [{'timestamp': 61}, {'timestamp': 62}]},
+            {'json': [{'timestamp': 63}]},
+        ],
+    )
+    requests_mock.get(
+        re.compile('/api/v1/data/corva/wits.summary-1m/'), json=[{'timestamp': 60}]
+    )
+
+    result = scheduled_app([[_raw_data_time_event()]], context)[0]
+
+    assert result == {
+        'wits': [{'timestamp': 61}, {'timestamp': 62}, {'timestamp': 63}],
+        'summary': [{'timestamp': 60}],
+    }
+    assert [request.qs['skip'] for request in wits_mock.request_history] == [
+        ['0'],
+        ['2'],
+    ]
+    assert json.loads(wits_mock.last_request.qs['query'][0]) == {
+        'asset_id': 1,
+        'timestamp': {'$gte': 61, '$lte': 120},
+    }
+    assert wits_mock.last_request.qs['fields'] == ['timestamp,data']
+
+
+def test_prefetch_raises_fetch_error_on_access(requests_mock: RequestsMocker, context):
+    @scheduled(prefetch=[DatasetSpec("corva", "wits")])
+    def scheduled_app(event, api, cache):
+        with pytest.raises(requests.HTTPError):
+            event.prefetched['wits']
+
+        return event.prefetched.future('wits').done()
+
+    requests_mock.post(requests_mock_lib.ANY)
+    requests_mock.get(re.compile('/api/v1/data/corva/wits/'), status_code=400)
+
+    assert scheduled_app([[_raw_data_time_event()]], context) == [True]
+
+
+def test_prefetch_starts_before_invocation_setup(
+    requests_mock: RequestsMocker, context, mocker: MockerFixture
+):
+    @scheduled(prefetch=[DatasetSpec("corva", "wits")])
+    def scheduled_app(event, api, cache):
+        return event.prefetched['wits']
+
+    calls = []
+    start = Prefetched.start
+    get_api_sdk = handlers.get_api_sdk
+    mocker.patch.object(
+        Prefetched,
+        'start',
+        side_effect=lambda fetches: calls.append('prefetch') or start(fetches),
+    )
+    mocker.patch.object(
+        handlers,
+        'get_api_sdk',
+        side_effect=lambda **kwargs: calls.append('api_sdk') or get_api_sdk(**kwargs),
+    )
+    requests_mock.post(requests_mock_lib.ANY)
+    requests_mock.get(re.compile('/api/v1/data/corva/wits/'), json=[{'timestamp': 61}])
+
+    assert scheduled_app([[_raw_data_time_event()]], context) == [[{'timestamp': 61}]]
+    assert calls == ['prefetch', 'api_sdk']
+
+
+def test_prefetched_datasets_mapping():
+    prefetched = Prefetched.start({'wits': lambda: [{'timestamp': 1}]})
+
+    assert len(prefetched) == 1
+    assert dict(prefetched) == {'wits': [{'timestamp': 1}]}
+    assert repr(prefetched) == "Prefetched(['wits'])"
+
+    prefetched.close()
+
+
+def test_prefetched_without_datasets():
+    prefetched = Prefetched.start({})
+
+    assert len(prefetched) == 0
+    assert repr(prefetched) == "Prefetched([])"
+
+    prefetched.close()
+
+
+def test_prefetch_names_must_be_unique():
+    with pytest.raises(ValueError, match='must be unique'):
+        scheduled(
+            lambda event, api, cache: None,
+            prefetch=[DatasetSpec("corva", "wits"), DatasetSpec("other", "wits")],
+        )
+
+
+def test_schedules_are_completed_concurrently(context, mocker: MockerFixture):
+    @scheduled
+    def scheduled_app(event, api, cache):
+        pass
+
+    barrier = threading.Barrier(2, timeout=5)
+    completed = []
+
+    def set_schedule_as_completed(api):
+        barrier.wait()  # fails if completions are sent one by one
+        completed.append(True)
+
+    mocker.patch.object(
+        RawScheduledEvent,
+        'set_schedule_as_completed',
+        side_effect=set_schedule_as_completed,
+    )
+
+    scheduled_app([[_raw_data_time_event(), _raw_data_time_event()]], context)
+
+    assert completed == [True, True]  # waits for completions before returning
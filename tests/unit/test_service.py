@@ -1,12 +1,30 @@
+import concurrent.futures
 import datetime
+import logging
+import sys
+import threading
+import time
 from typing import Dict
+from unittest import mock
 
 import freezegun
 import pytest
+from pytest_mock import MockerFixture
 
-from corva import secrets
+from corva import Logger, deadline, secrets
+from corva.logger import CORVA_LOGGER, LoggingContext
+from corva.service import api_sdk as api_sdk_module
 from corva.service import service
-from corva.service.api_sdk import CachingApiSdk, FakeApiSdk
+from corva.service.api_sdk import CachingApiSdk, FakeApiSdk, PrefetchingApiSdk
+
+NOW = datetime.datetime(year=2022, month=1, day=1)
+
+
+def wait_for_refresh():
+    """Waits for background refreshes to finish."""
+
+    for future in list(CachingApiSdk.IN_FLIGHT.values()):
+        future.exception(timeout=5)
 
 
 class TestRunApp:
@@ -94,3 +112,299 @@ class TestRunApp:
         )
 
         assert result == 10
+
+    def test_secrets_are_isolated_between_threads(self):
+        barrier = threading.Barrier(2, timeout=5)
+        results = {}
+
+        def run(app_key: str):
+            def app():
+                barrier.wait()  # both apps are running at the same time
+                results[app_key] = dict(secrets)
+
+            service.run_app(
+                has_secrets=True,
+                app_key=app_key,
+                api_sdk=FakeApiSdk(
+                    secrets={'key1': {'name': 'value1'}, 'key2': {'name': 'value2'}}
+                ),
+                app=app,
+            )
+
+        threads = [
+            threading.Thread(target=run, args=(key,)) for key in ('key1', 'key2')
+        ]
+        [thread.start() for thread in threads]
+        [thread.join() for thread in threads]
+
+        assert results == {'key1': {'name': 'value1'}, 'key2': {'name': 'value2'}}
+        assert secrets == {}
+
+    def test_secrets_can_be_assigned_and_patched(self):
+        with mock.patch.dict(secrets, {'name': 'patched'}):
+            assert secrets['name'] == 'patched'
+
+            secrets['other'] = 'value'
+
+            assert dict(secrets) == {'name': 'patched', 'other': 'value'}
+
+        assert secrets == {}
+
+    def test_app_assignments_do_not_leak(self):
+        def app():
+            secrets['name'] = 'changed'
+
+        service.run_app(
+            has_secrets=True,
+            app_key='key',
+            api_sdk=FakeApiSdk(secrets={'key': {'name': 'value'}}),
+            app=app,
+        )
+
+        assert secrets == {}
+
+    def test_app_threads_read_app_secrets(self):
+        def app():
+            thread_secrets = []
+            thread = threading.Thread(
+                target=lambda: thread_secrets.append(dict(secrets))
+            )
+            thread.start()
+            thread.join()
+
+            with concurrent.futures.ThreadPoolExecutor() as executor:
+                pool_secrets = executor.submit(dict, secrets).result()
+
+            return thread_secrets[0], pool_secrets
+
+        result = service.run_app(
+            has_secrets=True,
+            app_key='key',
+            api_sdk=FakeApiSdk(secrets={'key': {'name': 'value'}}),
+            app=app,
+        )
+
+        assert result == ({'name': 'value'}, {'name': 'value'})
+        assert secrets == {}
+
+
+class TestPrefetchingApiSdk:
+    def test_fetches_secrets_in_background(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        class SlowApiSdk(FakeApiSdk):
+            def get_secrets(self, app_key: str) -> Dict[str, str]:
+                started.set()
+                release.wait(timeout=5)
+                return super().get_secrets(app_key)
+
+        api_sdk = PrefetchingApiSdk(
+            api_sdk=SlowApiSdk(secrets={'key': {'name': 'value'}}), app_key='key'
+        )
+
+        assert started.wait(timeout=5)  # fetch started without get_secrets call
+
+        release.set()
+
+        assert api_sdk.get_secrets(app_key='key') == {'name': 'value'}
+
+    def test_raises_fetch_error(self):
+        api_sdk = PrefetchingApiSdk(api_sdk=FakeApiSdk(), app_key='key')
+
+        with pytest.raises(KeyError):
+            api_sdk.get_secrets(app_key='key')
+
+    def test_fetches_other_app_key_directly(self):
+        api_sdk = PrefetchingApiSdk(
+            api_sdk=FakeApiSdk(secrets={'key1': {}, 'key2': {'name': 'value'}}),
+            app_key='key1',
+        )
+
+        assert api_sdk.get_secrets(app_key='key2') == {'name': 'value'}
+
+
+class CountingApiSdk(FakeApiSdk):
+    def __init__(self, secrets: Dict[str, Dict[str, str]]):
+        super().__init__(secrets=secrets)
+        self.calls = 0
+        self.fetched = threading.Event()
+
+    def get_secrets(self, app_key: str) -> Dict[str, str]:
+        self.calls += 1
+        try:
+            return super().get_secrets(app_key)
+        finally:
+            self.fetched.set()
+
+
+class TestCachingApiSdk:
+    @pytest.fixture(autouse=True)
+    def clear_cache(self, mocker: MockerFixture):
+        mocker.patch.object(CachingApiSdk, 'SECRETS_CACHE', {})
+        mocker.patch.object(CachingApiSdk, 'IN_FLIGHT', {})
+
+    def fill_cache(self, api_sdk: CachingApiSdk, at: datetime.datetime):
+        with freezegun.freeze_time(at):
+            api_sdk.get_secrets(app_key='key')
+
+    def test_serves_stale_secrets_and_refreshes_in_background(self):
+        fake_sdk = CountingApiSdk(secrets={'key': {'name': 'old'}})
+        api_sdk = CachingApiSdk(api_sdk=fake_sdk, ttl=10, stale_ttl=10)
+        self.fill_cache(api_sdk, at=NOW)
+        fake_sdk.secrets = {'key': {'name': 'new'}}
+        fake_sdk.fetched.clear()
+
+        with freezegun.freeze_time(NOW + datetime.timedelta(seconds=15)):
+            assert api_sdk.get_secrets(app_key='key') == {'name': 'old'}
+            assert fake_sdk.fetched.wait(timeout=5)
+            wait_for_refresh()
+            assert api_sdk.get_secrets(app_key='key') == {'name': 'new'}
+
+        assert fake_sdk.calls == 2
+
+    def test_refresh_is_not_limited_by_invocation_deadline(self):
+        remaining = []
+
+        class DeadlineApiSdk(CountingApiSdk):
+            def get_secrets(self, app_key: str) -> Dict[str, str]:
+                remaining.append(deadline.get_remaining())
+                return super().get_secrets(app_key)
+
+        fake_sdk = DeadlineApiSdk(secrets={'key': {'name': 'value'}})
+        # secrets expire right away, but are served while refreshing
+        api_sdk = CachingApiSdk(api_sdk=fake_sdk, ttl=0, stale_ttl=60)
+        api_sdk.get_secrets(app_key='key')
+        fake_sdk.fetched.clear()
+
+        # the invocation is out of time, the refresh is not limited by it
+        with deadline.setting(time.monotonic() - 1):
+            assert api_sdk.get_secrets(app_key='key') == {'name': 'value'}
+            assert fake_sdk.fetched.wait(timeout=5)
+            wait_for_refresh()
+
+        assert 0 < remaining[-1] <= CachingApiSdk.REFRESH_TIMEOUT
+
+    def test_logs_refresh_error(self, capsys, mocker: MockerFixture):
+        logged = threading.Event()
+        log_refresh_error = api_sdk_module._log_refresh_error
+
+        def log_and_notify(future):
+            log_refresh_error(future)
+            logged.set()
+
+        mocker.patch.object(api_sdk_module, '_log_refresh_error', log_and_notify)
+        fake_sdk = CountingApiSdk(secrets={'key': {'name': 'value'}})
+        api_sdk = CachingApiSdk(api_sdk=fake_sdk, ttl=0, stale_ttl=60)
+        api_sdk.get_secrets(app_key='key')
+        fake_sdk.secrets = {}  # refresh raises KeyError
+
+        def logging_context(asset_id: int) -> LoggingContext:
+            return LoggingContext(
+                aws_request_id='qwerty',
+                asset_id=asset_id,
+                app_connection_id=2,
+                handler=logging.StreamHandler(sys.stdout),
+                user_handler=None,
+                logger=CORVA_LOGGER,
+            )
+
+        def other_invocation(entered: threading.Event) -> None:
+            with logging_context(asset_id=3):
+                entered.set()
+                logged.wait(timeout=5)
+
+        with logging_context(asset_id=1):
+            # a concurrent invocation enters its logging context later
+            entered = threading.Event()
+            thread = threading.Thread(target=other_invocation, args=(entered,))
+            thread.start()
+            assert entered.wait(timeout=5)
+
+            assert api_sdk.get_secrets(app_key='key') == {'name': 'value'}
+            assert logged.wait(timeout=5)
+            thread.join()
+
+        assert (
+            'qwerty WARNING ASSET=1 AC=2 | Could not refresh secrets. '
+            "Details: 'key'." in capsys.readouterr().out
+        )
+
+    def test_prefetch_joining_refresh_does_not_deadlock(
+        self, mocker: MockerFixture
+    ):
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        mocker.patch('corva.service.api_sdk.SECRETS_EXECUTOR', executor)
+        busy = threading.Event()
+        executor.submit(busy.wait, 5)
+        fake_sdk = CountingApiSdk(secrets={'key': {'name': 'value'}})
+        api_sdk = CachingApiSdk(api_sdk=fake_sdk, ttl=0, stale_ttl=60)
+        api_sdk.get_secrets(app_key='key')
+
+        # the prefetch gets queued first
+        prefetching = PrefetchingApiSdk(api_sdk=api_sdk, app_key='key')
+        # then the refresh starts, and the prefetch will join it
+        api_sdk.get_secrets(app_key='key')
+        CachingApiSdk.SECRETS_CACHE.clear()
+        busy.set()
+
+        assert prefetching.future.result(timeout=5) == {'name': 'value'}
+
+    def test_refreshes_ahead_of_expiry(self):
+        fake_sdk = CountingApiSdk(secrets={'key': {'name': 'value'}})
+        api_sdk = CachingApiSdk(api_sdk=fake_sdk, ttl=10, refresh_ahead=5)
+        self.fill_cache(api_sdk, at=NOW)
+        fake_sdk.fetched.clear()
+
+        with freezegun.freeze_time(NOW + datetime.timedelta(seconds=4)):
+            api_sdk.get_secrets(app_key='key')
+            assert not fake_sdk.fetched.is_set()
+
+        with freezegun.freeze_time(NOW + datetime.timedelta(seconds=6)):
+            api_sdk.get_secrets(app_key='key')
+            assert fake_sdk.fetched.wait(timeout=5)
+
+    def test_fetches_once_for_concurrent_callers(self):
+        release = threading.Event()
+
+        class SlowApiSdk(CountingApiSdk):
+            def get_secrets(self, app_key: str) -> Dict[str, str]:
+                release.wait(timeout=5)
+                return super().get_secrets(app_key)
+
+        fake_sdk = SlowApiSdk(secrets={'key': {'name': 'value'}})
+        api_sdk = CachingApiSdk(api_sdk=fake_sdk, ttl=10)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
+            futures = [
+                executor.submit(api_sdk.get_secrets, 'key') for _ in range(10)
+            ]
+            time.sleep(0.05)  # let all callers join the fetch
+            release.set()
+            results = [future.result() for future in futures]
+
+        assert results == [{'name': 'value'}] * 10
+        assert fake_sdk.calls == 1
+
+    @pytest.mark.parametrize(
+        'seconds_after_expiry, raises',
+        ((5, False), (15, True)),
+    )
+    def test_serves_stale_secrets_on_error(
+        self, seconds_after_expiry: int, raises: bool, mocker: MockerFixture
+    ):
+        warning = mocker.spy(Logger, 'warning')
+        fake_sdk = CountingApiSdk(secrets={'key': {'name': 'value'}})
+        api_sdk = CachingApiSdk(api_sdk=fake_sdk, ttl=10, stale_if_error_ttl=10)
+        self.fill_cache(api_sdk, at=NOW)
+        fake_sdk.secrets = {}  # fetch raises KeyError
+
+        with freezegun.freeze_time(
+            NOW + datetime.timedelta(seconds=10 + seconds_after_expiry)
+        ):
+            if raises:
+                with pytest.raises(KeyError):
+                    api_sdk.get_secrets(app_key='key')
+            else:
+                assert api_sdk.get_secrets(app_key='key') == {'name': 'value'}
+                assert 'Could not fetch secrets' in warning.call_args.args[0]
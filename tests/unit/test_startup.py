@@ -0,0 +1,146 @@
+import re
+import socketserver
+import threading
+from logging import Logger
+from types import SimpleNamespace
+from typing import Iterator, List
+
+import pytest
+from pytest_mock import MockerFixture
+from requests_mock import Mocker as RequestsMocker
+
+from corva import Api, startup, warmup
+from corva.cache_adapter import HashMigrator
+from corva.configuration import SETTINGS
+from corva.models.base import CorvaBaseEvent
+from corva.service.api_sdk import CachingApiSdk
+
+
+class CountingHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        self.server.connections.append(self.client_address)  # type: ignore
+
+        while self.rfile.readline() not in (b'\r\n', b''):
+            pass  # a body-less request ends with an empty line
+
+        self.wfile.write(b'HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n')
+        self.rfile.readline()  # keep the connection open until the client is done
+
+
+@pytest.fixture
+def server(mocker: MockerFixture) -> Iterator[socketserver.ThreadingTCPServer]:
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), CountingHandler)
+    server.daemon_threads = True
+    server.connections: List[tuple] = []  # type: ignore
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f'http://127.0.0.1:{server.server_address[1]}'
+    mocker.patch.object(SETTINGS, 'API_ROOT_URL', url)
+    mocker.patch.object(SETTINGS, 'DATA_API_ROOT_URL', url)
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_warmup_builds_deferred_validators():
+    class Event(CorvaBaseEvent):
+        value: int
+
+    assert not Event.__pydantic_complete__
+
+    warmup(connect=False)
+
+    assert Event.__pydantic_complete__
+
+
+def test_api_requests_reuse_warmup_connection(server):
+    warmup()
+
+    api = Api(
+        api_url=SETTINGS.API_ROOT_URL,
+        data_api_url=SETTINGS.DATA_API_ROOT_URL,
+        api_key='',
+        app_key=SETTINGS.APP_KEY,
+    )
+
+    assert api.get('/').status_code == 200
+    assert len(server.connections) == 1
+
+
+def test_api_instances_share_adapter():
+    apis = [
+        Api(api_url='https://a', data_api_url='https://b', api_key='', app_key='')
+        for _ in range(2)
+    ]
+
+    assert (
+        apis[0]._session.get_adapter('https://a')
+        is apis[1]._session.get_adapter('https://a')
+    )
+
+
+def test_failed_step_is_logged_and_skipped(mocker: MockerFixture):
+    def connect_api():
+        raise Exception('no network')
+
+    mocker.patch.object(startup, 'connect_api', connect_api)
+    check_redis_server_version = mocker.patch.object(
+        startup, 'check_redis_server_version'
+    )
+    warning = mocker.spy(Logger, 'warning')
+
+    warmup()
+
+    check_redis_server_version.assert_called_once()
+    assert "Warmup step 'connect_api' failed. Details: no network." in (
+        warning.call_args.args[1]
+    )
+
+
+def test_warmup_checks_redis_server_version(mocker: MockerFixture):
+    mocker.patch.object(SETTINGS, 'CACHE_SKIP_MIGRATION', 0)
+    mocker.patch.object(HashMigrator, '_version_checked', False)
+
+    startup.check_redis_server_version()
+
+    assert HashMigrator._version_checked
+
+
+def test_warmup_fetches_secrets(mocker: MockerFixture, requests_mock: RequestsMocker):
+    mocker.patch.object(CachingApiSdk, 'SECRETS_CACHE', {})
+    requests_mock.get(re.compile('/v2/apps/secrets/values'), json={'key': 'value'})
+
+    warmup(api_key='api-key', connect=False)
+
+    assert CachingApiSdk.SECRETS_CACHE[SETTINGS.APP_KEY][1] == {'key': 'value'}
+    assert requests_mock.last_request.headers['Authorization'] == 'API api-key'
+
+
+def test_snapshot_hooks(mocker: MockerFixture):
+    hooks = SimpleNamespace(before=[], after=[])
+    mocker.patch.object(
+        startup,
+        'snapshot_restore_py',
+        SimpleNamespace(
+            register_before_snapshot=hooks.before.append,
+            register_after_restore=hooks.after.append,
+        ),
+    )
+    mocker.patch.object(startup, '_SNAPSHOT_HOOKS_REGISTERED', False)
+    close_shared_adapters = mocker.patch('corva.api_utils.close_shared_adapters')
+    connect_api = mocker.patch.object(startup, 'connect_api')
+    seed = mocker.patch('random.seed')
+
+    warmup(connect=False)
+    warmup(connect=False)
+
+    assert len(hooks.before) == len(hooks.after) == 1
+
+    hooks.before[0]()
+    hooks.after[0]()
+
+    close_shared_adapters.assert_called_once_with()
+    seed.assert_called_once_with()
+    connect_api.assert_not_called()
@@ -1,23 +1,35 @@
 import logging
+import threading
+import time
 
+import pydantic
 import pytest
 from pytest_mock import MockerFixture
 
 from corva import Logger
 from corva.configuration import SETTINGS
 from corva.handlers import stream
-from corva.models.rerun import RerunTime, RerunTimeRange
+from corva.models.rerun import RerunDepth, RerunDepthRange, RerunTime, RerunTimeRange
+from corva.models.stream.compact import CompactDepthRecord, CompactTimeRecord
 from corva.models.stream.log_type import LogType
 from corva.models.stream.raw import (
     RawAppMetadata,
     RawDepthRecord,
     RawMetadata,
     RawStreamDepthEvent,
+    RawStreamDictsEvent,
     RawStreamEvent,
     RawStreamTimeEvent,
     RawTimeRecord,
 )
-from corva.models.stream.stream import StreamDepthEvent, StreamEvent, StreamTimeEvent
+from corva.models.stream.stream import (
+    StreamColumnsEvent,
+    StreamCompactEvent,
+    StreamDepthEvent,
+    StreamDictsEvent,
+    StreamEvent,
+    StreamTimeEvent,
+)
 
 
 @pytest.mark.parametrize('attr', ('asset_id', 'company_id'))
@@ -654,3 +666,408 @@ def test_raw_stream_event_with_none_data_field_returns_expected_result(context):
 
     _ = stream_app(event, context)[0]
     assert True, "App call should be skipped"
+
+
+def _raw_stream_event(log_type: str, records: list, **extra) -> dict:
+    return {
+        "metadata": {
+            "app_stream_id": 1,
+            "apps": {SETTINGS.APP_KEY: {"app_connection_id": 1}},
+            "log_type": log_type,
+            "log_identifier": "log_identifier",
+        },
+        "records": records,
+        **extra,
+    }
+
+
+def _raw_record(**fields) -> dict:
+    return {"asset_id": 1, "company_id": 2, "collection": "wits", **fields}
+
+
+@pytest.mark.parametrize('records_as', ('dicts', 'columns', 'compact'))
+def test_records_as_filters_records(records_as, mocker: MockerFixture, context):
+    @stream(records_as=records_as)
+    def stream_app(event, api, cache):
+        return event
+
+    mocker.patch.object(
+        RawStreamDictsEvent, 'get_cached_max_record_value', return_value=1
+    )
+
+    event = [
+        _raw_stream_event(
+            "time",
+            [
+                _raw_record(timestamp=1, data={"rop": 1}),
+                _raw_record(timestamp=2, data={"rop": 2}),
+                _raw_record(timestamp=3, data=None),
+                _raw_record(timestamp=4, data={}, collection="wits.completed"),
+            ],
+        )
+    ]
+
+    result_event = stream_app(event, context)[0]
+
+    assert result_event.asset_id == 1
+    assert result_event.company_id == 2
+
+    if records_as == 'dicts':
+        assert isinstance(result_event, StreamDictsEvent)
+        assert result_event.records == [_raw_record(timestamp=2, data={"rop": 2})]
+    elif records_as == 'compact':
+        assert isinstance(result_event, StreamCompactEvent)
+        assert list(result_event.records) == [
+            CompactTimeRecord(_raw_record(timestamp=2, data={"rop": 2}))
+        ]
+    else:
+        assert isinstance(result_event, StreamColumnsEvent)
+        assert result_event.columns == {
+            "asset_id": [1],
+            "company_id": [2],
+            "collection": ["wits"],
+            "timestamp": [2],
+            "data.rop": [2],
+        }
+
+
+def test_records_as_dicts_depth_event(context):
+    @stream(records_as='dicts')
+    def stream_app(event, api, cache):
+        return event
+
+    event = [
+        _raw_stream_event(
+            "depth",
+            [_raw_record(measured_depth=1.5, data={})],
+            rerun={"range": {"start": 1.0, "end": 2.0}, "invoke": 1, "total": 1},
+        )
+    ]
+
+    result_event: StreamDictsEvent = stream_app(event, context)[0]
+
+    assert result_event.log_identifier == 'log_identifier'
+    assert result_event.rerun == RerunDepth(
+        range=RerunDepthRange(start=1.0, end=2.0), invoke=1, total=1
+    )
+
+
+def test_records_as_compact_keeps_attribute_access(context):
+    @stream(records_as='compact')
+    def stream_app(event, api, cache):
+        return event
+
+    event = [
+        _raw_stream_event(
+            "depth",
+            [
+                _raw_record(measured_depth=1.5, data={"rop": 1}),
+                _raw_record(measured_depth=2.5, data={"rop": 2}, metadata={"a": 1}),
+            ],
+        )
+    ]
+
+    result_event: StreamCompactEvent = stream_app(event, context)[0]
+    record = result_event.records[1]
+
+    assert isinstance(record, CompactDepthRecord)
+    assert record.measured_depth == 2.5
+    assert record.data == {"rop": 2}
+    assert record.metadata == {"a": 1}
+    assert record.collection == "wits"
+    assert result_event.records[0].metadata == {}
+    assert result_event.records[1:].raw == [event[0]["records"][1]]
+    assert result_event.log_identifier == 'log_identifier'
+    assert list(result_event.to_columns(["measured_depth", "data.rop"])) == [
+        "measured_depth",
+        "data.rop",
+    ]
+    assert list(result_event.to_columns(["data.rop"])["data.rop"]) == [1.0, 2.0]
+
+    with pytest.raises(AttributeError, match="no attribute 'timestamp'"):
+        record.timestamp
+
+    with pytest.raises(AttributeError):
+        record.extra = 1
+
+
+def test_compact_record_keeps_changes_to_missing_data():
+    record = CompactTimeRecord({"timestamp": 1})
+
+    record.data["rop"] = 1
+    record.metadata["a"] = 2
+
+    assert record.data == {"rop": 1}
+    assert record.metadata == {"a": 2}
+    assert record.to_dict() == {
+        "timestamp": 1,
+        "data": {"rop": 1},
+        "metadata": {"a": 2},
+    }
+
+
+def test_records_as_dicts_saves_last_processed_value(context, mocker: MockerFixture):
+    @stream(records_as='dicts')
+    def stream_app(event, api, cache):
+        pass
+
+    spy = mocker.spy(RawStreamDictsEvent, 'set_cached_max_record_value')
+
+    stream_app(
+        [_raw_stream_event("time", [_raw_record(timestamp=5, data={})])], context
+    )
+
+    assert spy.call_args.kwargs['cache'].get('last_processed_timestamp') == '5'
+
+
+@pytest.mark.parametrize(
+    'records',
+    (
+        pytest.param([_raw_record(data={})], id='record value is missing'),
+        pytest.param([{"timestamp": 1, "data": {}}], id='asset_id is missing'),
+    ),
+)
+def test_records_as_dicts_validates_records(records, context):
+    @stream(records_as='dicts')
+    def stream_app(event, api, cache):
+        pass
+
+    with pytest.raises(pydantic.ValidationError):
+        stream_app([_raw_stream_event("time", records)], context)
+
+
+@pytest.mark.parametrize(
+    'log_type, key, values, expected',
+    (
+        ('time', 'timestamp', ['1', 2.0, '3'], [2, 3]),
+        ('depth', 'measured_depth', ['1.0', 2, '2.5'], [2.0, 2.5]),
+    ),
+)
+def test_records_as_dicts_coerces_record_values(
+    log_type, key, values, expected, mocker: MockerFixture, context
+):
+    @stream(records_as='dicts')
+    def stream_app(event, api, cache):
+        return event
+
+    mocker.patch.object(
+        RawStreamDictsEvent, 'get_cached_max_record_value', return_value=1
+    )
+    spy = mocker.spy(RawStreamDictsEvent, 'set_cached_max_record_value')
+
+    result_event: StreamDictsEvent = stream_app(
+        [
+            _raw_stream_event(
+                log_type, [_raw_record(**{key: value, "data": {}}) for value in values]
+            )
+        ],
+        context,
+    )[0]
+
+    assert [record[key] for record in result_event.records] == expected
+    assert [type(record[key]) for record in result_event.records] == [
+        type(value) for value in expected
+    ]
+    assert spy.call_args.kwargs['cache'].get(
+        f'last_processed_{key.split("_")[-1]}'
+    ) == str(expected[-1])
+
+
+@pytest.mark.parametrize(
+    'log_type, records',
+    (
+        pytest.param(
+            'time', [_raw_record(timestamp='now', data={})], id='invalid timestamp'
+        ),
+        pytest.param(
+            'time', [_raw_record(timestamp=1.5, data={})], id='fractional timestamp'
+        ),
+        pytest.param('depth', [], id='depth event without records'),
+    ),
+)
+def test_records_as_dicts_validates_record_values(log_type, records, context):
+    @stream(records_as='dicts')
+    def stream_app(event, api, cache):
+        pass
+
+    with pytest.raises(pydantic.ValidationError):
+        stream_app([_raw_stream_event(log_type, records)], context)
+
+
+def test_records_as_raises_for_unknown_value():
+    with pytest.raises(ValueError, match='Unsupported records_as value'):
+        stream(lambda event, api, cache: None, records_as='unknown')  # type: ignore
+
+
+def test_concurrency_processes_assets_concurrently(context, capsys):
+    barrier = threading.Barrier(2, timeout=5)
+
+    @stream(concurrency=2)
+    def stream_app(event, api, cache):
+        barrier.wait()  # fails if events of different assets run one by one
+        Logger.warning('Hello, World!')
+        return event.asset_id
+
+    event = [
+        _raw_stream_event(
+            "time", [_raw_record(asset_id=asset_id, timestamp=1, data={})]
+        )
+        for asset_id in (1, 2)
+    ]
+
+    assert stream_app(event, context) == [1, 2]
+
+    captured = capsys.readouterr().out
+    assert 'ASSET=1 AC=1 | Hello, World!' in captured
+    assert 'ASSET=2 AC=1 | Hello, World!' in captured
+
+
+def test_concurrency_keeps_asset_order(context):
+    processed = []
+
+    @stream(concurrency=4)
+    def stream_app(event, api, cache):
+        processed.append(event.records[0].timestamp)
+        time.sleep(0.01)
+
+    event = [
+        _raw_stream_event("time", [_raw_record(timestamp=timestamp, data={})])
+        for timestamp in range(1, 5)
+    ]
+
+    stream_app(event, context)
+
+    assert processed == [1, 2, 3, 4]
+
+
+def test_concurrency_must_be_positive():
+    with pytest.raises(ValueError, match='concurrency must be positive'):
+        stream(lambda event, api, cache: None, concurrency=0)
+
+
+def test_merge_events_sorts_and_deduplicates_records(context):
+    @stream(merge_events=True)
+    def stream_app(event, api, cache):
+        return event
+
+    event = [
+        _raw_stream_event(
+            "time",
+            [
+                _raw_record(timestamp=1, data={"event": 1}),
+                _raw_record(timestamp=3, data={"event": 1}),
+                _raw_record(timestamp=4, data={}, collection="wits.completed"),
+            ],
+        ),
+        _raw_stream_event(
+            "time",
+            [
+                _raw_record(timestamp=3, data={"event": 2}),
+                _raw_record(timestamp=3, data={"event": 2}, collection="other"),
+                _raw_record(timestamp=2, data={"event": 2}),
+            ],
+        ),
+    ]
+
+    result_event: StreamTimeEvent = stream_app(event, context)[0]
+
+    assert [
+        (record.timestamp, record.collection, record.data["event"])  # type: ignore
+        for record in result_event.records
+    ] == [(1, "wits", 1), (2, "wits", 2), (3, "wits", 1), (3, "other", 2)]
+
+
+def test_merge_events_keeps_duplicate_with_data(context):
+    @stream(merge_events=True)
+    def stream_app(event, api, cache):
+        return event
+
+    event = [
+        _raw_stream_event("time", [_raw_record(timestamp=1, data=None)]),
+        _raw_stream_event("time", [_raw_record(timestamp=1, data={"event": 2})]),
+    ]
+
+    result_event: StreamTimeEvent = stream_app(event, context)[0]
+
+    assert [
+        (record.timestamp, record.collection, record.data)  # type: ignore
+        for record in result_event.records
+    ] == [(1, "wits", {"event": 2})]
+
+
+def test_merge_events_keeps_completed_record_last(mocker: MockerFixture, context):
+    @stream(merge_events=True)
+    def stream_app(event, api, cache):
+        pass
+
+    spy = mocker.spy(RawStreamEvent, 'filter_records')
+
+    event = [
+        _raw_stream_event(
+            "depth",
+            [
+                _raw_record(measured_depth=2.0, data={}),
+                _raw_record(measured_depth=3.0, data={}, collection="wits.completed"),
+            ],
+        ),
+        _raw_stream_event("depth", [_raw_record(measured_depth=1.0, data={})]),
+    ]
+
+    stream_app(event, context)
+
+    raw_event = spy.call_args.args[0]
+    assert raw_event.is_completed
+    assert [record.measured_depth for record in raw_event.records] == [1.0, 2.0, 3.0]
+    assert [record.measured_depth for record in spy.spy_return] == [1.0, 2.0]
+
+
+@pytest.mark.parametrize('records_as', ('models', 'dicts'))
+def test_late_records_window_accepts_late_records_once(records_as, context):
+    @stream(records_as=records_as, late_records_window=10)
+    def stream_app(event, api, cache):
+        return [
+            record.timestamp if records_as == 'models' else record['timestamp']
+            for record in event.records
+        ]
+
+    def invoke(*timestamps):
+        event = _raw_stream_event(
+            "time", [_raw_record(timestamp=value, data={}) for value in timestamps]
+        )
+        return stream_app([event], context)[0]
+
+    assert invoke(20) == [20]
+    assert invoke(25, 17) == [25, 17]  # late record inside the window
+    assert invoke(17, 20, 25) is None  # duplicates
+    assert invoke(18, 5) == [18]  # 5 is outside the window
+    assert invoke(1) is None  # below the watermark of the first invocation
+
+
+def test_late_records_window_does_not_decrease_max_record_value(context):
+    @stream(late_records_window=10)
+    def stream_app(event, api, cache):
+        return cache
+
+    def invoke(timestamp):
+        event = _raw_stream_event(
+            "time", [_raw_record(timestamp=timestamp, data={})]
+        )
+        return stream_app([event], context)[0]
+
+    invoke(20)
+    cache = invoke(15)
+
+    assert cache.get('last_processed_timestamp') == '20'
+
+
+@pytest.mark.parametrize(
+    'window, resolution',
+    ((0, 1), (-1, 1), (1, 0)),
+)
+def test_late_records_window_must_be_positive(window, resolution):
+    with pytest.raises(ValueError, match='must be positive'):
+        stream(
+            lambda event, api, cache: None,
+            late_records_window=window,
+            late_records_resolution=resolution,
+        )
@@ -0,0 +1,130 @@
+import array
+import math
+
+import pytest
+from pytest_mock import MockerFixture
+
+from corva import StreamDepthEvent, StreamDepthRecord, StreamTimeEvent, StreamTimeRecord
+from corva.models.stream import columns
+
+
+@pytest.fixture(scope="function")
+def no_numpy(mocker: MockerFixture):
+    mocker.patch.object(columns, "get_numpy", return_value=None)
+
+
+def test_records_to_columns():
+    records = [
+        {"timestamp": 1, "data": {"rop": 2}},
+        {"timestamp": 3, "data": {"wob": 4}, "extra": 5},
+    ]
+
+    assert columns.records_to_columns(records) == {
+        "timestamp": [1, 3],
+        "data.rop": [2, None],
+        "data.wob": [None, 4],
+        "extra": [None, 5],
+    }
+
+
+def test_records_to_columns_fills_data_columns():
+    records = [
+        {"data": {"rop": 1}},
+        {"data": None},
+        {"data": {"rop": 2}},
+    ]
+
+    assert columns.records_to_columns(records) == {
+        "data.rop": [1, None, 2],
+        "data": [None, None, None],
+    }
+
+
+def test_time_event_to_columns(no_numpy):
+    event = StreamTimeEvent(
+        asset_id=0,
+        company_id=0,
+        records=[
+            StreamTimeRecord(timestamp=1, data={"hole_depth": 10.5, "rop": -999.25}),
+            StreamTimeRecord(timestamp=2, data={"hole_depth": 11}),
+        ],
+    )
+
+    result = event.to_columns(
+        fields=["timestamp", "data.hole_depth", "data.rop"], null_values=[-999.25]
+    )
+
+    assert result["timestamp"] == array.array("q", [1, 2])
+    assert result["data.hole_depth"] == array.array("d", [10.5, 11.0])
+    assert result["data.rop"].typecode == "d"
+    assert all(math.isnan(value) for value in result["data.rop"])
+
+
+def test_depth_event_to_columns(no_numpy):
+    event = StreamDepthEvent(
+        asset_id=0,
+        company_id=0,
+        records=[
+            StreamDepthRecord(measured_depth=1.5, data={"gamma": 3}),
+            StreamDepthRecord(measured_depth=2.5, data={}),
+        ],
+    )
+
+    result = event.to_columns(fields=["measured_depth", "data.gamma"])
+
+    assert result["measured_depth"] == array.array("d", [1.5, 2.5])
+    assert result["data.gamma"][0] == 3.0
+    assert math.isnan(result["data.gamma"][1])
+
+
+def test_to_columns_raises_for_null_integer(no_numpy):
+    with pytest.raises(ValueError, match="contains null value"):
+        columns.records_to_arrays(
+            [{"timestamp": None}], fields=["timestamp"], int_fields=["timestamp"]
+        )
+
+
+@pytest.mark.parametrize("numpy_installed", [True, False])
+def test_to_columns_falls_back_to_list_for_mixed_types(
+    numpy_installed, mocker: MockerFixture
+):
+    if numpy_installed:
+        pytest.importorskip("numpy")
+    else:
+        mocker.patch.object(columns, "get_numpy", return_value=None)
+
+    records = [
+        {"timestamp": 1, "data": {"rop": 2, "bit": "PDC", "state": None}},
+        {"timestamp": 2, "data": {"rop": 3, "bit": None, "state": {"on": True}}},
+        {"timestamp": 3, "data": {"rop": "n/a", "bit": "PDC", "state": [1]}},
+    ]
+
+    result = columns.records_to_arrays(
+        records,
+        fields=["timestamp", "data.rop", "data.bit", "data.state"],
+        null_values=[-999.25],
+        int_fields=["timestamp"],
+    )
+
+    assert list(result["timestamp"]) == [1, 2, 3]
+    assert result["data.rop"] == [2.0, 3.0, "n/a"]
+    assert result["data.bit"][0] == "PDC"
+    assert math.isnan(result["data.bit"][1])
+    assert result["data.bit"][2] == "PDC"
+    assert math.isnan(result["data.state"][0])
+    assert result["data.state"][1:] == [{"on": True}, [1]]
+
+
+def test_to_columns_returns_numpy_arrays():
+    numpy = pytest.importorskip("numpy")
+
+    event = StreamTimeEvent(
+        asset_id=0,
+        company_id=0,
+        records=[StreamTimeRecord(timestamp=1, data={"rop": 2})],
+    )
+
+    result = event.to_columns(fields=["timestamp", "data.rop"])
+
+    assert result["timestamp"].dtype == numpy.int64
+    assert result["data.rop"].dtype == numpy.float64
@@ -0,0 +1,56 @@
+import pytest
+
+from corva.models.stream.compact import (
+    CompactDepthRecord,
+    CompactRecords,
+    CompactTimeRecord,
+)
+
+
+def test_compact_record_attributes():
+    record = CompactTimeRecord(
+        {"timestamp": 1, "data": {"rop": 2}, "metadata": {"a": 3}, "extra": 4}
+    )
+
+    assert record.timestamp == 1
+    assert record.data == {"rop": 2}
+    assert record.metadata == {"a": 3}
+    assert record.extra == 4
+
+    with pytest.raises(AttributeError, match="no attribute 'measured_depth'"):
+        record.measured_depth
+
+    with pytest.raises(AttributeError):
+        record._private
+
+
+def test_compact_record_equality_and_repr():
+    record = CompactDepthRecord({"measured_depth": 1.5})
+
+    assert record == CompactDepthRecord({"measured_depth": 1.5})
+    assert record != CompactDepthRecord({"measured_depth": 2.5})
+    assert record != {"measured_depth": 1.5}
+    assert repr(record) == "CompactDepthRecord({'measured_depth': 1.5})"
+
+
+def test_compact_records_sequence():
+    raw = [{"timestamp": 1}, {"timestamp": 2}, {"timestamp": 3}]
+    records = CompactRecords(raw=raw, record_type=CompactTimeRecord)
+
+    assert len(records) == 3
+    assert records[1] == CompactTimeRecord({"timestamp": 2})
+    assert [record.timestamp for record in records] == [1, 2, 3]
+    assert records[1:] == CompactRecords(raw=raw[1:], record_type=CompactTimeRecord)
+    assert records != CompactRecords(raw=raw, record_type=CompactDepthRecord)
+    assert records != raw
+    assert repr(records) == "CompactRecords(CompactTimeRecord, 3 records)"
+
+
+def test_compact_records_do_not_copy_raw_records():
+    raw = [{"timestamp": 1}]
+    records = CompactRecords(raw=raw, record_type=CompactTimeRecord)
+
+    records[0].data["rop"] = 1
+
+    assert raw == [{"timestamp": 1, "data": {"rop": 1}}]
+    assert records[0].to_dict() is raw[0]
@@ -0,0 +1,103 @@
+import pytest
+
+from corva.models.stream.dedup import LateRecordsWindow
+
+
+def test_accepts_values_above_watermark():
+    window = LateRecordsWindow(size=10, resolution=1)
+
+    assert window.filter([1, 2, 2, 3], watermark=None) == [True, True, True, True]
+    assert window.end_bucket == 3
+
+
+def test_accepts_late_values_inside_window_once():
+    window = LateRecordsWindow(size=10, resolution=1)
+    window.filter([10], watermark=None)
+
+    assert window.filter([5, 5, 10, 0, 11], watermark=10) == [
+        True,
+        False,
+        False,
+        False,
+        True,
+    ]
+
+
+@pytest.mark.parametrize('values', ([15, 25], [25, 15]))
+def test_batch_order_does_not_matter(values):
+    window = LateRecordsWindow(size=10, resolution=1)
+    window.filter([20], watermark=None)
+
+    # the window ends at 25 before testing 15, which is outside of it
+    assert dict(zip(values, window.filter(values, watermark=20))) == {
+        15: False,
+        25: True,
+    }
+
+
+def test_new_window_rejects_values_at_or_below_watermark():
+    window = LateRecordsWindow(size=10, resolution=1)
+
+    assert window.filter([5, 10, 11], watermark=10) == [False, False, True]
+    assert window.floor == 10
+
+
+def test_values_in_same_bucket_are_duplicates():
+    window = LateRecordsWindow(size=60, resolution=10)
+    window.filter([100], watermark=None)
+
+    assert window.filter([51, 55, 61], watermark=100) == [True, False, True]
+
+
+def test_advancing_window_forgets_old_buckets():
+    window = LateRecordsWindow(size=4, resolution=1)
+    window.filter([1, 2, 3, 4], watermark=None)
+    window.filter([6], watermark=4)
+
+    # bucket 2 left the window, bucket 5 was cleared when the window advanced
+    assert window.filter([2, 3, 5], watermark=6) == [False, False, True]
+
+
+def test_advancing_window_past_its_size_clears_it():
+    window = LateRecordsWindow(size=4, resolution=1)
+    window.filter([1, 2, 3, 4], watermark=None)
+    window.filter([100], watermark=4)
+
+    assert window.bits == bytearray([1 << (100 % 4)])
+
+
+def test_dumps_and_loads():
+    window = LateRecordsWindow(size=20, resolution=1)
+    window.filter([10, 15], watermark=5)
+
+    loaded = LateRecordsWindow.loads(window.dumps(), size=20, resolution=1)
+
+    assert loaded.end_bucket == 15
+    assert loaded.floor == 5
+    assert loaded.bits == window.bits
+    assert loaded.filter([10, 12], watermark=15) == [False, True]
+
+
+@pytest.mark.parametrize(
+    'value',
+    (None, '', 'invalid', '1:2:???', '1::AAAAAA=='),
+    ids=('none', 'empty', 'bad format', 'bad base64', 'bitmap size changed'),
+)
+def test_loads_invalid_value_gives_empty_window(value):
+    window = LateRecordsWindow.loads(value, size=10, resolution=1)
+
+    assert window.end_bucket is None
+    assert window.bits == bytearray(2)
+
+
+def test_window_takes_fixed_number_of_bytes():
+    window = LateRecordsWindow(size=3600, resolution=1)
+    window.filter(range(10_000), watermark=None)
+
+    assert len(window.bits) == 450
+
+
+@pytest.mark.parametrize('size, resolution', ((0, 1), (1, 0)))
+def test_size_and_resolution_must_be_positive(size, resolution):
+    with pytest.raises(ValueError):
+        LateRecordsWindow(size=size, resolution=resolution)
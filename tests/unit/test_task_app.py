@@ -1,13 +1,15 @@
 import logging
 import re
+import threading
 
 import pytest
 from pytest_mock import MockerFixture
 from requests_mock import Mocker as RequestsMocker
 
-from corva import Logger
+from corva import Logger, secrets
 from corva.handlers import task
 from corva.models.task import RawTaskEvent, TaskEvent
+from corva.service.api_sdk import CachingApiSdk
 
 
 @pytest.mark.parametrize(
@@ -229,3 +231,55 @@ def test_custom_log_handler(context, mocker: MockerFixture, capsys):
 
     assert captured.out.endswith('Info message!\n')
     assert captured.err == 'Info message!\n'
+
+
+def test_task_event_and_secrets_are_fetched_concurrently(
+    context, requests_mock: RequestsMocker, mocker: MockerFixture
+):
+    @task
+    def task_app(event, api):
+        return dict(secrets)
+
+    barrier = threading.Barrier(2, timeout=5)
+
+    def get_task_event(api):
+        barrier.wait()  # fails if the secrets are fetched after the task event
+        return TaskEvent(asset_id=int(), company_id=int())
+
+    def get_secrets(request, context):
+        barrier.wait()
+        return {'name': 'value'}
+
+    mocker.patch.object(CachingApiSdk, 'SECRETS_CACHE', {})
+    mocker.patch.object(RawTaskEvent, 'get_task_event', side_effect=get_task_event)
+    requests_mock.get(re.compile('/v2/apps/secrets/values'), json=get_secrets)
+    requests_mock.put(re.compile('/v2/tasks/0/success'))
+
+    event = RawTaskEvent(task_id='0', version=2, has_secrets=True).model_dump()
+
+    assert task_app(event, context) == [{'name': 'value'}]
+
+
+def test_secrets_fetch_error_fails_the_task(
+    context, requests_mock: RequestsMocker, mocker: MockerFixture
+):
+    @task
+    def task_app(event, api):
+        pass
+
+    mocker.patch.object(CachingApiSdk, 'SECRETS_CACHE', {})
+    requests_mock.get(
+        re.compile('/v2/tasks/0'),
+        json=TaskEvent(asset_id=int(), company_id=int()).model_dump(),
+    )
+    requests_mock.get(
+        re.compile('/v2/apps/secrets/values'), exc=ConnectionError('secrets')
+    )
+    put_mock = requests_mock.put(re.compile('/v2/tasks/0/fail'))
+
+    event = RawTaskEvent(task_id='0', version=2, has_secrets=True).model_dump()
+
+    with pytest.raises(ConnectionError, match='^secrets$'):
+        task_app(event, context)
+
+    assert put_mock.last_request.json() == {'fail_reason': 'secrets'}
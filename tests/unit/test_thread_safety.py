@@ -0,0 +1,83 @@
+import concurrent.futures
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from corva import Logger, secrets
+from corva.configuration import SETTINGS
+from corva.handlers import stream
+from corva.service import service
+from corva.service.api_sdk import CachingApiSdk, FakeApiSdk
+
+INVOCATIONS = 200
+
+
+def test_concurrent_invocations_have_isolated_logging(context, capsys):
+    @stream
+    def stream_app(event, api, cache):
+        time.sleep(0.001)  # let other threads interleave
+        Logger.warning(f'asset {event.asset_id}')
+        return event.asset_id
+
+    def invoke(asset_id: int):
+        event = {
+            "metadata": {
+                "app_stream_id": 1,
+                "apps": {SETTINGS.APP_KEY: {"app_connection_id": asset_id}},
+                "log_type": "time",
+            },
+            "records": [
+                {
+                    "asset_id": asset_id,
+                    "company_id": 1,
+                    "collection": "wits",
+                    "timestamp": 1,
+                    "data": {},
+                }
+            ],
+        }
+        aws_context = SimpleNamespace(
+            aws_request_id=f"request-{asset_id}",
+            client_context=context.client_context,
+        )
+        return stream_app([event], aws_context)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=50) as executor:
+        results = list(executor.map(invoke, range(INVOCATIONS)))
+
+    assert results == [[asset_id] for asset_id in range(INVOCATIONS)]
+
+    lines = re.findall(
+        r'request-(\d+) WARNING ASSET=(\d+) AC=(\d+) \| asset (\d+)',
+        capsys.readouterr().out,
+    )
+
+    assert len(lines) == INVOCATIONS
+    assert all(len(set(line)) == 1 for line in lines), "log context leaked"
+
+
+def test_concurrent_invocations_have_isolated_secrets(mocker):
+    mocker.patch.object(CachingApiSdk, 'SECRETS_CACHE', {})
+    barrier = threading.Barrier(INVOCATIONS, timeout=30)
+    api_sdk = CachingApiSdk(
+        api_sdk=FakeApiSdk(
+            secrets={str(idx): {"idx": str(idx)} for idx in range(INVOCATIONS)}
+        ),
+        ttl=60,
+    )
+
+    def invoke(idx: int):
+        def app():
+            barrier.wait()  # all apps are running at the same time
+            return dict(secrets)
+
+        return service.run_app(
+            has_secrets=True, app_key=str(idx), api_sdk=api_sdk, app=app
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=INVOCATIONS) as executor:
+        results = list(executor.map(invoke, range(INVOCATIONS)))
+
+    assert results == [{"idx": str(idx)} for idx in range(INVOCATIONS)]
+    assert secrets == {}
@@ -0,0 +1,216 @@
+import json
+import os
+import subprocess
+import sys
+from typing import List
+
+import pytest
+from pytest_mock import MockerFixture
+from requests_mock import Mocker as RequestsMocker
+
+from corva import tracing
+from corva.configuration import SETTINGS
+from corva.handlers import stream, task
+from corva.models.stream.log_type import LogType
+from corva.models.stream.raw import (
+    RawAppMetadata,
+    RawMetadata,
+    RawStreamTimeEvent,
+    RawTimeRecord,
+)
+from corva.models.task import TaskEvent
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans: List[tracing.Span] = []
+
+    def export(self, span: tracing.Span) -> None:
+        self.spans.append(span)
+
+    def get(self, name: str) -> tracing.Span:
+        return next(span for span in self.spans if span.name == name)
+
+
+@pytest.fixture
+def exporter(mocker: MockerFixture) -> ListExporter:
+    exporter = ListExporter()
+    mocker.patch.object(tracing, '_EXPORTER', exporter)
+    return exporter
+
+
+def test_disabled_tracing_records_nothing():
+    assert tracing.get_exporter() is None
+
+    with tracing.span('name') as span:
+        headers: dict = {}
+        tracing.inject(headers)
+
+    assert span is tracing.NOOP_SPAN
+    assert tracing.current_span() is tracing.NOOP_SPAN
+    assert headers == {}
+
+
+def test_nested_spans_share_trace(exporter: ListExporter):
+    with tracing.span('parent', {'key': 'value'}) as parent:
+        with tracing.span('child') as child:
+            assert tracing.current_span() is child
+
+        assert tracing.current_span() is parent
+
+    assert [span.name for span in exporter.spans] == ['child', 'parent']
+    assert child.trace_id == parent.trace_id
+    assert child.parent_span_id == parent.span_id
+    assert parent.parent_span_id is None
+    assert parent.attributes == {'key': 'value'}
+    assert parent.start_time <= child.start_time
+    assert child.end_time is not None and parent.end_time is not None
+    assert child.end_time <= parent.end_time
+    assert parent.status == 'OK'
+
+
+def test_span_records_exception(exporter: ListExporter):
+    with pytest.raises(ValueError):
+        with tracing.span('name'):
+            raise ValueError('message')
+
+    assert exporter.spans[0].status == 'ERROR'
+    assert exporter.spans[0].status_message == 'ValueError: message'
+
+
+def test_exporter_errors_are_ignored(mocker: MockerFixture):
+    class FailingExporter:
+        def export(self, span: tracing.Span) -> None:
+            raise Exception
+
+    mocker.patch.object(tracing, '_EXPORTER', FailingExporter())
+
+    with tracing.span('name'):
+        pass
+
+
+def test_inject_adds_traceparent(exporter: ListExporter):
+    headers: dict = {}
+
+    with tracing.span('name') as span:
+        tracing.inject(headers)
+
+    assert headers == {'traceparent': f'00-{span.trace_id}-{span.span_id}-01'}
+
+
+def test_file_exporter_writes_json_lines(tmp_path, mocker: MockerFixture):
+    path = tmp_path / 'traces.jsonl'
+    mocker.patch.object(
+        tracing, '_EXPORTER', tracing.JsonLinesExporter.to_file(str(path))
+    )
+
+    assert not path.exists()  # opened on first export
+
+    with tracing.span('parent'):
+        with tracing.span('child', {'key': 1}):
+            pass
+
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+
+    assert [span['name'] for span in spans] == ['child', 'parent']
+    assert spans[0]['attributes'] == {'key': 1}
+    assert spans[0]['parent_span_id'] == spans[1]['span_id']
+    assert spans[0]['status'] == {'code': 'OK', 'message': None}
+
+
+def test_stream_app_phases_are_traced(exporter: ListExporter, context):
+    @stream
+    def stream_app(event, api, cache):
+        pass
+
+    event = [
+        RawStreamTimeEvent(
+            records=[
+                RawTimeRecord(
+                    asset_id=1, company_id=int(), collection=str(), timestamp=1
+                )
+            ],
+            metadata=RawMetadata(
+                app_stream_id=int(),
+                apps={SETTINGS.APP_KEY: RawAppMetadata(app_connection_id=int())},
+                log_type=LogType.time,
+            ),
+        ).model_dump()
+    ]
+
+    stream_app(event, context)
+
+    names = {span.name for span in exporter.spans}
+    invocation = exporter.get('corva.invocation')
+
+    assert {
+        'corva.invocation',
+        'corva.parse_event',
+        'corva.event',
+        'corva.filter_records',
+        'corva.app',
+        'corva.save_max_record_value',
+        'corva.cache.get',
+    } <= names
+    assert {span.trace_id for span in exporter.spans} == {invocation.trace_id}
+    assert exporter.get('corva.event').attributes == {'corva.asset_id': 1}
+    assert exporter.get('corva.filter_records').attributes == {
+        'corva.records_received': 1,
+        'corva.record_count': 1,
+    }
+
+
+def test_api_request_propagates_trace(
+    exporter: ListExporter, app_runner, requests_mock: RequestsMocker
+):
+    @task
+    def app(event, api):
+        return api
+
+    api = app_runner(app, TaskEvent(asset_id=int(), company_id=int()))
+    requests_mock.get(f'{SETTINGS.API_ROOT_URL}/', status_code=204)
+
+    with tracing.span('parent') as parent:
+        api.get('/')
+
+    request_span = exporter.get('corva.api.request')
+
+    assert request_span.parent_span_id == parent.span_id
+    assert request_span.attributes == {
+        'http.request.method': 'GET',
+        'url.full': f'{SETTINGS.API_ROOT_URL}/',
+        'http.response.status_code': 204,
+    }
+    assert (
+        requests_mock.last_request.headers['traceparent'] == request_span.traceparent
+    )
+
+
+def test_exporting_adds_context_exporter(exporter: ListExporter):
+    context_exporter = ListExporter()
+
+    with tracing.exporting(context_exporter):
+        with tracing.span('inside'):
+            pass
+
+    with tracing.span('outside'):
+        pass
+
+    assert [span.name for span in context_exporter.spans] == ['inside']
+    assert [span.name for span in exporter.spans] == ['inside', 'outside']
+
+
+def test_importing_corva_does_not_create_trace_file(tmp_path):
+    path = tmp_path / 'traces.jsonl'
+
+    subprocess.run(
+        (sys.executable, '-c', 'import corva'),
+        env={
+            **os.environ,
+            'TRACING_EXPORTER': 'file',
+            'TRACING_FILE': str(path),
+        },
+        check=True,
+    )
+
+    assert not path.exists()